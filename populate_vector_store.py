@@ -4,7 +4,7 @@ Populate Vector Store Script
 One-time setup to populate vector store with existing listings
 """
 
-from db_Handler import DbHandler
+from src.core.db_handler import DbHandler
 
 def main():
     """Populate vector store with existing listings"""
@@ -12,19 +12,17 @@ def main():
     
     db = DbHandler()
     
-    # Get all listings
-    listings = db.get_listings()
-    print(f"Found {len(listings)} listings to process")
-    
-    # Add each to vector store
-    for listing in listings:
-        if listing.get('id'):
-            try:
-                db._add_to_vector_store(listing, listing['id'])
-                print(f"Added listing {listing['id']}: {listing.get('title', 'Unknown')}")
-            except Exception as e:
-                print(f"Error adding listing {listing['id']}: {e}")
+    # Stream listings page by page so memory stays flat on large tables;
+    # each page is embedded concurrently and upserted in one batch
+    processed = 0
+    indexed = 0
+    for page in db.iter_listing_pages(page_size=500):
+        indexed += db.index_listings(page)
+        processed += len(page)
+        print(f"Indexed {indexed}/{processed} listings")
     
+    db.save_vector_snapshot()
+    print(f"Processed {processed} listings ({db.embeddings_skipped} unchanged, not re-embedded)")
     print("Vector store population complete!")
 
 if __name__ == "__main__":
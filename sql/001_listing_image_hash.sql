@@ -0,0 +1,9 @@
+-- Listing images move to the content-addressed blob store (src/core/blob_store.py).
+-- Rows keep only the SHA-256 of the image; image_base64 stays for rows that
+-- have not been migrated yet (DbHandler.migrate_images_to_blob_store).
+alter table listing add column if not exists image_hash text;
+
+-- Supabase Storage bucket used when BLOB_STORE=supabase
+insert into storage.buckets (id, name, public)
+values ('listing-images', 'listing-images', false)
+on conflict (id) do nothing;
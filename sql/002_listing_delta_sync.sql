@@ -0,0 +1,43 @@
+-- Delta sync for the shared listing snapshot (DbHandler.get_listings_changed_since).
+-- updated_at is bumped on every insert/update and deletes leave a tombstone,
+-- so a refresh only fetches rows changed after the snapshot's watermark.
+
+alter table listing add column if not exists updated_at timestamptz;
+update listing set updated_at = coalesce(created_at, now()) where updated_at is null;
+alter table listing alter column updated_at set default now();
+alter table listing alter column updated_at set not null;
+
+create index if not exists listing_updated_at_id on listing (updated_at, id);
+
+create or replace function listing_touch_updated_at() returns trigger as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists listing_touch_updated_at on listing;
+create trigger listing_touch_updated_at
+  before update on listing
+  for each row execute function listing_touch_updated_at();
+
+-- Ids of deleted listings, read by snapshots that still hold them
+create table if not exists listing_tombstone (
+  id bigint primary key,
+  deleted_at timestamptz not null default now()
+);
+
+create index if not exists listing_tombstone_deleted_at on listing_tombstone (deleted_at);
+
+create or replace function listing_record_tombstone() returns trigger as $$
+begin
+  insert into listing_tombstone (id, deleted_at) values (old.id, now())
+  on conflict (id) do update set deleted_at = excluded.deleted_at;
+  return old;
+end;
+$$ language plpgsql;
+
+drop trigger if exists listing_record_tombstone on listing;
+create trigger listing_record_tombstone
+  after delete on listing
+  for each row execute function listing_record_tombstone();
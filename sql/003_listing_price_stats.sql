@@ -0,0 +1,39 @@
+-- Market price statistics aggregated in the database (DbHandler.get_price_stats).
+-- Returns a single row for the listings matching the optional filters, so the
+-- market analysis tools no longer download the catalog to average prices.
+-- Filters take stored values (e.g. 'tech_and_gadgets', 'like_new', 'nus').
+-- Listings without a price (null or 0) are left out, as before.
+
+create index if not exists listing_category_condition_price on listing (category, condition, price);
+
+create or replace function listing_price_stats(
+  p_category text default null,
+  p_condition text default null,
+  p_university text default null
+)
+returns table (
+  count bigint,
+  mean double precision,
+  min double precision,
+  max double precision,
+  median double precision,
+  p25 double precision,
+  p75 double precision,
+  p90 double precision
+)
+language sql stable as $$
+  select
+    count(*),
+    avg(price),
+    min(price),
+    max(price),
+    percentile_cont(0.5) within group (order by price),
+    percentile_cont(0.25) within group (order by price),
+    percentile_cont(0.75) within group (order by price),
+    percentile_cont(0.9) within group (order by price)
+  from listing
+  where price > 0
+    and (p_category is null or category = p_category)
+    and (p_condition is null or condition = p_condition)
+    and (p_university is null or university = p_university);
+$$;
@@ -4,6 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from strands import Agent
 from strands.models import BedrockModel
 from src.core.db_handler import DbHandler
+from src.utils.tracing import invoke_agent
 
 CHAT_SYSTEM_PROMPT = """
 You are Kairos AI, a need clarification specialist for a university marketplace. Your role is to:
@@ -60,7 +61,7 @@ def generate_ai_response(user_message, chat_history=None):
             system_prompt=CHAT_SYSTEM_PROMPT
         )
         
-        response = agent(context_prompt)
+        response = invoke_agent("browse_chat", agent, context_prompt)
         return str(response)
     
     except Exception as e:
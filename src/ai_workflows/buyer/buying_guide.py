@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 from strands import Agent
 from strands.models import BedrockModel
 
+from src.utils.tracing import invoke_agent
+
 load_dotenv()
 
 # =============================================================================
@@ -190,7 +192,7 @@ class BuyingGuideAgent:
         conversation_prompt = self._build_conversation_prompt(user_message, conversation_context)
         
         # Get agent response
-        response = str(self.agent(conversation_prompt))
+        response = str(invoke_agent("buying_guide", self.agent, conversation_prompt))
         
         # Update context
         updated_context = self._update_context(user_message, response, conversation_context)
@@ -228,7 +230,7 @@ class BuyingGuideAgent:
         else:
             fresh_prompt = f"User message: {new_message}. Help them discover what they're looking for."
             
-        response = str(self.agent(fresh_prompt))
+        response = str(invoke_agent("buying_guide", self.agent, fresh_prompt))
         
         # Update context with first interaction
         new_context['chat_history'].append(('user', new_message))
@@ -26,6 +26,7 @@ load_dotenv()
 # Add parent directory to path for db_Handler import
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.core.db_handler import DbHandler
+from src.utils.tracing import invoke_agent, traced
 
 # =============================================================================
 # SYSTEM PROMPTS
@@ -97,6 +98,7 @@ You will receive:
 ## Key Responsibilities
 
 - Use the Item Title for targeted semantic search via semantic_search_tool
+- When the Preferences state a category, maximum budget, campus or condition, pass them as the tool's category, max_price, university or condition filters
 - Analyze each retrieved listing against the specific user preferences
 - Evaluate match quality considering price, condition, category, location, etc.
 - Provide a concise summary for each listing explaining the match quality
@@ -173,20 +175,32 @@ complex_model = BedrockModel(
 # =============================================================================
 
 @tool
-def semantic_search_tool(user_query: str, limit: int = 10):
+@traced("tool.semantic_search_tool", record=lambda rows: {"rows": len(rows)})
+def semantic_search_tool(user_query: str, limit: int = 10, category: str = "",
+                         max_price: float = 0, university: str = "", condition: str = ""):
     """
     Search listings database using semantic similarity based on user preferences.
     Args:
         user_query: User's search preferences and requirements
         limit: Maximum number of listings to return (default 10)
+        category: Optional category filter (e.g., "Tech and Gadgets")
+        max_price: Optional maximum price in SGD (0 means no limit)
+        university: Optional pickup campus filter (e.g., "NUS", "NTU", "SMU")
+        condition: Optional condition filter (e.g., "Like New")
     Returns:
         List of matching listings with full details
     """
     try:
         db = DbHandler()
         
-        # Get similar listing IDs using semantic search
-        similar_listing_ids = db.query_try(user_query, limit)
+        # Get similar listing IDs using semantic search, filtered inside the vector query
+        filters = {
+            "category": category,
+            "max_price": max_price or None,
+            "university": university,
+            "condition": condition,
+        }
+        similar_listing_ids = db.query_try(user_query, limit, filters=filters)
         
         # Get full listing details
         if similar_listing_ids:
@@ -307,7 +321,7 @@ class QueryProcessorAgent:
             Dict with status and either structured_query or clarification_request
         """
         try:
-            response = str(self.agent(raw_query))
+            response = str(invoke_agent("query_processor", self.agent, raw_query))
             
             if "STATUS: SUFFICIENT" in response:
                 return {
@@ -363,7 +377,7 @@ class SearchAnalyzerAgent:
             Analysis summaries for each listing
         """
         prompt = f"Structured User Query:\n{structured_preferences}\n\nUse semantic_search_tool with the Item Title to find relevant listings and analyze each against the Preferences."
-        return self.agent(prompt)
+        return invoke_agent("search_analyzer", self.agent, prompt)
 
 class RankingAgent:
     """
@@ -385,7 +399,7 @@ class RankingAgent:
             Top 3 ranked recommendations
         """
         prompt = f"User Preferences:\n{user_preferences}\n\nListing Analysis:\n{analysis_summaries}"
-        return self.agent(prompt)
+        return invoke_agent("ranking", self.agent, prompt)
 
 # =============================================================================
 # WORKFLOW ORCHESTRATION
@@ -416,6 +430,7 @@ def validate_query(raw_user_query: str):
     query_processor = QueryProcessorAgent()
     return query_processor.process(raw_user_query)
 
+@traced("workflow.buyer_search")
 def buyer_search_workflow(structured_query: str):
     """
     Orchestrates the 2-agent buyer search workflow (assumes query is already validated)
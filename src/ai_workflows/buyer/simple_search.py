@@ -3,12 +3,14 @@ import os
 import sys
 from src.core.db_handler import DbHandler
 
-def semantic_search_listings(query: str, limit: int = 20):
+def semantic_search_listings(query: str, limit: int = 20, filters: dict = None):
     """
     Simple semantic search function for UI integration
     Args:
         query: User search query
         limit: Maximum number of results
+        filters: Optional listing filters applied in the vector query
+                 (e.g. {"category": "Tech and Gadgets", "max_price": 500})
     Returns:
         List of matching listings
     """
@@ -17,7 +19,7 @@ def semantic_search_listings(query: str, limit: int = 20):
             return []
             
         db = DbHandler()
-        similar_listing_ids = db.query_try(query, limit)
+        similar_listing_ids = db.query_try(query, limit, filters=filters)
         
         if similar_listing_ids:
             return db.get_listings(ids=similar_listing_ids)
@@ -13,6 +13,8 @@ Integrates with PostItem UI to enhance listing quality and appeal.
 from strands import Agent, tool
 from strands.models import BedrockModel
 
+from src.utils.tracing import invoke_agent
+
 
 model = BedrockModel(
     model_id= "us.anthropic.claude-3-5-haiku-20241022-v1:0",
@@ -108,6 +110,6 @@ Description: {user_info.get('description', '')}
             model=self.model,
             system_prompt=self.system_prompt
         )
-        response = agent(complete_prompt)
+        response = invoke_agent("description_writer", agent, complete_prompt)
         return str(response)
     
\ No newline at end of file
@@ -5,6 +5,7 @@ This module implements a multi-agent system for comprehensive market analysis:
 - WebsearchAgent: Gathers external market data via web search
 - MarketAnalyzer: Validates findings and extracts key insights
 - Semantic DB Search: Queries internal marketplace for similar items
+- Price Distribution: Precomputed price spread of comparable internal listings
 
 Used in deal evaluation workflow to provide sellers with market intelligence.
 """
@@ -22,6 +23,8 @@ from strands import Agent, tool
 from strands.models import BedrockModel
 from strands_tools import http_request
 
+from src.utils.tracing import invoke_agent, traced
+
 load_dotenv()
 
 # =============================================================================
@@ -146,6 +149,8 @@ complex_model = BedrockModel(
 # =============================================================================
 
 @tool
+@traced("tool.tavily_search", record=lambda results: {
+    "rows": len(results), "bytes": sum(len(r['content']) for r in results)})
 def tavily_search(query: str, max_results: int = 5):
     """
     Perform an internet search using the Tavily API with the specified query.
@@ -188,6 +193,7 @@ def _create_search_text(user_info: str) -> str:
     return ' '.join(search_parts)
 
 @tool
+@traced("tool.semantic_db_search", record=lambda result: {"rows": len(result.get("semantic_matches", []))})
 def semantic_db_search(user_info: str = "", custom_query: str = "", category: str = "", limit: int = 5):
     """
     Search internal marketplace database using semantic similarity for better matching.
@@ -204,6 +210,7 @@ def semantic_db_search(user_info: str = "", custom_query: str = "", category: st
         import os
         sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
         from src.core.db_handler import DbHandler
+        from src.core.listing import match_label
         
         db = DbHandler()
         
@@ -213,30 +220,18 @@ def semantic_db_search(user_info: str = "", custom_query: str = "", category: st
         else:
             search_text = _create_search_text(user_info)
         
-        # Use semantic search via query_try
-        similar_listing_ids = db.query_try(search_text, limit)
+        # The category comes from the LLM as free text; filter only on a known label
+        category_label = match_label("category", category)
+
+        # Use semantic search via query_try (category filter applied inside the vector query)
+        filters = {"category": category_label} if category_label else None
+        similar_listing_ids = db.query_try(search_text, limit, filters=filters)
         
         # Get only the similar listings by their IDs
         similar_listings = db.get_listings(ids=similar_listing_ids) if similar_listing_ids else []
         
-        # Get all listings for price statistics
-        all_listings = db.get_listings()
-        
-        # Filter by category if provided
-        if category:
-            category_listings = [item for item in all_listings 
-                               if item.get('category', '').lower() == category.lower()]
-        else:
-            category_listings = all_listings
-        
-        # Calculate price statistics
-        if category_listings:
-            prices = [float(item.get('price', 0)) for item in category_listings if item.get('price')]
-            avg_price = sum(prices) / len(prices) if prices else 0
-            min_price = min(prices) if prices else 0
-            max_price = max(prices) if prices else 0
-        else:
-            avg_price = min_price = max_price = 0
+        # Price statistics aggregated in the database (one small row)
+        stats = db.get_price_stats(category=category_label)
         
         # Format similar listings
         similar_items = []
@@ -251,15 +246,53 @@ def semantic_db_search(user_info: str = "", custom_query: str = "", category: st
         return {
             "search_query_used": search_text,
             "semantic_matches": similar_items,
-            "total_category_listings": len(category_listings),
-            "avg_price": round(avg_price, 2),
-            "min_price": min_price,
-            "max_price": max_price
+            "total_category_listings": stats["count"],
+            "avg_price": stats["mean"],
+            "min_price": stats["min"],
+            "max_price": stats["max"],
+            "median_price": stats["median"],
+            "price_p25": stats["p25"],
+            "price_p75": stats["p75"],
+            "price_p90": stats["p90"]
         }
         
     except Exception as e:
         return {"error": f"Semantic search failed: {str(e)}"}
 
+@tool
+@traced("tool.price_distribution")
+def price_distribution(category: str, condition: str = "", max_age_months: int = 0, price: float = 0.0):
+    """
+    Price spread of comparable internal listings, precomputed per category, condition and age.
+    Args:
+        category: Listing category (e.g., "Tech and Gadgets")
+        condition: Optional condition filter ("New", "Like New", "Used", "Heavily Used")
+        max_age_months: Optional age limit in months, e.g. 12 for items under a year old (0 = any age)
+        price: Optional asking price to rank against the comparables
+    Returns:
+        Dictionary with count, mean, min, max, median and percentiles, a price histogram,
+        and (when price is given) how many comparables are cheaper or pricier
+    """
+    try:
+        from src.core.db_handler import DbHandler
+        from src.core.listing import match_label
+
+        index = DbHandler().get_price_index()
+        # Free text from the LLM; an unrecognised category/condition is not filtered on
+        query = (match_label("category", category), match_label("condition", condition),
+                 max_age_months or None)
+        result = {
+            "filters": {"category": query[0], "condition": query[1]},
+            "comparables": index.summary(*query),
+            "histogram": index.histogram(*query),
+        }
+        if price:
+            result["price_rank"] = index.rank(price, *query)
+        return result
+
+    except Exception as e:
+        return {"error": f"Price distribution failed: {str(e)}"}
+
 # =============================================================================
 # AGENT CLASSES
 # =============================================================================
@@ -309,43 +342,37 @@ class WebsearchAgent:
             3. Validate source credibility
             4. Format structured report
         """
-        return self.agent(user_prompt)
+        return invoke_agent("websearch", self.agent, user_prompt)
     
-    def _format_results(self, search_results, all_listings, user_prompt):
+    def _format_results(self, search_results, similar_listings, user_prompt):
         """Format search results into structured report"""
+        from src.core.db_handler import DbHandler
+        from src.core.price_stats import normalize_stats
+
         # Extract user's category and price for comparison
         user_category = self._extract_field(user_prompt, 'category')
         user_price = self._extract_price(user_prompt)
         
-        # Filter listings by category
-        category_listings = [item for item in all_listings 
-                           if item.get('category', '').lower() == user_category.lower()] if user_category else []
-        
-        # Calculate price statistics
-        if category_listings:
-            prices = [float(item.get('price', 0)) for item in category_listings if item.get('price')]
-            avg_price = sum(prices) / len(prices) if prices else 0
-            min_price = min(prices) if prices else 0
-            max_price = max(prices) if prices else 0
-        else:
-            avg_price = min_price = max_price = 0
+        # Price statistics for the category, aggregated in the database
+        stats = DbHandler().get_price_stats(category=user_category) if user_category else normalize_stats(None)
         
         report = f"""**INTERNAL DATABASE SUMMARY:**
-Found {len(category_listings)} similar items in marketplace database
+Found {stats['count']} similar items in marketplace database
 
 **MARKETPLACE PRICING:**
-- Average Price: ${avg_price:.2f}
-- Price Range: ${min_price:.2f} - ${max_price:.2f}
+- Average Price: ${stats['mean']:.2f}
+- Median Price: ${stats['median']:.2f}
+- Price Range: ${stats['min']:.2f} - ${stats['max']:.2f}
 - Your Price: ${user_price:.2f}
 
 **SIMILAR LISTINGS:**
 """
         
         # Add top similar listings
-        for i, item in enumerate(category_listings[:3]):
+        for i, item in enumerate(similar_listings[:3]):
             report += f"- {item.get('title', 'Unknown')}: ${item.get('price', 0)} ({item.get('condition', 'Unknown')} condition)\n"
         
-        if not category_listings:
+        if not similar_listings:
             report += "- No similar items found in current marketplace\n"
         
         report += "\n**SOURCES:**\n- Internal Marketplace Database"
@@ -373,7 +400,7 @@ class MarketAnalyzer:
         self.agent = Agent(
             system_prompt=self.SYSTEM_PROMPT,
             model=small_model,
-            tools=[tavily_search, http_request, semantic_db_search]
+            tools=[tavily_search, http_request, semantic_db_search, price_distribution]
         )
 
     def analyze(self, web_report, user_info=None):
@@ -386,5 +413,6 @@ class MarketAnalyzer:
         if user_info:
             prompt += f"\n\nUser Item Info:\n{user_info}"
             prompt += "\n\nMANDATORY: You MUST use the semantic_db_search tool with user_info parameter. Structure your output with External Market and Internal Market sections."
+            prompt += "\nUse the price_distribution tool for the price spread of comparable listings (same category, condition and age) and where the user's price ranks."
         
-        return self.agent(prompt)
+        return invoke_agent("market_analyzer", self.agent, prompt)
@@ -6,6 +6,9 @@ from dotenv import load_dotenv
 from strands import Agent
 from strands.models import BedrockModel
 
+from src.ai_workflows.seller.market_agents import price_distribution
+from src.utils.tracing import invoke_agent
+
 load_dotenv()
 
 # System prompt for Synthesis Agent
@@ -19,6 +22,7 @@ You are the Synthesis Agent in a multi-agent deal evaluation workflow. Your prim
 You will receive:
 - Key points from the Market Analyzer containing validated market findings with sources
 - User information containing details about their item and current offer (brand, condition, age, price, etc.)
+- A price_distribution tool returning the internal price spread of comparable listings (category, condition, age in months) and where a given price ranks among them
 
 ## Key Responsibilities
 
@@ -84,7 +88,8 @@ class SynthesisAgent:
     def __init__(self):
         self.agent = Agent(
             system_prompt=SYNTHESIS_SYSTEM_PROMPT,
-            model=complex_model
+            model=complex_model,
+            tools=[price_distribution]
         )
 
     def synthesize(self, user_info, key_points):
@@ -94,7 +99,7 @@ class SynthesisAgent:
         Returns: str (structured synthesis report)
         """
         prompt = f"User Information:\n{user_info}\n\nMarket Analysis Key Points:\n{key_points}"
-        raw_output = self.agent(prompt)
+        raw_output = invoke_agent("synthesis", self.agent, prompt)
         # Extract text from AgentResult object
         text_output = str(raw_output) if hasattr(raw_output, '__str__') else raw_output
         return self._clean_output(text_output)
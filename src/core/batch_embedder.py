@@ -0,0 +1,133 @@
+"""
+Concurrent batch embedding client for bulk indexing
+
+Embeds many texts through a worker pool with a shared rate limit and
+retry with exponential backoff, so bulk (re)indexing is bounded by the
+Bedrock quota rather than by one request's round-trip time.
+"""
+
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Bedrock error codes worth retrying; anything else (ValidationException,
+# AccessDeniedException, oversized input...) fails the same way every time
+RETRYABLE_ERRORS = {"ThrottlingException", "ServiceUnavailableException",
+                    "ModelTimeoutException", "InternalServerException",
+                    "ModelNotReadyException", "TooManyRequestsException"}
+
+
+def error_code(error):
+  """Bedrock error code of a botocore ClientError, else the exception class name"""
+  response = getattr(error, "response", None)
+  if isinstance(response, dict):
+    return response.get("Error", {}).get("Code")
+  return type(error).__name__
+
+
+def is_retryable(error):
+  if error_code(error) in RETRYABLE_ERRORS:
+    return True
+  # Connection errors and timeouts are transient too (builtin, botocore and urllib3 ones,
+  # which do not share a base class, so they are matched by name)
+  return any(cls.__name__ in ("ConnectionError", "TimeoutError", "ReadTimeoutError", "ConnectTimeoutError")
+             for cls in type(error).__mro__)
+
+
+class RateLimiter:
+  """Token bucket shared by all workers; rate is requests per second"""
+
+  def __init__(self, rate, burst=None):
+    self.rate = rate
+    self.capacity = burst or max(1, int(rate))
+    self._tokens = float(self.capacity)
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def acquire(self):
+    if not self.rate:
+      return
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+          self._tokens -= 1
+          return
+        wait = (1 - self._tokens) / self.rate
+      time.sleep(wait)
+
+
+class BatchEmbedder:
+  def __init__(self, embed_fn, max_workers=8, rate_per_second=20, max_retries=5,
+               backoff_base=0.5, cache=None, model_id=None):
+    """
+    embed_fn: callable(text) -> embedding, one model call per text
+    cache: optional EmbeddingCache consulted before calling the model
+    """
+    self.embed_fn = embed_fn
+    self.max_workers = max_workers
+    self.max_retries = max_retries
+    self.backoff_base = backoff_base
+    self.cache = cache
+    self.model_id = model_id
+    self.limiter = RateLimiter(rate_per_second)
+    self.calls = 0
+    self.retries = 0
+    self._counter_lock = threading.Lock()
+
+  def _embed_with_retry(self, text):
+    """Retries throttling and transient errors with backoff; other errors are raised at once"""
+    for attempt in range(self.max_retries + 1):
+      self.limiter.acquire()
+      with self._counter_lock:
+        self.calls += 1
+      try:
+        return self.embed_fn(text)
+      except Exception as e:
+        if not is_retryable(e):
+          raise
+        if attempt == self.max_retries:
+          print(f"Embedding failed after {attempt + 1} attempts ({error_code(e)}): {e}")
+          return None
+        with self._counter_lock:
+          self.retries += 1
+        delay = self.backoff_base * (2 ** attempt)
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+  def _embed_or_skip(self, text):
+    # A text that can never be embedded is skipped rather than failing the whole batch
+    try:
+      return self._embed_with_retry(text)
+    except Exception as e:
+      print(f"Embedding failed ({error_code(e)}), not retried: {e}")
+      return None
+
+  def embed_many(self, texts):
+    """Returns embeddings in the same order as texts (None where embedding failed)"""
+    texts = list(texts)
+    results = {}
+    pending = []
+    for text in dict.fromkeys(texts):
+      cached = self.cache.get(self.model_id, text) if self.cache else None
+      if cached is not None:
+        results[text] = cached
+      else:
+        pending.append(text)
+
+    if pending:
+      # Workers run in a copy of the caller's context so trace spans nest under the caller
+      context = contextvars.copy_context()
+      def embed(text):
+        return context.copy().run(self._embed_or_skip, text)
+
+      with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+        for text, vector in zip(pending, pool.map(embed, pending)):
+          results[text] = vector
+          if vector and self.cache:
+            self.cache.put(self.model_id, text, vector)
+
+    return [results[text] for text in texts]
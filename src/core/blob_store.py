@@ -0,0 +1,145 @@
+"""
+Content-addressed image blob store
+
+Listing images are stored outside the listing table, keyed by the SHA-256
+of the uploaded bytes, with small/medium/full renditions rendered once at
+upload. Uploading an image that is already stored is a no-op.
+
+Backends:
+- LocalBlobStore: files under a directory (default ./.blobs)
+- SupabaseBlobStore: a Supabase Storage bucket
+Selected with BLOB_STORE=local|supabase (see make_blob_store).
+"""
+
+import hashlib
+import os
+import tempfile
+
+from src.utils.image_helper import INGEST_FORMAT, RENDITION_SIZES, image_mime_type, render_renditions
+from src.utils.tracing import traced_methods
+
+@traced_methods("blobs", include_private=False)
+class BlobStore:
+  """
+  Base class; backends implement _read, _write and _exists on string keys.
+  Renditions are JPEG and keyed .jpg. "full" keeps the uploaded format
+  (WebP after ingest_image by default), so it is stored under one
+  extensionless key and its type is sniffed from the bytes: a read is a
+  single lookup whatever the format.
+  """
+
+  renditions = tuple(RENDITION_SIZES)
+  # Extensions older uploads stored "full" under, the ingest format first
+  legacy_full_extensions = ("jpg", "webp", "png") if INGEST_FORMAT == "JPEG" else ("webp", "jpg", "png")
+
+  @staticmethod
+  def hash_image(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+  @staticmethod
+  def _key(image_hash, rendition, extension="jpg"):
+    if rendition == "full":
+      return f"{image_hash[:2]}/{image_hash}/full"
+    return f"{image_hash[:2]}/{image_hash}/{rendition}.{extension}"
+
+  def _legacy_full_key(self, image_hash):
+    """Key of a full rendition stored as full.<extension>, or None (only probed on a miss)"""
+    for extension in self.legacy_full_extensions:
+      key = f"{image_hash[:2]}/{image_hash}/full.{extension}"
+      if self._exists(key):
+        return key
+    return None
+
+  def put_image(self, image_bytes):
+    """Stores every rendition of image_bytes and returns its hash"""
+    image_hash = self.hash_image(image_bytes)
+    if self.exists(image_hash):
+      return image_hash
+
+    for rendition, data in render_renditions(image_bytes).items():
+      self._write(self._key(image_hash, rendition), data)
+    return image_hash
+
+  def exists(self, image_hash):
+    # "full" is written last, so its presence means the upload completed
+    return self._exists(self._key(image_hash, "full")) or self._legacy_full_key(image_hash) is not None
+
+  def get(self, image_hash, rendition="full"):
+    if rendition not in self.renditions:
+      raise ValueError(f"Unknown rendition '{rendition}'")
+    data = self._read(self._key(image_hash, rendition))
+    if data is None and rendition == "full":
+      key = self._legacy_full_key(image_hash)
+      return self._read(key) if key else None
+    return data
+
+  def _read(self, key):
+    raise NotImplementedError
+
+  def _write(self, key, data):
+    raise NotImplementedError
+
+  def _exists(self, key):
+    raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+  def __init__(self, root):
+    self.root = root
+
+  def _path(self, key):
+    return os.path.join(self.root, *key.split("/"))
+
+  def _read(self, key):
+    try:
+      with open(self._path(key), "rb") as f:
+        return f.read()
+    except FileNotFoundError:
+      return None
+
+  def _write(self, key, data):
+    path = self._path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so concurrent readers never see a partial file; the
+    # unique temp name keeps concurrent writers of the same key apart
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+      with os.fdopen(fd, "wb") as f:
+        f.write(data)
+      os.replace(tmp_path, path)
+    except BaseException:
+      os.unlink(tmp_path)
+      raise
+
+  def _exists(self, key):
+    return os.path.exists(self._path(key))
+
+
+class SupabaseBlobStore(BlobStore):
+  def __init__(self, storage_client, bucket):
+    self.bucket = storage_client.from_(bucket)
+
+  def _read(self, key):
+    try:
+      return self.bucket.download(key)
+    except Exception as e:
+      print(f"Blob {key} could not be downloaded: {e}")
+      return None
+
+  def _write(self, key, data):
+    # Renditions are JPEG; "full" keeps the ingested upload (WebP by default),
+    # so the content type comes from the bytes rather than the key
+    self.bucket.upload(key, data, {"content-type": image_mime_type(data), "upsert": "true"})
+
+  def _exists(self, key):
+    return self.bucket.exists(key)
+
+
+def make_blob_store(db_client=None):
+  """Builds the blob store selected by the BLOB_STORE environment variable"""
+  backend = os.getenv("BLOB_STORE", "local").lower()
+  if backend == "supabase":
+    return SupabaseBlobStore(db_client.storage, os.getenv("BLOB_STORE_BUCKET", "listing-images"))
+  if backend == "local":
+    return LocalBlobStore(os.getenv("BLOB_STORE_PATH", ".blobs"))
+  raise ValueError(f"Unknown BLOB_STORE backend '{backend}'")
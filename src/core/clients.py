@@ -0,0 +1,160 @@
+"""
+Pooled clients for DbHandler
+
+DbHandler is a single @st.cache_resource instance shared by every session
+thread (and by the agent tools), so its external clients are built once
+here and sized for concurrent use:
+
+- Postgres (vecs): a SQLAlchemy QueuePool with pre-ping, recycling and a
+  checkout timeout; sessions beyond pool_size + max_overflow queue on the pool
+- Supabase (PostgREST/Storage): one shared httpx.Client with keep-alive
+  connections, connection limits and connect/read timeouts
+- Bedrock: a boto3 client with connect/read timeouts, a connection pool
+  sized for the session threads and adaptive retries
+
+Clients are created lazily under a lock. reconnect() drops a client after
+a connection failure so the next access rebuilds it (VecsCollection does
+this and retries once). HTTP clients recover on their own: httpx replaces
+broken keep-alive connections and PostgREST requests are retried.
+"""
+
+import os
+import threading
+
+import boto3
+import httpx
+import supabase
+import vecs
+from botocore.config import Config
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DisconnectionError, OperationalError
+from sqlalchemy.orm import sessionmaker
+
+# Errors after which the vecs client is rebuilt and the call retried once
+CONNECTION_ERRORS = (OperationalError, DisconnectionError)
+
+
+def _env_int(name, default):
+  return int(os.getenv(name, str(default)))
+
+
+def _env_float(name, default):
+  return float(os.getenv(name, str(default)))
+
+
+class ClientManager:
+  def __init__(self):
+    self._lock = threading.RLock()
+    self._clients = {}
+    self.reconnects = 0
+
+    # Postgres pool (vecs)
+    self.db_pool_size = _env_int("DB_POOL_SIZE", 10)
+    self.db_max_overflow = _env_int("DB_POOL_MAX_OVERFLOW", 20)
+    self.db_pool_timeout = _env_float("DB_POOL_TIMEOUT", 30)
+    self.db_pool_recycle = _env_int("DB_POOL_RECYCLE", 1800)
+    self.db_connect_timeout = _env_int("DB_CONNECT_TIMEOUT", 10)
+    self.db_statement_timeout_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", 30000)
+
+    # HTTP (Supabase) and Bedrock
+    self.http_connect_timeout = _env_float("HTTP_CONNECT_TIMEOUT", 5)
+    self.http_read_timeout = _env_float("HTTP_READ_TIMEOUT", 30)
+    self.http_max_connections = _env_int("HTTP_MAX_CONNECTIONS", 50)
+    self.bedrock_connect_timeout = _env_float("BEDROCK_CONNECT_TIMEOUT", 5)
+    self.bedrock_read_timeout = _env_float("BEDROCK_READ_TIMEOUT", 60)
+    self.bedrock_max_pool = _env_int("BEDROCK_MAX_POOL_CONNECTIONS", 50)
+
+  def _get(self, name, build):
+    client = self._clients.get(name)
+    if client is None:
+      with self._lock:
+        client = self._clients.get(name)
+        if client is None:
+          client = build()
+          self._clients[name] = client
+    return client
+
+  # *****************************
+  # Clients
+  # *****************************
+  def bedrock(self):
+    return self._get("bedrock", self._build_bedrock)
+
+  def supabase(self):
+    return self._get("supabase", self._build_supabase)
+
+  def vecs(self):
+    return self._get("vecs", self._build_vecs)
+
+  def _build_bedrock(self):
+    return boto3.client(
+      'bedrock-runtime',
+      region_name = os.getenv("AWS_REGION"),
+      aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID"),
+      aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY"),
+      config = Config(
+        connect_timeout = self.bedrock_connect_timeout,
+        read_timeout = self.bedrock_read_timeout,
+        max_pool_connections = self.bedrock_max_pool,
+        retries = {"max_attempts": 4, "mode": "adaptive"},
+      )
+    )
+
+  def _build_http(self):
+    return httpx.Client(
+      timeout = httpx.Timeout(self.http_read_timeout, connect=self.http_connect_timeout),
+      limits = httpx.Limits(
+        max_connections = self.http_max_connections,
+        max_keepalive_connections = self.http_max_connections,
+      ),
+    )
+
+  def _build_supabase(self):
+    http_client = self._get("http", self._build_http)
+    return supabase.create_client(
+      os.getenv("SUPABASE_URL"),
+      os.getenv("SUPABASE_KEY"),
+      options = supabase.ClientOptions(httpx_client=http_client)
+    )
+
+  def pooled_engine(self, connection_string):
+    """SQLAlchemy engine with a bounded, health-checked connection pool"""
+    return create_engine(
+      connection_string,
+      pool_size = self.db_pool_size,
+      max_overflow = self.db_max_overflow,
+      pool_timeout = self.db_pool_timeout,
+      pool_recycle = self.db_pool_recycle,
+      pool_pre_ping = True,
+      connect_args = {
+        "connect_timeout": self.db_connect_timeout,
+        "options": f"-c statement_timeout={self.db_statement_timeout_ms}",
+      },
+    )
+
+  def _build_vecs(self):
+    connection_string = os.getenv("DB_CONNECTION")
+    client = vecs.Client(connection_string)
+    # vecs.Client builds a default engine; swap in the pooled one before any collection is opened
+    client.engine.dispose()
+    client.engine = self.pooled_engine(connection_string)
+    client.Session = sessionmaker(client.engine)
+    return client
+
+  # *****************************
+  # Failure handling
+  # *****************************
+  def reconnect(self, name):
+    """Drops a client so the next access rebuilds it (pooled connections are closed)"""
+    with self._lock:
+      client = self._clients.pop(name, None)
+      self.reconnects += 1
+    if name == "vecs" and client is not None:
+      client.engine.dispose()
+
+  def stats(self):
+    vec_client = self._clients.get("vecs")
+    return {
+      "db_pool": vec_client.engine.pool.status() if vec_client is not None else None,
+      "reconnects": self.reconnects,
+    }
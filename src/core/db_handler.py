@@ -1,17 +1,50 @@
 import ast
-import boto3
 import numpy as np
-import vecs
 import json
 from dotenv import load_dotenv
 import os
-import supabase
 import streamlit as st
-from src.utils.image_helper import image_to_base64
-from datetime import datetime
+from src.core.clients import ClientManager
+from src.core.user_directory import UserDirectory
+from src.core.listing import Listing, enum_value, listing_to_row, parse_timestamp
+from src.core.listing_images import ImageLRU, ListingImage
+from src.core.listing_snapshot import ListingDelta, ListingSnapshotStore
+from src.core.blob_store import LocalBlobStore, make_blob_store
+from src.core.embedding_cache import EmbeddingCache, normalize_text
+from src.core.batch_embedder import BatchEmbedder
+from src.core.vector_filters import listing_metadata, build_vector_filters
+from src.core.vector_backends import LocalVectorIndex, make_vector_backend
+from src.core.offline import OFFLINE_EMBED_MODEL, OfflineDatabase, OfflineEmbeddingClient, seed_offline_catalog
+from src.core.query_cache import QueryResultCache
+from src.core.price_stats import PriceIndex, normalize_stats, summarize_prices
+from src.core.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from src.core.facet_index import FacetIndex
+from src.core.listing_filters import filter_and_sort
+from src.core.ranked_search import SearchPage, paginate
+from src.utils.tracing import current_span, traced_methods
 import base64
+import hashlib
+from datetime import timedelta
+
+# Listing columns fetched for browsing; images are loaded lazily per listing
+LISTING_COLUMNS = (
+  "id, created_at, updated_at, user, title, description, price, age, reason, brand, "
+  "price_negotiable, university, address, delivery_option, category, "
+  "condition, seller_email, image_hash"
+)
+
+# Columns and tables the listing code needs, with the migration adding them
+REQUIRED_SCHEMA = (
+  ("listing", "image_hash", "sql/001_listing_image_hash.sql"),
+  ("listing", "updated_at", "sql/002_listing_delta_sync.sql"),
+  ("listing_tombstone", "id", "sql/002_listing_delta_sync.sql"),
+)
+# PostgREST/Postgres error codes for an unknown column or table
+MISSING_SCHEMA_CODES = {"42703", "42P01", "PGRST204", "PGRST205"}
 
 @st.cache_resource
+# iter_listings yields per listing; its pages are already traced by iter_listing_pages
+@traced_methods("db", exclude=("_build_searchable_text", "_row_image", "iter_listings"))
 class DbHandler:
   # *****************************
   # Constructor for DbHandler object
@@ -21,60 +54,150 @@ class DbHandler:
     # Load Environment variables for use
     load_dotenv()
 
-    # Initialise Amazon Bedrock Client 
-    self.llm_client = boto3.client(
-      'bedrock-runtime',
-      region_name = os.getenv("AWS_REGION"),
-      aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID"),
-      aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+    # KAIROS_BACKEND=offline swaps Supabase, vecs and Bedrock for local stand-ins
+    self.offline = os.getenv("KAIROS_BACKEND", "live").lower() == "offline"
+    if self.offline:
+      self._init_offline_clients()
+    else:
+      self._init_live_clients()
+
+    # Process-wide id <-> username cache (shared by every session)
+    self.users = UserDirectory(
+      self.db_client,
+      ttl_seconds = int(os.getenv("USER_DIRECTORY_TTL", "300"))
     )
 
-    # Initialise Supabase Vector Store Client
-    self.vec_client = vecs.Client(os.getenv("DB_CONNECTION"))
+    # Process-wide LRU of decoded listing images
+    self.images = ImageLRU(
+      max_bytes = int(os.getenv("IMAGE_CACHE_MB", "64")) * 1024 * 1024
+    )
 
-    # Initialise Supabase Main Database Client
-    self.db_client = supabase.create_client(
-      os.getenv("SUPABASE_URL"), 
-      os.getenv("SUPABASE_KEY")
+    # Content-addressed image storage (listing rows only keep the hash)
+    if self.offline:
+      self.blobs = LocalBlobStore(os.getenv("BLOB_STORE_PATH", ".blobs"))
+    else:
+      self.blobs = make_blob_store(self.db_client)
+
+    # Memory + disk cache in front of the Bedrock embedding model
+    self.embeddings = EmbeddingCache(
+      path = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"),
+      max_disk_bytes = int(os.getenv("EMBEDDING_CACHE_MB", "256")) * 1024 * 1024
+    )
+
+    # Concurrent embedder for bulk (re)indexing
+    self.batch_embedder = BatchEmbedder(
+      self._invoke_embedding_model,
+      max_workers = int(os.getenv("EMBED_WORKERS", "8")),
+      rate_per_second = float(os.getenv("EMBED_RATE_LIMIT", "0" if self.offline else "20")),
+      cache = self.embeddings,
+      model_id = self.embed_model_id
+    )
+
+    # Re-embeds avoided because a listing's searchable text was unchanged
+    self.embeddings_skipped = 0
+
+    # Ranked vector query results, invalidated by the collection version
+    self.query_cache = QueryResultCache(
+      max_entries = int(os.getenv("QUERY_CACHE_ENTRIES", "1024"))
+    )
+
+    # One immutable listing snapshot shared by every session,
+    # delta-synced after writes and at least every LISTING_SYNC_INTERVAL seconds
+    self.snapshots = ListingSnapshotStore(
+      max_age_seconds = float(os.getenv("LISTING_SYNC_INTERVAL", "30"))
+    )
+    # Rows changed slightly before a watermark are fetched again, in case
+    # their transaction committed after the snapshot was synced
+    self.sync_overlap = timedelta(seconds=float(os.getenv("LISTING_SYNC_OVERLAP_SECONDS", "5")))
+
+    # Price distributions per (category, condition, age bucket), kept current by snapshot deltas
+    self.price_index = PriceIndex()
+    self.snapshots.subscribe(self.price_index.on_snapshot)
+
+    # BM25 keyword index over the listing snapshot (works without Bedrock)
+    self.lexical_index = LexicalIndex()
+    self.snapshots.subscribe(self.lexical_index.on_snapshot)
+
+    # Category/condition masks and price/date orders for the Browse filter tab
+    self.facet_index = FacetIndex()
+    self.snapshots.subscribe(self.facet_index.on_snapshot)
+
+    # An empty offline database is filled with generated listings
+    if self.offline and not self.db_client.table("listing").select("id").limit(1).execute().data:
+      seed_offline_catalog(self, listing_count = int(os.getenv("OFFLINE_SEED_LISTINGS", "200")))
+
+  def _init_live_clients(self):
+    # Pooled, thread-safe clients shared by every session (see src/core/clients.py)
+    self.clients = ClientManager()
+
+    # Initialise Amazon Bedrock Client 
+    self.llm_client = self.clients.bedrock()
+
+    # Initialise Vector Store (Supabase vecs collection, or in-process index)
+    self.vec_client = None
+    self.vectors = make_vector_backend(
+      self._connect_vecs,
+      reconnect = lambda: self.clients.reconnect("vecs")
     )
 
+    # Initialise Supabase Main Database Client
+    self.db_client = self.clients.supabase()
+    self.embed_model_id = os.getenv("EMBED_MODEL_SMALL")
+    self._check_schema()
+
+  # *****************************
+  # Fails fast when the sql/ migrations have not been applied
+  # (otherwise every listing query fails with a bare PostgREST error)
+  # *****************************
+  def _check_schema(self):
+    missing = []
+    for table, column, migration in REQUIRED_SCHEMA:
+      try:
+        self.db_client.table(table).select(column).limit(1).execute()
+      except Exception as e:
+        if getattr(e, "code", None) not in MISSING_SCHEMA_CODES:
+          raise
+        print(f"Schema check: {table}.{column} is missing ({e})")
+        missing.append(migration)
+    if missing:
+      raise RuntimeError(
+        f"The database schema is out of date. Apply {', '.join(sorted(set(missing)))} "
+        "in the Supabase SQL editor (see 'Database migrations' in README.md)"
+      )
+
+  def _init_offline_clients(self):
+    self.clients = None
+    dimension = int(os.getenv("OFFLINE_EMBED_DIM", "1536"))
+    self.llm_client = OfflineEmbeddingClient(dimension=dimension)
+    self.vec_client = None
+    self.vectors = LocalVectorIndex(dimension=dimension, path=os.getenv("VECTOR_INDEX_PATH"))
+    self.db_client = OfflineDatabase(os.getenv("OFFLINE_DB_PATH", ":memory:"))
+    # Separate model id so offline vectors never mix with Titan vectors in the embedding cache
+    self.embed_model_id = OFFLINE_EMBED_MODEL
+
+  def _connect_vecs(self):
+    self.vec_client = self.clients.vecs()
+    return self.vec_client
+
   # *****************************
   # Takes a listing object and saves to external database
   # *****************************
   def save_listing_to_db(self, listing_object):
-    # Create a copy for use
-    data = listing_object.copy()
+    # Convert display values to the table format (enums, booleans)
+    data = listing_to_row(listing_object)
 
     # Get user id
     username = listing_object["user"]
-    userid = self.get_userid_from_username(username)
+    data['user'] = self.get_userid_from_username(username)
 
-    # Change image to base64 
+    # Store image in the blob store, keyed by content hash
     image = listing_object["image"]
     if image is not None:
-        b64_img = image_to_base64(image).decode('utf-8')
+        image_hash = self.blobs.put_image(image)
     else:
-        b64_img = None
-
-    # Change boolean values
-    data['price_negotiable'] = data['price_negotiable'] == 'Yes'
-
-    # Change Enum Values (format by lowercased, underscore seperated)
-    data['university'] = data['university'].lower().replace(" ", "_")
-    data['category'] = data['category'].lower().replace(" ", "_")
-    data['condition'] = data['condition'].lower().replace(" ", "_")
-    data['delivery_option'] = data['delivery_option'].lower().replace(" ", "_")
-
-
-    # Remove image, date_posted, user fields
-    del data['image']
-    del data['date_posted']
-    data['user'] = userid
-    data['image_base64'] = b64_img
-    
-    # Add seller_email if provided
-    if 'seller_email' not in data:
-        data['seller_email'] = None 
+        image_hash = None
+    data['image_hash'] = image_hash
+    data['image_base64'] = None
 
     # Save to main database
     response = (self.db_client.table("listing")
@@ -85,45 +208,32 @@ class DbHandler:
     if response.data:
         listing_id = response.data[0]['id']
         self._add_to_vector_store(listing_object, listing_id)
+    self._on_listings_changed()
     return True
 
   # *****************************
   # Updates an existing listing
   # *****************************
   def update_listing_in_db(self, listing_object, listing_id):
-    # Create a copy for use
-    data = listing_object.copy()
+    # Convert display values to the table format (enums, booleans)
+    data = listing_to_row(listing_object)
 
     # Get user id
     username = listing_object["user"]
-    userid = self.get_userid_from_username(username)
+    data['user'] = self.get_userid_from_username(username)
 
-    # Change image to base64 
+    # Store image in the blob store, keyed by content hash
+    # (an untouched lazy image handle means the stored image is kept as is,
+    #  and re-uploading identical bytes resolves to the existing blob)
     image = listing_object["image"]
-    if image is not None:
-        b64_img = image_to_base64(image).decode('utf-8')
-    else:
-        b64_img = None
-
-    # Change boolean values
-    data['price_negotiable'] = data['price_negotiable'] == 'Yes'
-
-    # Change Enum Values (format by lowercased, underscore seperated)
-    data['university'] = data['university'].lower().replace(" ", "_")
-    data['category'] = data['category'].lower().replace(" ", "_")
-    data['condition'] = data['condition'].lower().replace(" ", "_")
-    data['delivery_option'] = data['delivery_option'].lower().replace(" ", "_")
-
-
-    # Remove image, date_posted, user fields
-    del data['image']
-    del data['date_posted']
-    data['user'] = userid
-    data['image_base64'] = b64_img
-    
-    # Add seller_email if provided
-    if 'seller_email' not in data:
-        data['seller_email'] = None 
+    if image is not None and not isinstance(image, ListingImage):
+        data['image_hash'] = self.blobs.put_image(image)
+        data['image_base64'] = None
+        self.images.discard(listing_id)
+    elif image is None:
+        data['image_hash'] = None
+        data['image_base64'] = None
+        self.images.discard(listing_id)
 
     # Save to main database
     response = (self.db_client.table("listing")
@@ -134,56 +244,211 @@ class DbHandler:
     # Add to vector store for semantic search
     if response.data:
         listing_id = response.data[0]['id']
-        self._add_to_vector_store(listing_object, listing_id)
+        self._add_to_vector_store(listing_object, listing_id, skip_unchanged=True)
+    self._on_listings_changed()
     return True
 
   # *****************************
   # User Helpers 
   # *****************************
   def get_userid_from_username(self, username):
-    resp = self.db_client.table("user_profile").select("id").eq("username", username).execute()
+    user_id = self.users.userid_for(username)
 
-    if resp.data:
-        user_id = resp.data[0]["id"]
+    if user_id is not None:
         print(f"User ID for {username}: {user_id}")
         return user_id
     else:
         print(f"User with username '{username}' not found.")
     
   def get_username_from_id(self, user_id):
-    res = self.db_client.table("user_profile").select("username").eq("id", user_id).execute()
-    return res.data[0]["username"]
+    return self.users.username_for(user_id)
 
   # *****************************
   # Queries the external DB for listings
   # Augments the data to match listing object in python
+  # Images are left out and attached as lazy handles unless with_images is set
   # *****************************
-  def get_listings(self, ids=None):
+  def get_listings(self, ids=None, with_images=False):
     if ids is not None:
-      res = (self.db_client.table("listing").select("*")
+      columns = "*" if with_images else LISTING_COLUMNS
+      res = (self.db_client.table("listing").select(columns)
               .in_("id", ids)
               .execute())
-    else:
-      res = (self.db_client.table("listing").select("*").execute())
-    listings = res.data
+      return self._to_session_listings(res.data)
+
+    return list(self.iter_listings(with_images=with_images))
+
+  # *****************************
+  # Loads one listing's image (cached in the shared LRU)
+  # Blob store renditions are read by hash; older rows still keep base64 inline
+  # *****************************
+  def get_listing_image(self, listing_id, rendition="full", image_hash=None):
+    if image_hash:
+      key = (image_hash, rendition)
+      cached = self.images.get(key)
+      if cached is None:
+        cached = self.blobs.get(image_hash, rendition) or b""
+        self.images.put(key, cached)
+      return cached or None
+
+    cached = self.images.get(listing_id)
+    if cached is not None:
+      return cached or None
+
+    res = (self.db_client.table("listing")
+           .select("image_base64")
+           .eq("id", listing_id)
+           .execute())
+    b64_img = res.data[0]["image_base64"] if res.data else None
+    image = base64.b64decode(b64_img) if b64_img else b""
+    self.images.put(listing_id, image)
+    return image or None
+
+  # *****************************
+  # Converts raw listing rows to session state style
+  # Sellers are resolved in one batched lookup for the whole page
+  # *****************************
+  def _to_session_listings(self, listings):
+    current_span().set(rows=len(listings))
+    usernames = self.users.usernames_for(item['user'] for item in listings)
+    return Listing.from_rows(listings, usernames, self._row_image)
+
+  def _row_image(self, row):
+    # Lazy handle when the image columns were not selected, else the stored bytes
+    image_hash = row.get('image_hash')
+    if 'image_base64' not in row:
+      return ListingImage(row['id'], self.get_listing_image, image_hash)
+    if image_hash:
+      return self.get_listing_image(row['id'], image_hash=image_hash)
+    if row['image_base64']:
+      return base64.b64decode(row['image_base64'])
+    return None
+
+  # *****************************
+  # Streams listings page by page using keyset pagination on (created_at, id)
+  # Only one page is held in memory at a time
+  # after: (created_at, id) of the last row already seen
+  # *****************************
+  def iter_listing_pages(self, page_size=500, after=None, newest_first=False, with_images=False):
+    op = "lt" if newest_first else "gt"
+    columns = "*" if with_images else LISTING_COLUMNS
+    cursor = after
+
+    while True:
+      query = self.db_client.table("listing").select(columns)
+      if cursor is not None:
+        created_at, listing_id = cursor
+        query = query.or_(
+          f'created_at.{op}."{created_at}",'
+          f'and(created_at.eq."{created_at}",id.{op}.{listing_id})'
+        )
+      res = (query.order("created_at", desc=newest_first)
+                  .order("id", desc=newest_first)
+                  .limit(page_size)
+                  .execute())
+      rows = res.data
+      if not rows:
+        return
+
+      # Capture the cursor before rows are converted (created_at is dropped)
+      cursor = (rows[-1]["created_at"], rows[-1]["id"])
+      yield self._to_session_listings(rows)
 
-    # Convert back to session state style
+      if len(rows) < page_size:
+        return
+
+  def iter_listings(self, page_size=500, after=None, newest_first=False, with_images=False):
+    for page in self.iter_listing_pages(page_size, after, newest_first, with_images):
+      yield from page
+
+  # *****************************
+  # Process-wide listing snapshot (see src/core/listing_snapshot.py)
+  # Loaded in full once, then refreshed with get_listings_changed_since
+  # on_page(count) reports progress while the full catalog loads
+  # *****************************
+  def get_listing_snapshot(self, on_page=None):
+    def build():
+      listings = []
+      for page in self.iter_listing_pages():
+        listings.extend(page)
+        if on_page:
+          on_page(len(listings))
+      updated = max((item.updated_at for item in listings if item.updated_at), default=None)
+      return listings, max(filter(None, (updated, self._latest_tombstone())), default=None)
+
+    snapshot = self.snapshots.current(build, self.get_listings_changed_since)
+    current_span().set(version=snapshot.version, rows=len(snapshot))
+    return snapshot
+
+  def refresh_listing_snapshot(self, on_page=None):
+    self.snapshots.invalidate()
+    return self.get_listing_snapshot(on_page)
+
+  # *****************************
+  # Listings inserted, updated or deleted after watermark (a datetime)
+  # Uses listing.updated_at and listing_tombstone (sql/002_listing_delta_sync.sql)
+  # *****************************
+  def get_listings_changed_since(self, watermark):
+    watermark = parse_timestamp(watermark)
+    since = (watermark - self.sync_overlap).isoformat(timespec="microseconds")
+
+    rows = (self.db_client.table("listing").select(LISTING_COLUMNS)
+            .gte("updated_at", since)
+            .order("updated_at")
+            .order("id")
+            .execute()).data
+    tombstones = (self.db_client.table("listing_tombstone").select("id, deleted_at")
+                  .gte("deleted_at", since)
+                  .execute()).data
+
+    listings = self._to_session_listings(rows)
+    delta = ListingDelta(deleted=[row["id"] for row in tombstones])
     for item in listings:
-      item['user'] = self.get_username_from_id(item['user'])
-      item['date_posted'] = datetime.fromisoformat(item['created_at']).strftime("%d %B %Y, %H:%M")
-      item['category'] = item['category'].replace('_', ' ').title().replace('And', 'and')
-      item['condition'] = item['condition'].replace('_', ' ').title()
-      del item['created_at']
-      item['price_negotiable'] = "Yes" if item['price_negotiable'] else "No"
-      item['university'] = item['university'].title()
-      item['delivery_option'] = item['delivery_option'].replace('_', ' ').title()
-      if item['image_base64']:
-          item['image'] = base64.b64decode(item['image_base64'])
+      if item.created_at and item.created_at > watermark:
+        delta.inserted.append(item)
       else:
-          item['image'] = None
-      del item['image_base64']
+        delta.updated.append(item)
+    changed_at = [item.updated_at for item in listings] + [parse_timestamp(row["deleted_at"]) for row in tombstones]
+    delta.watermark = max(filter(None, changed_at), default=None)
+    current_span().set(inserted=len(delta.inserted), updated=len(delta.updated), deleted=len(delta.deleted))
+    return delta
+
+  def _latest_tombstone(self):
+    rows = (self.db_client.table("listing_tombstone").select("deleted_at")
+            .order("deleted_at", desc=True)
+            .limit(1)
+            .execute()).data
+    return parse_timestamp(rows[0]["deleted_at"]) if rows else None
 
-    return listings
+  # *****************************
+  # Called after every write to listing rows (and their vectors)
+  # Marks the shared listing snapshot stale and bumps the collection version
+  # *****************************
+  def _on_listings_changed(self):
+    self.snapshots.invalidate()
+    self._on_vectors_changed()
+
+  # *****************************
+  # Called after vector-only writes
+  # Bumps the collection version so cached query results are not reused
+  # *****************************
+  def _on_vectors_changed(self):
+    self.query_cache.bump_version()
+
+  # *****************************
+  # Hit/miss metrics for the search caches
+  # *****************************
+  def get_cache_stats(self):
+    return {
+      "query_results": self.query_cache.stats(),
+      "embeddings": self.embeddings.stats(),
+      "embeddings_skipped": self.embeddings_skipped,
+      "listing_snapshot": self.snapshots.stats(),
+      "price_index": self.price_index.stats(),
+      "lexical_index": self.lexical_index.stats(),
+      "facet_index": self.facet_index.stats(),
+      "clients": self.clients.stats() if self.clients else None,
+    }
 
   # *****************************
   # Checks if current_user is owner
@@ -216,6 +481,9 @@ class DbHandler:
                    .delete()
                    .eq("id", listing_id)
                    .execute())
+        self.images.discard(listing_id)
+        self.vectors.delete(ids=[str(listing_id)])
+        self._on_listings_changed()
         
         print(f"Listing {listing_id} deleted successfully")
         return True
@@ -225,14 +493,31 @@ class DbHandler:
         return False
   
   # *****************************
-  # Takes a listing python object and saves the embeddings in external db
-  # Using Listing ID as identifier
+  # Returns the Titan embedding for text, checking the embedding cache first
   # *****************************
-  def _add_to_vector_store(self, listing_object, listing_id):
-    """Add listing to vector store for semantic search"""
-    try:
-        # Create searchable text from listing
-        searchable_text = f'''
+  def _embed(self, text):
+    return self.embeddings.get_or_compute(self.embed_model_id, text, self._invoke_embedding_model)
+
+  def _invoke_embedding_model(self, text):
+    response = self.llm_client.invoke_model(
+        body=json.dumps({"inputText": text}),
+        modelId=self.embed_model_id,
+        accept="application/json",
+        contentType="application/json"
+    )
+
+    raw_body = response["body"].read()
+    response_body = json.loads(raw_body)
+    current_span().set(bytes=len(raw_body), input_tokens=response_body.get("inputTextTokenCount"))
+    return response_body.get("embedding")
+
+  # *****************************
+  # Builds the text that is embedded for a listing
+  # Returns (text, content_hash); the hash is stored in the vecs metadata
+  # so edits that leave the text untouched (price, email, image) skip embedding
+  # *****************************
+  def _build_searchable_text(self, listing_object):
+    searchable_text = f'''
           Title: {listing_object.get('title', '')} 
           Listing Description: {listing_object.get('description', '')} 
           Brand: {listing_object.get('brand', '')} 
@@ -242,26 +527,103 @@ class DbHandler:
           age (in months): {listing_object.get('age', '')}
           price is negotiable: {listing_object.get('price_negotiable', '')}
           '''.strip()
+    content_hash = hashlib.sha256(normalize_text(searchable_text).encode("utf-8")).hexdigest()
+    return searchable_text, content_hash
+
+  # *****************************
+  # Returns {listing id: (vector, metadata)} for listings already in the vector store
+  # *****************************
+  def _stored_records(self, docs, listing_ids):
+    records = docs.fetch(ids=[str(listing_id) for listing_id in listing_ids])
+    return {record[0]: (record[1], record[2] or {}) for record in records}
+
+  # *****************************
+  # Bulk indexing: embeds listings concurrently and upserts in chunks
+  # *****************************
+  def index_listings(self, listings, chunk_size=500, skip_unchanged=True):
+    docs = self.vectors
+    listings = [item for item in listings if item.get('id')]
+    searchable = [self._build_searchable_text(item) for item in listings]
+
+    # Listings whose searchable text has not changed since last indexed reuse
+    # their stored vector (metadata such as price is still refreshed)
+    reused = []
+    if skip_unchanged and listings:
+      stored = self._stored_records(docs, [item['id'] for item in listings])
+      keep = []
+      for i, item in enumerate(listings):
+        vector, metadata = stored.get(str(item['id']), (None, {}))
+        if metadata.get("content_hash") != searchable[i][1]:
+          keep.append(i)
+          continue
+        new_metadata = listing_metadata(item, searchable[i][1])
+        if new_metadata != metadata:
+          reused.append((str(item['id']), vector, new_metadata))
+      self.embeddings_skipped += len(listings) - len(keep)
+      listings = [listings[i] for i in keep]
+      searchable = [searchable[i] for i in keep]
+
+    embeddings = self.batch_embedder.embed_many(text for text, _ in searchable)
+
+    records = [(str(item['id']), embedding, listing_metadata(item, content_hash))
+               for item, (_, content_hash), embedding in zip(listings, searchable, embeddings)
+               if embedding]
+    failed = len(listings) - len(records)
+    records += reused
+    for start in range(0, len(records), chunk_size):
+      docs.upsert(records[start:start + chunk_size])
+    if records:
+      self._on_vectors_changed()
+
+    if failed:
+      print(f"Could not embed {failed} of {len(listings)} listings")
+    return len(records) - len(reused)
+
+  # *****************************
+  # Writes the in-process vector index to its snapshot file (no-op for vecs)
+  # *****************************
+  def save_vector_snapshot(self):
+    if getattr(self.vectors, "path", None):
+      self.vectors.save()
+      print(f"Saved vector snapshot to {self.vectors.path}")
+
+  # *****************************
+  # Takes a listing python object and saves the embeddings in external db
+  # Using Listing ID as identifier
+  # *****************************
+  def _add_to_vector_store(self, listing_object, listing_id, skip_unchanged=False):
+    """Add listing to vector store for semantic search"""
+    try:
+        # Create searchable text from listing
+        searchable_text, content_hash = self._build_searchable_text(listing_object)
         
         if not searchable_text:
             print(f"No searchable text for listing {listing_id}")
             return
         
-        # Generate embedding
-        response = self.llm_client.invoke_model(
-            body=json.dumps({"inputText": searchable_text}),
-            modelId=os.getenv("EMBED_MODEL_SMALL"),
-            accept="application/json",
-            contentType="application/json"
-        )
-        
-        response_body = json.loads(response["body"].read())
-        embedding = response_body.get("embedding")
+        docs = self.vectors
+
+        metadata = listing_metadata(listing_object, content_hash)
+
+        # Only re-embed when the searchable text actually changed
+        if skip_unchanged:
+          stored = self._stored_records(docs, [listing_id])
+          vector, stored_metadata = stored.get(str(listing_id), (None, {}))
+          if stored_metadata.get("content_hash") == content_hash:
+            self.embeddings_skipped += 1
+            print(f"Listing {listing_id} text unchanged, skipped re-embedding "
+                  f"({self.embeddings_skipped} skipped so far)")
+            # Keep filterable metadata (price, university, ...) current
+            if stored_metadata != metadata:
+              docs.upsert([(str(listing_id), vector, metadata)])
+            return
+
+        # Generate embedding (unchanged listing text is served from cache)
+        embedding = self._embed(searchable_text)
 
         if embedding:
           # Add to listings vector
-          docs = self.vec_client.get_or_create_collection(name="listing", dimension=1536)
-          record = [(str(listing_id), embedding, {})]
+          record = [(str(listing_id), embedding, metadata)]
           docs.upsert(record)
           
           print(f"Added listing {listing_id} to vector store")
@@ -271,62 +633,205 @@ class DbHandler:
   
 
   # *****************************
-  # Returns an array of the top k similar sentences to query 
+  # Returns every user profile (id, username) from the shared directory
   # *****************************
   def get_users(self):
-    response = (self.db_client.table("user_profile")
-                .select("id, username")
-                .execute()
-                .model_dump_json())
-    
-    data = json.loads(response)["data"] 
-    return data
+    return self.users.all_users()
 
   # *****************************
   # One-Time migration of vectors from listing table to vecs store
   # *****************************
-  def fix_vecs(self):
-    docs = self.vec_client.get_or_create_collection(name="listing", dimension=1536)
+  def fix_vecs(self, chunk_size=500):
+    docs = self.vectors
     # sync IDs + embeddings from public.listing
     rows = self.db_client.table("listing").select("id, embeddings").execute().model_dump_json()
     data = json.loads(rows)["data"]
     records = []
     for r in data:
       old_embed = r["embeddings"]
+      if not old_embed:
+        continue
       parsed_embed = np.array(ast.literal_eval(old_embed), dtype="float32")
       id = str(r["id"])
       records.append((id, parsed_embed, {}))
-    docs.upsert(records)           # fast; stores only two columns + metadata
+    for start in range(0, len(records), chunk_size):
+      docs.upsert(records[start:start + chunk_size])   # fast; stores only two columns + metadata
     docs.create_index()            # optional but speeds up search
+    self._on_vectors_changed()
 
   # *****************************
-  # Returns an array of the top k similar sentences to query 
+  # One-Time migration of inline base64 images to the blob store
+  # *****************************
+  def migrate_images_to_blob_store(self, page_size=100):
+    migrated = 0
+    while True:
+      res = (self.db_client.table("listing")
+             .select("id, image_base64")
+             .not_.is_("image_base64", "null")
+             .is_("image_hash", "null")
+             .limit(page_size)
+             .execute())
+      if not res.data:
+        break
+      for row in res.data:
+        image_hash = self.blobs.put_image(base64.b64decode(row["image_base64"]))
+        (self.db_client.table("listing")
+         .update({"image_hash": image_hash, "image_base64": None})
+         .eq("id", row["id"])
+         .execute())
+        self.images.discard(row["id"])
+        migrated += 1
+    if migrated:
+      self.snapshots.invalidate()
+    print(f"Migrated {migrated} listing images to the blob store")
+    return migrated
+
+  # *****************************
+  # Returns [(listing id, distance)] for the k nearest listings to text
+  # filters are applied inside the vector query, e.g.
+  #   {"category": "Tech and Gadgets", "max_price": 500, "university": "NUS"}
   # *****************************
-  def query_try(self, query_sentence, limit_num):
+  def query(self, text, k=10, filters=None):
+    # Serve repeat queries from the result cache while the collection is unchanged
+    version = self.query_cache.version
+    cached = self.query_cache.get(text, k, filters)
+    if cached is not None:
+      print("Query Results: CACHED")
+      current_span().set(cache="hit", rows=len(cached))
+      return cached
+
     # Generate Embeddings for input query string
     print("Generating Input Query Embedding...")
-    response = self.llm_client.invoke_model(
-        body= json.dumps({"inputText": query_sentence}),
-        modelId= os.getenv("EMBED_MODEL_SMALL"),
-        accept = "application/json",
-        contentType = "application/json"
-    )
-
-    response_body = json.loads(response["body"].read())
-    query_embedding = response_body.get("embedding")
+    query_embedding = self._embed(text)
     print("Query Embedding: SUCCESS")
 
     print("Querying Vector Store for k nearest...")
     # Query Vector store for Top k Similar Items
-    listingDB = self.vec_client.get_collection(name="listing")
+    listingDB = self.vectors
     results = listingDB.query(
       data=query_embedding,
-      limit=limit_num,
+      limit=k,
+      filters=build_vector_filters(filters),
       include_value = True
     )
-    ids_sorted = [t[0] for t in sorted(results, key=lambda x: x[1])]
-    ids = [int(s) for s in ids_sorted]
+    ranked = [(int(t[0]), float(t[1])) for t in sorted(results, key=lambda x: x[1])]
+    current_span().set(cache="miss", rows=len(ranked))
+    self.query_cache.put(text, k, filters, ranked, version)
+    return ranked
+
+  # *****************************
+  # Returns an array of the top k similar sentences to query 
+  # *****************************
+  def query_try(self, query_sentence, limit_num, filters=None):
+    ids = [listing_id for listing_id, _ in self.query(query_sentence, limit_num, filters)]
     print("Queried Results! Returning as array")
 
     return ids
-  
\ No newline at end of file
+  
+  # *****************************
+  # Price statistics (count, mean, min, max, median, p25, p75, p90) for listings
+  # in a category, optionally narrowed to one condition and/or university.
+  # Filters take display labels ("Tech and Gadgets", "Like New", "NUS").
+  # Aggregated in the database by listing_price_stats (sql/003_listing_price_stats.sql)
+  # *****************************
+  def get_price_stats(self, category=None, condition=None, university=None):
+    params = {
+      "p_category": enum_value(category or None),
+      "p_condition": enum_value(condition or None),
+      "p_university": enum_value(university or None),
+    }
+    try:
+      rows = self.db_client.rpc("listing_price_stats", params).execute().data
+      row = rows[0] if rows else None
+    except Exception as e:
+      # Function not deployed yet: fetch only the price column and aggregate here
+      print(f"listing_price_stats unavailable, aggregating prices locally: {e}")
+      query = self.db_client.table("listing").select("price").gt("price", 0)
+      for column, value in (("category", params["p_category"]), ("condition", params["p_condition"]),
+                            ("university", params["p_university"])):
+        if value is not None:
+          query = query.eq(column, value)
+      row = summarize_prices(sorted(r["price"] for r in query.execute().data))
+
+    stats = normalize_stats(row)
+    current_span().set(rows=stats["count"])
+    return stats
+
+  # *****************************
+  # In-memory price distributions for fine-grained comparables
+  # (see PriceIndex in src/core/price_stats.py), synced with the listing snapshot
+  # *****************************
+  def get_price_index(self):
+    self.get_listing_snapshot()
+    return self.price_index
+
+  # *****************************
+  # Browse filters and sorting from the facet index (see src/core/facet_index.py)
+  # Same arguments as listing_filters.filter_and_sort, which scans the
+  # snapshot instead while the index does not reflect it (listener failure)
+  # *****************************
+  def filter_listings(self, search="", category="All", condition="All", price_range=None, sort_option="Default"):
+    snapshot = self.get_listing_snapshot()
+    if self.facet_index.version == snapshot.version:
+      results = self.facet_index.query(search, category, condition, price_range, sort_option)
+    else:
+      results = filter_and_sort(snapshot.listings, search, category, condition, price_range, sort_option)
+      current_span().set(fallback="scan")
+    current_span().set(rows=len(results))
+    return results
+
+  def get_facet_index(self):
+    self.get_listing_snapshot()
+    return self.facet_index
+
+  # *****************************
+  # Keyword search over title, brand, description and category
+  # Returns [(listing id, BM25 score)], best first (see src/core/lexical_index.py)
+  # *****************************
+  def keyword_search(self, text, k=None):
+    self.get_listing_snapshot()
+    results = self.lexical_index.search(text, k)
+    current_span().set(rows=len(results))
+    return results
+
+  # *****************************
+  # Keyword and vector rankings fused with reciprocal-rank fusion
+  # Returns listing ids, best first. Falls back to keywords only when the
+  # vector query fails (e.g. Bedrock is unavailable).
+  # *****************************
+  def hybrid_search(self, text, k=10):
+    return [listing_id for listing_id, _ in self._hybrid_ranking(text, k)[:k]]
+
+  def _hybrid_ranking(self, text, k, min_similarity=None):
+    """Fused [(listing id, score)]; vector hits below min_similarity (1 - cosine distance) are dropped"""
+    keyword_ids = [listing_id for listing_id, _ in self.keyword_search(text, k)]
+    try:
+      vector_ids = [listing_id for listing_id, distance in self.query(text, k)
+                    if min_similarity is None or 1.0 - distance >= min_similarity]
+    except Exception as e:
+      print(f"Vector search unavailable, using keyword results only: {e}")
+      current_span().set(fallback="keyword")
+      vector_ids = []
+    return reciprocal_rank_fusion(keyword_ids, vector_ids)
+
+  # *****************************
+  # One page of ranked search results as a SearchPage (see src/core/ranked_search.py)
+  # Ranks at most SEARCH_MAX_RESULTS candidates; cursor comes from the previous page
+  # Listings are hydrated from the shared snapshot (one query for any it lacks)
+  # *****************************
+  def ranked_search(self, text, limit=20, cursor=None, min_similarity=None):
+    if min_similarity is None:
+      min_similarity = float(os.getenv("SEARCH_MIN_SIMILARITY", "0"))
+    pool = int(os.getenv("SEARCH_MAX_RESULTS", "200"))
+    ranking = self._hybrid_ranking(text, pool, min_similarity)
+    page, next_cursor = paginate(ranking, limit, cursor)
+
+    snapshot = self.get_listing_snapshot()
+    listings = {listing_id: snapshot.get(listing_id) for listing_id, _ in page}
+    missing = [listing_id for listing_id, listing in listings.items() if listing is None]
+    if missing:
+      listings.update((item["id"], item) for item in self.get_listings(ids=missing))
+
+    results = [(listings[listing_id], score) for listing_id, score in page if listings.get(listing_id)]
+    current_span().set(rows=len(results), pool=len(ranking))
+    return SearchPage(results=results, next_cursor=next_cursor, total=len(ranking))
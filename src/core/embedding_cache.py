@@ -0,0 +1,130 @@
+"""
+Two-tier embedding cache for DbHandler
+
+Bedrock embedding calls are cached by (model id, normalized text hash):
+- an in-memory LRU for hot queries within the process
+- an on-disk SQLite store that survives restarts, evicted by total size
+Hit/miss counters are exposed through stats().
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+def normalize_text(text):
+  """Collapse whitespace so formatting-only differences share one cache entry"""
+  return " ".join(text.split())
+
+
+class EmbeddingCache:
+  def __init__(self, path=".cache/embeddings.sqlite3", max_memory_entries=2048,
+               max_disk_bytes=256 * 1024 * 1024):
+    self.path = path
+    self.max_memory_entries = max_memory_entries
+    self.max_disk_bytes = max_disk_bytes
+    self._lock = threading.Lock()
+    self._memory = OrderedDict()
+    self.memory_hits = 0
+    self.disk_hits = 0
+    self.misses = 0
+
+    if path != ":memory:":
+      os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute(
+      "create table if not exists embedding ("
+      " key text primary key, model text, vector blob, size integer, last_used real)"
+    )
+    self._conn.execute("create index if not exists embedding_last_used on embedding (last_used)")
+    self._conn.commit()
+    self._disk_bytes = self._conn.execute(
+      "select coalesce(sum(size), 0) from embedding").fetchone()[0]
+
+  @staticmethod
+  def make_key(model_id, text):
+    return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+  # *****************************
+  # Lookups
+  # *****************************
+  def get(self, model_id, text):
+    key = self.make_key(model_id, text)
+    with self._lock:
+      if key in self._memory:
+        self._memory.move_to_end(key)
+        self.memory_hits += 1
+        return self._memory[key]
+
+      row = self._conn.execute("select vector from embedding where key = ?", (key,)).fetchone()
+      if row is None:
+        self.misses += 1
+        return None
+
+      self._conn.execute("update embedding set last_used = ? where key = ?", (time.time(), key))
+      self._conn.commit()
+      self.disk_hits += 1
+      vector = array("f", row[0]).tolist()
+      self._remember(key, vector)
+      return vector
+
+  def put(self, model_id, text, vector):
+    key = self.make_key(model_id, text)
+    blob = array("f", vector).tobytes()
+    with self._lock:
+      self._remember(key, list(vector))
+      old = self._conn.execute("select size from embedding where key = ?", (key,)).fetchone()
+      self._conn.execute(
+        "insert or replace into embedding (key, model, vector, size, last_used) values (?, ?, ?, ?, ?)",
+        (key, model_id, blob, len(blob), time.time())
+      )
+      self._disk_bytes += len(blob) - (old[0] if old else 0)
+      self._evict_disk()
+      self._conn.commit()
+
+  def get_or_compute(self, model_id, text, compute):
+    """Returns the cached vector for text, calling compute(text) on a miss"""
+    vector = self.get(model_id, text)
+    if vector is None:
+      vector = compute(text)
+      if vector:
+        self.put(model_id, text, vector)
+    return vector
+
+  def stats(self):
+    lookups = self.memory_hits + self.disk_hits + self.misses
+    return {
+      "memory_hits": self.memory_hits,
+      "disk_hits": self.disk_hits,
+      "misses": self.misses,
+      "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+      "memory_entries": len(self._memory),
+      "disk_bytes": self._disk_bytes,
+    }
+
+  # *****************************
+  # Eviction (caller holds the lock)
+  # *****************************
+  def _remember(self, key, vector):
+    self._memory[key] = vector
+    self._memory.move_to_end(key)
+    while len(self._memory) > self.max_memory_entries:
+      self._memory.popitem(last=False)
+
+  def _evict_disk(self):
+    if self._disk_bytes <= self.max_disk_bytes:
+      return
+    # Drop least recently used rows until 90% of the budget is free
+    target = int(self.max_disk_bytes * 0.9)
+    rows = self._conn.execute("select key, size from embedding order by last_used").fetchall()
+    evicted = []
+    for key, size in rows:
+      if self._disk_bytes <= target:
+        break
+      evicted.append((key,))
+      self._disk_bytes -= size
+    self._conn.executemany("delete from embedding where key = ?", evicted)
@@ -0,0 +1,230 @@
+"""
+Facet index for the Browse filter tab
+
+Filtering used to scan every listing with a compound predicate and sort the
+result on each rerun. FacetIndex keeps, over the shared listing snapshot:
+
+- a boolean mask (bitmap) per category and per condition value,
+- slots sorted by price and by created_at,
+
+so a filter is a mask intersection, a price range is a slice of the price
+order (np.searchsorted), and every sort option is already precomputed.
+Facet counts come from the same masks. Snapshot deltas update it in place.
+"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+
+SORT_OPTIONS = ["Default", "Price: Low to High", "Price: High to Low", "Newest", "Oldest"]
+FACETS = ("category", "condition")
+
+
+def _price(item):
+  return float(item.get("price") or 0.0)
+
+
+def _created(item):
+  """created_at as a sortable number (listings without one sort as the oldest)"""
+  created_at = item.get("created_at")
+  return created_at.timestamp() if isinstance(created_at, datetime) else -np.inf
+
+
+def _selected(value):
+  return value not in (None, "", "All")
+
+
+class FacetIndex:
+  """
+  Each listing has a slot; masks are indexed by slot and the sort orders
+  hold slots. Removing a listing frees its slot for the next insert.
+  The Default order is the snapshot order (created_at, oldest first).
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._clear()
+    self.version = None  # snapshot version the index reflects
+
+  def _clear(self, capacity=1024):
+    self._items = [None] * capacity        # slot -> listing
+    self._slots = {}                       # listing id -> slot
+    self._free = list(range(capacity - 1, -1, -1))
+    self._live = np.zeros(capacity, dtype=bool)
+    self._masks = {facet: {} for facet in FACETS}   # facet -> value -> mask
+    self._price_keys = np.zeros(0)                  # sorted prices
+    self._price_slots = np.zeros(0, dtype=np.int64) # slots in price order
+    self._created_keys = np.zeros(0)
+    self._created_slots = np.zeros(0, dtype=np.int64)
+
+  # *****************************
+  # Maintenance
+  # *****************************
+  def on_snapshot(self, snapshot, delta=None):
+    """Snapshot store listener: bulk build without a delta, else incremental"""
+    with self._lock:
+      if delta is None:
+        self._build(snapshot.listings)
+      else:
+        for listing_id in delta.deleted:
+          self._remove(listing_id)
+        for item in delta.inserted + delta.updated:
+          self._remove(item["id"])
+          self._add(item)
+      self.version = snapshot.version
+
+  def _build(self, listings):
+    count = len(listings)
+    self._clear(max(1024, 2 * count))
+    self._free = self._free[:-count] if count else self._free
+    self._items[:count] = listings
+    self._slots = {item["id"]: slot for slot, item in enumerate(listings)}
+    self._live[:count] = True
+    for facet in FACETS:
+      values = [item.get(facet) for item in listings]
+      for value in set(values):
+        mask = np.zeros(len(self._live), dtype=bool)
+        mask[:count] = [v == value for v in values]
+        self._masks[facet][value] = mask
+
+    prices = np.fromiter((_price(item) for item in listings), dtype=np.float64, count=count)
+    order = np.argsort(prices, kind="stable")
+    self._price_keys, self._price_slots = prices[order], order.astype(np.int64)
+    created = np.fromiter((_created(item) for item in listings), dtype=np.float64, count=count)
+    order = np.argsort(created, kind="stable")
+    self._created_keys, self._created_slots = created[order], order.astype(np.int64)
+
+  def _grow(self):
+    size = len(self._live)
+    self._items.extend([None] * size)
+    self._free.extend(range(2 * size - 1, size - 1, -1))
+    self._live = np.concatenate([self._live, np.zeros(size, dtype=bool)])
+    for masks in self._masks.values():
+      for value, mask in masks.items():
+        masks[value] = np.concatenate([mask, np.zeros(size, dtype=bool)])
+
+  def _add(self, item):
+    if not self._free:
+      self._grow()
+    slot = self._free.pop()
+    self._items[slot] = item
+    self._slots[item["id"]] = slot
+    self._live[slot] = True
+    for facet in FACETS:
+      mask = self._masks[facet].get(item.get(facet))
+      if mask is None:
+        mask = self._masks[facet][item.get(facet)] = np.zeros(len(self._live), dtype=bool)
+      mask[slot] = True
+
+    price, created = _price(item), _created(item)
+    at = np.searchsorted(self._price_keys, price, side="right")
+    self._price_keys = np.insert(self._price_keys, at, price)
+    self._price_slots = np.insert(self._price_slots, at, slot)
+    # New listings are the newest, so ties with created_at go after (snapshot order)
+    at = np.searchsorted(self._created_keys, created, side="right")
+    self._created_keys = np.insert(self._created_keys, at, created)
+    self._created_slots = np.insert(self._created_slots, at, slot)
+
+  def _remove(self, listing_id):
+    slot = self._slots.pop(listing_id, None)
+    if slot is None:
+      return
+    item = self._items[slot]
+    for facet in FACETS:
+      masks = self._masks[facet]
+      mask = masks[item.get(facet)]
+      mask[slot] = False
+      if not mask.any():
+        del masks[item.get(facet)]
+
+    self._price_keys, self._price_slots = self._without(self._price_keys, self._price_slots, _price(item), slot)
+    self._created_keys, self._created_slots = self._without(
+      self._created_keys, self._created_slots, _created(item), slot)
+    self._items[slot] = None
+    self._live[slot] = False
+    self._free.append(slot)
+
+  @staticmethod
+  def _without(keys, slots, key, slot):
+    """keys/slots with the entry for slot removed (searched among equal keys only)"""
+    lower, upper = np.searchsorted(keys, key, side="left"), np.searchsorted(keys, key, side="right")
+    at = lower + int(np.flatnonzero(slots[lower:upper] == slot)[0])
+    return np.delete(keys, at), np.delete(slots, at)
+
+  # *****************************
+  # Queries
+  # *****************************
+  def _mask(self, category=None, condition=None, skip=None):
+    mask = self._live
+    for facet, value in (("category", category), ("condition", condition)):
+      if facet != skip and _selected(value):
+        facet_mask = self._masks[facet].get(value)
+        if facet_mask is None:
+          return np.zeros(len(self._live), dtype=bool)
+        mask = mask & facet_mask
+    return mask
+
+  def _price_slice(self, price_range):
+    """Bounds of the price order holding prices within price_range (inclusive)"""
+    if price_range is None:
+      return 0, len(self._price_slots)
+    return (np.searchsorted(self._price_keys, price_range[0], side="left"),
+            np.searchsorted(self._price_keys, price_range[1], side="right"))
+
+  def _price_range(self, mask, price_range):
+    """mask limited to slots whose price falls in price_range"""
+    if price_range is None:
+      return mask
+    lower, upper = self._price_slice(price_range)
+    in_range = np.zeros(len(self._live), dtype=bool)
+    in_range[self._price_slots[lower:upper]] = True
+    return mask & in_range
+
+  def query(self, search="", category="All", condition="All", price_range=None, sort_option="Default"):
+    """Same filters and sort options as listing_filters.filter_and_sort, answered from the index"""
+    with self._lock:
+      if sort_option in ("Price: Low to High", "Price: High to Low"):
+        # A price range is a contiguous slice of the price order
+        lower, upper = self._price_slice(price_range)
+        keys, slots = self._price_keys[lower:upper], self._price_slots[lower:upper]
+        keep = self._mask(category, condition)[slots]
+        keys, slots = keys[keep], slots[keep]
+        if sort_option == "Price: High to Low":
+          # Equal prices keep snapshot order, as with sorted(reverse=True)
+          slots = slots[np.argsort(-keys, kind="stable")]
+      else:
+        mask = self._price_range(self._mask(category, condition), price_range)
+        order = self._created_slots[::-1] if sort_option == "Newest" else self._created_slots
+        slots = order[mask[order]]
+      items = self._items
+      listings = [items[slot] for slot in slots]
+
+    if search:
+      search = search.lower()
+      listings = [item for item in listings if search in item.get("title", "").lower()]
+    return listings
+
+  def facet_counts(self, category="All", condition="All", price_range=None):
+    """
+    {facet: {value: count}}; each facet is counted with the other filters
+    applied, so the counts show what selecting a value would return
+    """
+    with self._lock:
+      counts = {}
+      for facet in FACETS:
+        mask = self._price_range(self._mask(category, condition, skip=facet), price_range)
+        counts[facet] = {value: int(np.count_nonzero(mask & value_mask))
+                         for value, value_mask in self._masks[facet].items()}
+      return counts
+
+  def price_bounds(self):
+    """(cheapest, priciest) listing price, or None without listings"""
+    with self._lock:
+      if not len(self._price_keys):
+        return None
+      return float(self._price_keys[0]), float(self._price_keys[-1])
+
+  def stats(self):
+    return {"version": self.version, "listings": len(self._slots),
+            "categories": len(self._masks["category"]), "conditions": len(self._masks["condition"])}
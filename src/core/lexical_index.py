@@ -0,0 +1,184 @@
+"""
+In-process BM25 keyword index for listings
+
+Vector search alone misses exact keywords (model numbers, brands) and is
+unavailable when Bedrock is down. LexicalIndex keeps an inverted index over
+title, brand, description and category, built from the shared listing
+snapshot and updated with each snapshot delta.
+
+Field matches are weighted (title and brand count more than description),
+hyphenated or dotted tokens are also indexed joined up ("WH-1000XM4" ->
+"wh", "1000xm4", "wh1000xm4"), and results are scored with BM25.
+reciprocal_rank_fusion() merges the keyword and vector rankings.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+FIELD_WEIGHTS = {"title": 3.0, "brand": 2.0, "category": 1.0, "description": 1.0}
+
+STOPWORDS = frozenset(
+  "a an and are as at be by for from in is it of on or the to with".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+  tokens = []
+  for word in _WORD.findall((text or "").lower()):
+    parts = _PART.findall(word)
+    tokens.extend(part for part in parts if part not in STOPWORDS)
+    if len(parts) > 1:
+      tokens.append("".join(parts))
+  return tokens
+
+
+def reciprocal_rank_fusion(*rankings, k=60):
+  """
+  Fuses rankings (lists of ids, best first) by summing 1 / (k + rank).
+  Returns [(id, score)] best first.
+  """
+  scores = {}
+  for ranking in rankings:
+    for rank, listing_id in enumerate(ranking, start=1):
+      scores[listing_id] = scores.get(listing_id, 0.0) + 1.0 / (k + rank)
+  return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+class LexicalIndex:
+  """
+  Postings are kept in dicts for cheap incremental updates; the arrays used
+  for scoring are built per term on first use and cached until that term's
+  postings change, so a query is a few vectorised NumPy operations.
+
+  A full snapshot load only records the snapshot; the index is rebuilt by
+  the first search, so page loads do not pay for tokenizing the catalog.
+  """
+
+  def __init__(self, k1=1.2, b=0.75):
+    self.k1 = k1
+    self.b = b
+    self._lock = threading.Lock()
+    self._clear()
+    self._pending = None  # snapshot to rebuild from on the next search
+    self.version = None   # snapshot version the index reflects
+
+  def _clear(self):
+    self._postings = {}       # term -> {slot: weighted term frequency}
+    self._arrays = {}         # term -> (slots, frequencies), cached for scoring
+    self._terms = {}          # listing id -> terms of that listing
+    self._slots = {}          # listing id -> slot
+    self._ids = []            # slot -> listing id (None when free)
+    self._free = []
+    self._lengths = np.zeros(0, dtype=np.float64)
+    self._total_length = 0.0
+
+  # *****************************
+  # Maintenance
+  # *****************************
+  def on_snapshot(self, snapshot, delta=None):
+    """Snapshot store listener: full loads are indexed lazily, deltas in place"""
+    with self._lock:
+      if delta is None or self._pending is not None:
+        # The new snapshot already holds every change
+        self._pending = snapshot
+      else:
+        for listing_id in delta.deleted:
+          self._remove(listing_id)
+        for item in delta.inserted + delta.updated:
+          self._remove(item["id"])
+          self._add(item)
+      self.version = snapshot.version
+
+  def _rebuild(self):
+    snapshot, self._pending = self._pending, None
+    self._clear()
+    for item in snapshot:
+      self._add(item)
+
+  def _add(self, item):
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+      for token in tokenize(item.get(field)):
+        terms[token] += weight
+
+    if self._free:
+      slot = self._free.pop()
+      self._ids[slot] = item["id"]
+    else:
+      slot = len(self._ids)
+      self._ids.append(item["id"])
+      if slot >= len(self._lengths):
+        grown = np.zeros(max(1024, 2 * len(self._lengths)), dtype=np.float64)
+        grown[:len(self._lengths)] = self._lengths
+        self._lengths = grown
+
+    for term, frequency in terms.items():
+      self._postings.setdefault(term, {})[slot] = frequency
+      self._arrays.pop(term, None)
+    length = sum(terms.values())
+    self._lengths[slot] = length
+    self._total_length += length
+    self._slots[item["id"]] = slot
+    self._terms[item["id"]] = tuple(terms)
+
+  def _remove(self, listing_id):
+    slot = self._slots.pop(listing_id, None)
+    if slot is None:
+      return
+    for term in self._terms.pop(listing_id):
+      postings = self._postings[term]
+      del postings[slot]
+      if not postings:
+        del self._postings[term]
+      self._arrays.pop(term, None)
+    self._total_length -= self._lengths[slot]
+    self._lengths[slot] = 0.0
+    self._ids[slot] = None
+    self._free.append(slot)
+
+  def _term_arrays(self, term):
+    arrays = self._arrays.get(term)
+    if arrays is None:
+      postings = self._postings[term]
+      arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)))
+      self._arrays[term] = arrays
+    return arrays
+
+  # *****************************
+  # Queries
+  # *****************************
+  def search(self, query, k=None):
+    """[(listing id, BM25 score)] best first, for listings matching any query term"""
+    with self._lock:
+      if self._pending is not None:
+        self._rebuild()
+      count = len(self._slots)
+      terms = [term for term in set(tokenize(query)) if term in self._postings]
+      if not count or not terms:
+        return []
+      average = self._total_length / count
+      scores = np.zeros(len(self._ids), dtype=np.float64)
+      for term in terms:
+        slots, frequencies = self._term_arrays(term)
+        idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[slots] / average)
+        scores[slots] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+      matched = np.flatnonzero(scores)
+      if k is not None and k < len(matched):
+        matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+      matched = matched[np.argsort(-scores[matched], kind="stable")]
+      ids = self._ids
+      return [(ids[slot], float(scores[slot])) for slot in matched]
+
+  def stats(self):
+    return {"version": self.version, "listings": len(self._slots), "terms": len(self._postings),
+            "pending_rebuild": self._pending is not None}
@@ -0,0 +1,215 @@
+"""
+Typed listing model
+
+Listing rows are stored with lowercased, underscore-separated enum values
+("tech_and_gadgets") and shown with display labels ("Tech and Gadgets").
+The lookup tables below convert between the two with one dict lookup per
+field, and Listing keeps created_at as a real datetime (date_posted is only
+formatted when rendered).
+
+Listing supports the mapping operations the UI uses on session listings
+(item["title"], item.get("price"), item["title"] = ..., "image" in item),
+so pages can keep treating listings like the dicts they used to be.
+"""
+
+import difflib
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+DATE_FORMAT = "%d %B %Y, %H:%M"
+
+# Display labels offered by the UI; stored values are derived from them
+CATEGORY_LABELS = [
+  "Accomodation", "Clothing and Accessories", "Everything Else", "Food and Drink Containers",
+  "Furniture and Appliances", "Sports and Fitness", "Tech and Gadgets", "Textbooks and Study Materials",
+]
+CONDITION_LABELS = ["New", "Like New", "Used", "Heavily Used"]
+UNIVERSITY_LABELS = ["NUS", "NTU", "SMU", "Off campus"]
+DELIVERY_LABELS = ["Buyer Pickup", "Seller Delivery", "Third-party Delivery", "Other"]
+
+
+def to_stored(label):
+  return label.lower().replace(" ", "_")
+
+
+def _legacy_label(field, value):
+  """Formatting rule used before the lookup tables, for values outside the known labels"""
+  label = value.replace('_', ' ').title()
+  return label.replace('And', 'and') if field == "category" else label
+
+
+_LABELS = {
+  "category": CATEGORY_LABELS,
+  "condition": CONDITION_LABELS,
+  "university": UNIVERSITY_LABELS,
+  "delivery_option": DELIVERY_LABELS,
+}
+# stored value -> display label, per enum field
+ENUM_LABELS = {field: {to_stored(label): label for label in labels} for field, labels in _LABELS.items()}
+# display label -> stored value (shared: labels never collide across fields)
+ENUM_VALUES = {label: to_stored(label) for labels in _LABELS.values() for label in labels}
+
+
+# Values outside the tables are converted on the fly and never added to them:
+# they can come from LLM/tool input, which would grow the tables without bound
+def enum_label(field, value):
+  if value is None:
+    return None
+  label = ENUM_LABELS[field].get(value)
+  return label if label is not None else _legacy_label(field, value)
+
+
+def enum_value(label):
+  if label is None:
+    return None
+  value = ENUM_VALUES.get(label)
+  return value if value is not None else to_stored(label)
+
+
+def canonical_label(field, label):
+  """Display label for loosely typed input ("tech and gadgets" -> "Tech and Gadgets")"""
+  return enum_label(field, enum_value(label))
+
+
+def match_label(field, text):
+  """
+  Known display label closest to free text (e.g. from an LLM tool call),
+  or None when nothing is close: "furniture" -> "Furniture and Appliances",
+  "tech & gadgets" -> "Tech and Gadgets", "spaceships" -> None
+  """
+  if not text or not text.strip():
+    return None
+  labels = {label.lower(): label for label in _LABELS[field]}
+  key = " ".join(text.lower().replace("&", "and").replace("_", " ").split())
+  if key in labels:
+    return labels[key]
+  prefixed = [label for lowered, label in labels.items() if lowered.startswith(key)]
+  if len(prefixed) == 1:
+    return prefixed[0]
+  close = difflib.get_close_matches(key, labels, n=1, cutoff=0.6)
+  return labels[close[0]] if close else None
+
+
+def parse_timestamp(value):
+  if value is None or isinstance(value, datetime):
+    return value
+  return datetime.fromisoformat(value)
+
+
+@dataclass(slots=True)
+class Listing:
+  id: int = None
+  user: str = None
+  title: str = ""
+  description: str = ""
+  price: float = 0.0
+  age: int = None
+  reason: str = None
+  brand: str = None
+  negotiable: bool = False
+  university: str = None
+  address: str = None
+  delivery_option: str = None
+  category: str = None
+  condition: str = None
+  seller_email: str = None
+  created_at: datetime = None
+  updated_at: datetime = None
+  image: object = None
+
+  # *****************************
+  # Display values
+  # *****************************
+  @property
+  def date_posted(self):
+    return self.created_at.strftime(DATE_FORMAT) if self.created_at else None
+
+  @property
+  def price_negotiable(self):
+    return "Yes" if self.negotiable else "No"
+
+  # *****************************
+  # Mapping compatibility for the UI
+  # *****************************
+  def __getitem__(self, key):
+    if key not in _KEYS:
+      raise KeyError(key)
+    return getattr(self, key)
+
+  def __setitem__(self, key, value):
+    if key == "price_negotiable":
+      self.negotiable = value in (True, "Yes")
+    elif key in _FIELD_NAMES:
+      setattr(self, key, value)
+    else:
+      raise KeyError(key)
+
+  def __contains__(self, key):
+    return key in _KEYS
+
+  def get(self, key, default=None):
+    value = getattr(self, key, None) if key in _KEYS else None
+    return default if value is None else value
+
+  def keys(self):
+    return list(_KEYS)
+
+  def copy(self):
+    """Session-format dict (as produced before Listing existed)"""
+    return {key: self[key] for key in _KEYS}
+
+  # *****************************
+  # Row conversion
+  # *****************************
+  @classmethod
+  def from_row(cls, row, username=None, image=None):
+    return cls(
+      id = row.get("id"),
+      user = username,
+      title = row.get("title") or "",
+      description = row.get("description") or "",
+      price = row.get("price") or 0.0,
+      age = row.get("age"),
+      reason = row.get("reason"),
+      brand = row.get("brand"),
+      negotiable = bool(row.get("price_negotiable")),
+      university = enum_label("university", row.get("university")),
+      address = row.get("address"),
+      delivery_option = enum_label("delivery_option", row.get("delivery_option")),
+      category = enum_label("category", row.get("category")),
+      condition = enum_label("condition", row.get("condition")),
+      seller_email = row.get("seller_email"),
+      created_at = parse_timestamp(row.get("created_at")),
+      updated_at = parse_timestamp(row.get("updated_at")),
+      image = image,
+    )
+
+  @classmethod
+  def from_rows(cls, rows, usernames, image_for=None):
+    """
+    usernames: {user id: username}
+    image_for: optional callable(row) -> image value (handle, bytes or None)
+    """
+    return [cls.from_row(row, usernames.get(row.get("user")), image_for(row) if image_for else None)
+            for row in rows]
+
+
+_FIELD_NAMES = frozenset(f.name for f in fields(Listing)) - {"negotiable"}
+_KEYS = ("id", "user", "title", "description", "price", "age", "reason", "brand", "price_negotiable",
+         "university", "address", "delivery_option", "category", "condition", "seller_email",
+         "date_posted", "created_at", "updated_at", "image")
+
+# Listing fields written to the table as they are
+_PLAIN_COLUMNS = ("title", "description", "price", "age", "reason", "brand", "address", "seller_email")
+
+
+def listing_to_row(listing):
+  """
+  Table row for a listing in the session format (Listing or dict).
+  The caller sets `user` (id) and the image columns.
+  """
+  row = {column: listing.get(column) for column in _PLAIN_COLUMNS}
+  row["price_negotiable"] = listing.get("price_negotiable") in (True, "Yes")
+  for field in ENUM_LABELS:
+    row[field] = enum_value(listing.get(field))
+  return row
@@ -0,0 +1,41 @@
+"""
+Browse filters and sort options as a plain scan over the listings
+
+FacetIndex answers the same queries from precomputed masks and orders;
+DbHandler.filter_listings falls back to filter_and_sort when the index
+does not reflect the current snapshot (e.g. its snapshot listener failed).
+The tests and benchmarks use it as the reference behaviour.
+"""
+
+from datetime import datetime, timezone
+
+from src.core.facet_index import SORT_OPTIONS
+
+# Listings without a timestamp (e.g. not yet saved) sort as the oldest
+_NO_TIME = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def posted_at(item):
+  """Sort key on the real created_at datetime (date_posted is a display string)"""
+  return item.get("created_at") or _NO_TIME
+
+
+def filter_and_sort(listings, search="", category="All", condition="All", price_range=None, sort_option="Default"):
+  """Title search, category/condition/price filters and the Browse sort options"""
+  price_range = price_range or (0.0, float("inf"))
+  filtered_items = [item for item in listings if (
+    (search.lower() in item.get("title", "").lower()) and
+    (category == "All" or item.get("category", "") == category) and
+    (condition == "All" or item.get("condition", "") == condition) and
+    (price_range[0] <= item.get("price", 0.0) <= price_range[1])
+  )]
+
+  if sort_option == "Price: Low to High":
+    filtered_items = sorted(filtered_items, key=lambda x: x.get("price", 0.0))
+  elif sort_option == "Price: High to Low":
+    filtered_items = sorted(filtered_items, key=lambda x: x.get("price", 0.0), reverse=True)
+  elif sort_option == "Newest":
+    filtered_items = sorted(filtered_items, key=posted_at, reverse=True)
+  elif sort_option == "Oldest":
+    filtered_items = sorted(filtered_items, key=posted_at)
+  return filtered_items
@@ -0,0 +1,69 @@
+"""
+Lazy listing images for DbHandler
+
+Listing reads leave the image column out; each listing instead carries a
+ListingImage handle that fetches and decodes its picture only when the UI
+renders it. Decoded bytes are kept in a bounded, process-wide LRU.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ImageLRU:
+  """Thread-safe LRU of decoded image bytes, bounded by total size and entry count"""
+
+  def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=4096):
+    self.max_bytes = max_bytes
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._items = OrderedDict()
+    self._size = 0
+
+  def get(self, key):
+    with self._lock:
+      if key not in self._items:
+        return None
+      self._items.move_to_end(key)
+      return self._items[key]
+
+  def put(self, key, value):
+    size = len(value) if value else 0
+    if size > self.max_bytes:
+      return
+    with self._lock:
+      if key in self._items:
+        old = self._items.pop(key)
+        self._size -= len(old) if old else 0
+      self._items[key] = value
+      self._size += size
+      while self._size > self.max_bytes or len(self._items) > self.max_entries:
+        _, evicted = self._items.popitem(last=False)
+        self._size -= len(evicted) if evicted else 0
+
+  def discard(self, key):
+    with self._lock:
+      old = self._items.pop(key, None)
+      self._size -= len(old) if old else 0
+
+  def __contains__(self, key):
+    with self._lock:
+      return key in self._items
+
+
+class ListingImage:
+  """Handle to one listing's image; nothing is fetched until load() is called"""
+
+  __slots__ = ("listing_id", "image_hash", "_loader")
+
+  def __init__(self, listing_id, loader, image_hash=None):
+    self.listing_id = listing_id
+    self.image_hash = image_hash
+    self._loader = loader
+
+  def load(self, rendition="full"):
+    """Returns the image bytes ('small', 'medium' or 'full'), or None if there is no image"""
+    return self._loader(self.listing_id, rendition, self.image_hash)
+
+  def __repr__(self):
+    return f"ListingImage(listing_id={self.listing_id})"
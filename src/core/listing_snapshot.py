@@ -0,0 +1,185 @@
+"""
+Process-wide listing snapshot
+
+Pages used to keep their own get_listings() result in
+st.session_state.listings, so memory grew with every open session.
+DbHandler is shared by all sessions (st.cache_resource) and now keeps one
+immutable, versioned snapshot of the catalog; sessions only remember the
+version they last rendered.
+
+Snapshots are never modified in place: a refresh builds a new snapshot and
+swaps it in (copy-on-write), so a session still iterating the previous one
+is unaffected. Listing writes mark the current snapshot stale and the next
+reader refreshes it, once, under a lock.
+
+A refresh applies only the rows changed since the snapshot's watermark
+(DbHandler.get_listings_changed_since, backed by listing.updated_at and the
+listing_tombstone table). The full catalog is only loaded for the first
+snapshot, or when a delta cannot be fetched.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+
+@dataclass(slots=True)
+class ListingDelta:
+  """Listings changed after a watermark; deleted holds ids only"""
+  inserted: list = field(default_factory=list)
+  updated: list = field(default_factory=list)
+  deleted: list = field(default_factory=list)
+  watermark: object = None
+
+  def __len__(self):
+    return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+
+class ListingSnapshot:
+  __slots__ = ("version", "listings", "by_id", "watermark")
+
+  def __init__(self, version, listings, watermark=None):
+    self.version = version
+    self.listings = tuple(listings)
+    self.by_id = MappingProxyType({item["id"]: item for item in self.listings})
+    self.watermark = watermark
+
+  def __len__(self):
+    return len(self.listings)
+
+  def __iter__(self):
+    return iter(self.listings)
+
+  def get(self, listing_id):
+    return self.by_id.get(listing_id)
+
+  def unseen(self, delta):
+    """
+    delta without the changes this snapshot already has (rows re-fetched
+    by the sync overlap window, deletions of ids it does not hold)
+    """
+    def is_new(item):
+      current = self.by_id.get(item["id"])
+      return current is None or current["updated_at"] != item["updated_at"]
+
+    return ListingDelta(
+      inserted = [item for item in delta.inserted if is_new(item)],
+      updated = [item for item in delta.updated if is_new(item)],
+      deleted = [listing_id for listing_id in delta.deleted if listing_id in self.by_id],
+      watermark = delta.watermark,
+    )
+
+  def apply(self, version, delta):
+    """New snapshot with delta applied (this one is left untouched)"""
+    changed = {item["id"]: item for item in delta.inserted + delta.updated}
+    deleted = set(delta.deleted) - changed.keys()
+    listings = [changed.pop(item["id"], item) for item in self.listings if item["id"] not in deleted]
+    # Listings not in the snapshot yet are the newest, so they go last (created_at order)
+    listings.extend(changed.values())
+    watermark = max(filter(None, (self.watermark, delta.watermark)), default=None)
+    return ListingSnapshot(version, listings, watermark)
+
+
+class ListingSnapshotStore:
+  def __init__(self, max_age_seconds=None):
+    """max_age_seconds: snapshots older than this are delta-synced on the next read"""
+    self.max_age_seconds = max_age_seconds
+    self._lock = threading.Lock()
+    self._current = None
+    self._stale = True
+    self._synced_at = 0.0
+    self.version = 0
+    self.full_loads = 0
+    self.delta_syncs = 0
+    self.delta_rows = 0
+    self._listeners = []
+
+  def subscribe(self, listener):
+    """
+    listener(snapshot, delta) runs after every new snapshot, with the applied
+    ListingDelta, or None after a full load (derived indexes rebuild then)
+    """
+    with self._lock:
+      self._listeners.append(listener)
+      if self._current is not None:
+        listener(self._current, None)
+
+  def _notify(self, snapshot, delta):
+    for listener in self._listeners:
+      try:
+        listener(snapshot, delta)
+      except Exception as e:
+        print(f"Listing snapshot listener failed: {e}")
+
+  def _expired(self):
+    return self.max_age_seconds is not None and time.monotonic() - self._synced_at > self.max_age_seconds
+
+  def current(self, build, sync=None):
+    """
+    The current snapshot, refreshed when stale.
+    build() -> (listings, watermark) loads the full catalog;
+    sync(watermark) -> ListingDelta fetches only what changed since.
+    Concurrent readers share a single refresh.
+    """
+    snapshot = self._current
+    if snapshot is not None and not self._stale and not self._expired():
+      return snapshot
+
+    with self._lock:
+      if self._current is None or self._stale or self._expired():
+        # Cleared before refreshing so a write during the refresh marks it stale again
+        self._stale = False
+        try:
+          self._current = self._refresh(build, sync)
+        except Exception:
+          self._stale = True
+          raise
+        self._synced_at = time.monotonic()
+      return self._current
+
+  def _refresh(self, build, sync):
+    snapshot = self._current
+    if snapshot is not None and sync is not None and snapshot.watermark is not None:
+      try:
+        delta = snapshot.unseen(sync(snapshot.watermark))
+      except Exception as e:
+        print(f"Listing delta sync failed, reloading all listings: {e}")
+      else:
+        self.delta_syncs += 1
+        self.delta_rows += len(delta)
+        if not delta:
+          return snapshot
+        self.version += 1
+        updated = snapshot.apply(self.version, delta)
+        self._notify(updated, delta)
+        return updated
+
+    listings, watermark = build()
+    self.full_loads += 1
+    self.version += 1
+    snapshot = ListingSnapshot(self.version, listings, watermark)
+    self._notify(snapshot, None)
+    return snapshot
+
+  def invalidate(self):
+    """Called after listing writes; readers keep the old snapshot until they ask again"""
+    self._stale = True
+
+  def peek(self):
+    """The last built snapshot (possibly stale), without refreshing"""
+    return self._current
+
+  def is_current(self, version):
+    return not self._stale and self._current is not None and self._current.version == version
+
+  def stats(self):
+    snapshot = self._current
+    return {
+      "version": self.version,
+      "listings": len(snapshot) if snapshot is not None else 0,
+      "stale": self._stale,
+      "full_loads": self.full_loads,
+      "delta_syncs": self.delta_syncs,
+      "delta_rows": self.delta_rows,
+    }
@@ -0,0 +1,471 @@
+"""
+Offline stand-ins for DbHandler's external services
+
+Selected with KAIROS_BACKEND=offline. DbHandler then runs against:
+- OfflineDatabase: SQLite implementation of the `listing`,
+  `user_profile` and `listing_tombstone` tables behind the subset of the
+  supabase-py query builder that DbHandler uses (select/insert/update/delete,
+  eq, in_, is_, not_, or_, order, limit) and the SQL functions in sql/ (rpc)
+- OfflineEmbeddingClient: deterministic hashing embeddings behind the
+  Bedrock `invoke_model` call
+- LocalVectorIndex (src/core/vector_backends.py) for vectors
+- LocalBlobStore (src/core/blob_store.py) for images
+
+Every statement is counted in OfflineDatabase.round_trips so benchmarks
+can report how many calls a code path would make against Supabase.
+"""
+
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.core.price_stats import summarize_prices
+
+OFFLINE_EMBED_MODEL = "offline-hashing-v1"
+
+# Column name -> SQLite type; booleans are stored as integers and converted back on read
+SCHEMA = {
+  "listing": {
+    "id": "integer primary key autoincrement",
+    "created_at": "text",
+    "updated_at": "text",
+    "user": "integer",
+    "title": "text",
+    "description": "text",
+    "price": "real",
+    "age": "integer",
+    "reason": "text",
+    "brand": "text",
+    "price_negotiable": "boolean",
+    "university": "text",
+    "address": "text",
+    "delivery_option": "text",
+    "category": "text",
+    "condition": "text",
+    "seller_email": "text",
+    "image_base64": "text",
+    "image_hash": "text",
+    "embeddings": "text",
+  },
+  "user_profile": {
+    "id": "integer primary key autoincrement",
+    "username": "text unique",
+  },
+  # Filled on listing deletes, like the trigger in sql/002_listing_delta_sync.sql
+  "listing_tombstone": {
+    "id": "integer primary key",
+    "deleted_at": "text",
+  },
+}
+
+INDEXES = [
+  "create index if not exists listing_created_at_id on listing (created_at, id)",
+  "create index if not exists listing_user on listing (user)",
+  "create index if not exists listing_category on listing (category)",
+  "create index if not exists listing_updated_at_id on listing (updated_at, id)",
+  "create index if not exists listing_tombstone_deleted_at on listing_tombstone (deleted_at)",
+]
+
+
+def _now_iso():
+  return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+# *****************************
+# PostgREST filter parsing (for or_ strings)
+# *****************************
+def _split_top_level(expression):
+  parts, depth, quoted, current = [], 0, False, []
+  for char in expression:
+    if char == '"':
+      quoted = not quoted
+    elif not quoted and char == "(":
+      depth += 1
+    elif not quoted and char == ")":
+      depth -= 1
+    elif not quoted and char == "," and depth == 0:
+      parts.append("".join(current))
+      current = []
+      continue
+    current.append(char)
+  if current:
+    parts.append("".join(current))
+  return parts
+
+
+def _parse_value(raw):
+  raw = raw.strip()
+  if raw.startswith('"') and raw.endswith('"'):
+    return raw[1:-1]
+  if raw == "null":
+    return None
+  if re.fullmatch(r"-?\d+", raw):
+    return int(raw)
+  if re.fullmatch(r"-?\d+\.\d*", raw):
+    return float(raw)
+  return raw
+
+
+_SQL_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _logic_to_sql(expression, joiner="or"):
+  """Translates 'a.gt.1,and(b.eq.2,c.lt.3)' into a SQL clause and params"""
+  clauses, params = [], []
+  for part in _split_top_level(expression):
+    part = part.strip()
+    match = re.fullmatch(r"(and|or)\((.*)\)", part)
+    if match:
+      clause, sub_params = _logic_to_sql(match.group(2), match.group(1))
+      clauses.append(f"({clause})")
+      params += sub_params
+      continue
+    column, op, raw = part.split(".", 2)
+    value = _parse_value(raw)
+    if op == "is":
+      clauses.append(f'"{column}" is null' if value is None else f'"{column}" is not null')
+    else:
+      clauses.append(f'"{column}" {_SQL_OPS[op]} ?')
+      params.append(value)
+  return f" {joiner} ".join(clauses), params
+
+
+class OfflineQuery:
+  """Chainable query mirroring the supabase-py request builders"""
+
+  def __init__(self, database, table):
+    self.database = database
+    self.table = table
+    self.columns = list(SCHEMA[table])
+    self.action = "select"
+    self.payload = None
+    self.where = []
+    self.params = []
+    self.order_by = []
+    self.limit_count = None
+    self._negate_next = False
+
+  # --- actions ---
+  def select(self, columns="*"):
+    self.action = "select"
+    if columns.strip() != "*":
+      self.columns = [c.strip() for c in columns.split(",") if c.strip()]
+    return self
+
+  def insert(self, data):
+    self.action = "insert"
+    self.payload = data if isinstance(data, list) else [data]
+    return self
+
+  def update(self, data):
+    self.action = "update"
+    self.payload = data
+    return self
+
+  def delete(self):
+    self.action = "delete"
+    return self
+
+  # --- filters ---
+  @property
+  def not_(self):
+    self._negate_next = True
+    return self
+
+  def _add(self, clause, params=()):
+    if self._negate_next:
+      clause = f"not ({clause})"
+      self._negate_next = False
+    self.where.append(clause)
+    self.params += list(params)
+    return self
+
+  def eq(self, column, value):
+    return self._add(f'"{column}" = ?', [value])
+
+  def neq(self, column, value):
+    return self._add(f'"{column}" != ?', [value])
+
+  def gt(self, column, value):
+    return self._add(f'"{column}" > ?', [value])
+
+  def gte(self, column, value):
+    return self._add(f'"{column}" >= ?', [value])
+
+  def lt(self, column, value):
+    return self._add(f'"{column}" < ?', [value])
+
+  def lte(self, column, value):
+    return self._add(f'"{column}" <= ?', [value])
+
+  def in_(self, column, values):
+    values = list(values)
+    if not values:
+      return self._add("0")
+    return self._add(f'"{column}" in ({",".join("?" * len(values))})', values)
+
+  def is_(self, column, value):
+    if value in (None, "null"):
+      return self._add(f'"{column}" is null')
+    return self._add(f'"{column}" is ?', [value])
+
+  def or_(self, filters):
+    clause, params = _logic_to_sql(filters)
+    return self._add(f"({clause})", params)
+
+  def order(self, column, desc=False, **kwargs):
+    self.order_by.append(f'"{column}" {"desc" if desc else "asc"}')
+    return self
+
+  def limit(self, size, **kwargs):
+    self.limit_count = size
+    return self
+
+  def execute(self):
+    return self.database._execute(self)
+
+
+class OfflineResponse(SimpleNamespace):
+  def model_dump_json(self):
+    return json.dumps({"data": self.data, "count": None})
+
+
+class OfflineDatabase:
+  """SQLite-backed stand-in for the Supabase client (tables only)"""
+
+  def __init__(self, path=":memory:"):
+    self.path = path
+    self.round_trips = 0
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.row_factory = sqlite3.Row
+    for table, columns in SCHEMA.items():
+      spec = ", ".join(f'"{name}" {kind if kind != "boolean" else "integer"}'
+                       for name, kind in columns.items())
+      self._conn.execute(f'create table if not exists "{table}" ({spec})')
+      # Databases created by older versions get newly added columns
+      existing = {r["name"] for r in self._conn.execute(f'pragma table_info("{table}")')}
+      for name, kind in columns.items():
+        if name not in existing:
+          self._conn.execute(f'alter table "{table}" add column "{name}" {kind if kind != "boolean" else "integer"}')
+    for statement in INDEXES:
+      self._conn.execute(statement)
+    self._conn.commit()
+
+  def table(self, name):
+    if name not in SCHEMA:
+      raise ValueError(f"Offline database has no table '{name}'")
+    return OfflineQuery(self, name)
+
+  def rpc(self, name, params=None):
+    """Stand-ins for the SQL functions in sql/, called like supabase .rpc(name, params).execute()"""
+    handler = getattr(self, f"_rpc_{name}", None)
+    if handler is None:
+      raise ValueError(f"Offline database has no function '{name}'")
+    return SimpleNamespace(execute=lambda: handler(**(params or {})))
+
+  def _rpc_listing_price_stats(self, p_category=None, p_condition=None, p_university=None):
+    where, args = ["price > 0"], []
+    for column, value in (("category", p_category), ("condition", p_condition), ("university", p_university)):
+      if value is not None:
+        where.append(f'"{column}" = ?')
+        args.append(value)
+    with self._lock:
+      self.round_trips += 1
+      rows = self._conn.execute(
+        f'select price from "listing" where {" and ".join(where)} order by price', args).fetchall()
+    return OfflineResponse(data=[summarize_prices([r[0] for r in rows])])
+
+  def _decode(self, table, row):
+    item = dict(row)
+    for column, kind in SCHEMA[table].items():
+      if kind == "boolean" and item.get(column) is not None:
+        item[column] = bool(item[column])
+    return item
+
+  def _where(self, query):
+    return f" where {' and '.join(query.where)}" if query.where else ""
+
+  def _execute(self, query):
+    with self._lock:
+      self.round_trips += 1
+      table = query.table
+      if query.action == "select":
+        columns = ", ".join(f'"{c}"' for c in query.columns)
+        sql = f'select {columns} from "{table}"{self._where(query)}'
+        if query.order_by:
+          sql += " order by " + ", ".join(query.order_by)
+        if query.limit_count is not None:
+          sql += f" limit {int(query.limit_count)}"
+        rows = self._conn.execute(sql, query.params).fetchall()
+        return OfflineResponse(data=[self._decode(table, r) for r in rows])
+
+      if query.action == "insert":
+        inserted = []
+        for data in query.payload:
+          data = dict(data)
+          if table == "listing":
+            data.setdefault("created_at", _now_iso())
+            data.setdefault("updated_at", data["created_at"])
+          columns = [c for c in data if c in SCHEMA[table]]
+          cursor = self._conn.execute(
+            f'insert into "{table}" ({", ".join(f"{chr(34)}{c}{chr(34)}" for c in columns)}) '
+            f'values ({", ".join("?" * len(columns))})',
+            [data[c] for c in columns]
+          )
+          inserted.append(cursor.lastrowid)
+        self._conn.commit()
+        return OfflineResponse(data=self._rows_by_id(table, inserted))
+
+      if query.action == "update":
+        data = {c: v for c, v in query.payload.items() if c in SCHEMA[table] and c != "id"}
+        if table == "listing":
+          data["updated_at"] = _now_iso()
+        ids = [r[0] for r in self._conn.execute(
+          f'select id from "{table}"{self._where(query)}', query.params).fetchall()]
+        if data and ids:
+          assignments = ", ".join(f'"{c}" = ?' for c in data)
+          self._conn.execute(
+            f'update "{table}" set {assignments} where id in ({",".join("?" * len(ids))})',
+            list(data.values()) + ids
+          )
+          self._conn.commit()
+        return OfflineResponse(data=self._rows_by_id(table, ids))
+
+      if query.action == "delete":
+        deleted = self._conn.execute(
+          f'select * from "{table}"{self._where(query)}', query.params).fetchall()
+        self._conn.execute(f'delete from "{table}"{self._where(query)}', query.params)
+        if table == "listing" and deleted:
+          deleted_at = _now_iso()
+          self._conn.executemany(
+            'insert or replace into "listing_tombstone" (id, deleted_at) values (?, ?)',
+            [(r["id"], deleted_at) for r in deleted]
+          )
+        self._conn.commit()
+        return OfflineResponse(data=[self._decode(table, r) for r in deleted])
+
+      raise ValueError(f"Unsupported offline action '{query.action}'")
+
+  def _rows_by_id(self, table, ids):
+    if not ids:
+      return []
+    rows = self._conn.execute(
+      f'select * from "{table}" where id in ({",".join("?" * len(ids))}) order by id', ids).fetchall()
+    return [self._decode(table, r) for r in rows]
+
+
+class OfflineEmbeddingClient:
+  """
+  Deterministic stand-in for Bedrock embeddings: signed feature hashing of
+  word unigrams and bigrams into `dimension` buckets, L2-normalized.
+  Texts that share words land close together, so semantic search still ranks sensibly.
+  """
+
+  def __init__(self, dimension=1536):
+    self.dimension = dimension
+    self.calls = 0
+
+  def embed(self, text):
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = [0.0] * self.dimension
+    for feature in features:
+      digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+      bucket = int.from_bytes(digest[:4], "little") % self.dimension
+      vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+  def invoke_model(self, body, modelId=None, accept=None, contentType=None):
+    self.calls += 1
+    text = json.loads(body)["inputText"]
+    payload = json.dumps({"embedding": self.embed(text)}).encode("utf-8")
+    return {"body": io.BytesIO(payload)}
+
+
+# *****************************
+# Seed data for offline runs and benchmarks
+# *****************************
+SEED_ITEMS = {
+  "tech_and_gadgets": ["MacBook Air M2", "iPad Pro", "Logitech Mouse", "Sony Headphones",
+                       "Gaming Monitor", "Mechanical Keyboard", "Desk Fan", "Portable Charger"],
+  "furniture_and_appliances": ["Study Desk", "Office Chair", "Bookshelf", "Rice Cooker",
+                               "Portable Aircon", "Mini Fridge", "Standing Lamp"],
+  "textbooks_and_study_materials": ["Calculus Textbook", "Linear Algebra Notes", "Economics Textbook",
+                                    "Graphing Calculator", "Organic Chemistry Guide"],
+  "clothing_and_accessories": ["Winter Jacket", "Running Shoes", "Backpack", "Hall Jersey"],
+  "sports_and_fitness": ["Yoga Mat", "Badminton Racket", "Dumbbell Set", "Foldable Bicycle"],
+  "food_and_drink_containers": ["Thermos Flask", "Lunch Box", "Water Bottle"],
+  "accomodation": ["Room Sublet", "Hall Room Swap"],
+  "everything_else": ["Guitar", "Board Game", "Plant Pot"],
+}
+SEED_BRANDS = ["Apple", "Sony", "Logitech", "IKEA", "Xiaomi", "Nike", "Muji", "Samsung", "Generic"]
+SEED_CONDITIONS = ["new", "like_new", "used", "heavily_used"]
+SEED_UNIVERSITIES = ["nus", "ntu", "smu", "off_campus"]
+SEED_DELIVERY = ["buyer_pickup", "seller_delivery", "third-party_delivery"]
+
+
+def generate_listing_rows(count, user_ids, seed=0, start=None):
+  """Yields realistic listing rows (table format) with deterministic content"""
+  rng = random.Random(seed)
+  start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+  categories = list(SEED_ITEMS)
+  for i in range(count):
+    category = rng.choice(categories)
+    item = rng.choice(SEED_ITEMS[category])
+    brand = rng.choice(SEED_BRANDS)
+    condition = rng.choice(SEED_CONDITIONS)
+    yield {
+      "created_at": (start + timedelta(minutes=7 * i + rng.randint(0, 6))).isoformat(timespec="microseconds"),
+      "user": rng.choice(user_ids),
+      "title": f"{brand} {item}",
+      "description": f"{condition.replace('_', ' ').title()} {item.lower()} by {brand}, "
+                     f"well kept and ready for pickup. Listing #{i}.",
+      "price": round(rng.uniform(5, 1500), 2),
+      "age": rng.randint(0, 48),
+      "reason": rng.choice(["Graduating", "Upgrading", "Moving out", "No longer needed"]),
+      "brand": brand,
+      "price_negotiable": rng.random() < 0.5,
+      "university": rng.choice(SEED_UNIVERSITIES),
+      "address": f"Block {rng.randint(1, 30)}",
+      "delivery_option": rng.choice(SEED_DELIVERY),
+      "category": category,
+      "condition": condition,
+      "seller_email": f"seller{i}@u.example.edu",
+      "image_base64": None,
+      "image_hash": None,
+    }
+
+
+def seed_offline_catalog(db_handler, listing_count=1000, user_count=50, seed=0,
+                         batch_size=1000, index_vectors=True):
+  """Fills an offline DbHandler with users and listings (and their vectors)"""
+  db_client = db_handler.db_client
+  existing = db_client.table("user_profile").select("id").execute().data
+  if not existing:
+    db_client.table("user_profile").insert(
+      [{"username": f"student{i:03d}"} for i in range(user_count)]).execute()
+  user_ids = [row["id"] for row in db_client.table("user_profile").select("id").execute().data]
+
+  batch = []
+  for row in generate_listing_rows(listing_count, user_ids, seed=seed):
+    batch.append(row)
+    if len(batch) >= batch_size:
+      db_client.table("listing").insert(batch).execute()
+      batch = []
+  if batch:
+    db_client.table("listing").insert(batch).execute()
+
+  if index_vectors:
+    for page in db_handler.iter_listing_pages(page_size=batch_size):
+      db_handler.index_listings(page, skip_unchanged=False)
+  db_handler.users.invalidate()
+  return listing_count
@@ -0,0 +1,190 @@
+"""
+Market price statistics
+
+summarize_prices() computes the same summary as the listing_price_stats
+SQL function (sql/003_listing_price_stats.sql): count, mean, min, max,
+median and the 25th/75th/90th percentiles, with percentiles interpolated
+like Postgres percentile_cont. It backs the offline database and the
+fallback used when the function has not been deployed.
+
+PriceIndex keeps the same statistics precomputed in memory for
+fine-grained comparables (category, condition and age bucket).
+"""
+
+import bisect
+import heapq
+import threading
+
+STAT_KEYS = ("count", "mean", "min", "max", "median", "p25", "p75", "p90")
+PERCENTILES = {"median": 0.5, "p25": 0.25, "p75": 0.75, "p90": 0.9}
+
+
+def percentile(sorted_prices, fraction):
+  """Linear interpolation between the closest ranks (percentile_cont)"""
+  if not sorted_prices:
+    return None
+  position = fraction * (len(sorted_prices) - 1)
+  lower = int(position)
+  upper = min(lower + 1, len(sorted_prices) - 1)
+  return sorted_prices[lower] + (sorted_prices[upper] - sorted_prices[lower]) * (position - lower)
+
+
+def summarize_prices(sorted_prices):
+  """Summary row for prices sorted ascending (None for the empty set, like SQL aggregates)"""
+  count = len(sorted_prices)
+  summary = {
+    "count": count,
+    "mean": sum(sorted_prices) / count if count else None,
+    "min": sorted_prices[0] if count else None,
+    "max": sorted_prices[-1] if count else None,
+  }
+  for key, fraction in PERCENTILES.items():
+    summary[key] = percentile(sorted_prices, fraction)
+  return summary
+
+
+def normalize_stats(row):
+  """Stats row from the database with missing values as 0.0, rounded to cents"""
+  row = row or {}
+  stats = {"count": int(row.get("count") or 0)}
+  for key in STAT_KEYS[1:]:
+    stats[key] = round(float(row.get(key) or 0.0), 2)
+  return stats
+
+
+# *****************************
+# In-memory price distribution index
+# *****************************
+# (label, lower, upper) in months; a listing's age falls in [lower, upper)
+AGE_BUCKETS = (
+  ("0-6 months", 0, 6),
+  ("6-12 months", 6, 12),
+  ("1-2 years", 12, 24),
+  ("2+ years", 24, None),
+)
+
+
+def age_bucket(age):
+  """Index of the age bucket for an age in months (unknown ages count as the oldest)"""
+  if age is None:
+    return len(AGE_BUCKETS) - 1
+  for index, (_, lower, upper) in enumerate(AGE_BUCKETS):
+    if upper is None or age < upper:
+      return index
+  return len(AGE_BUCKETS) - 1
+
+
+def _buckets_under(max_age):
+  """Buckets overlapping ages below max_age months"""
+  if max_age is None:
+    return None
+  return {index for index, (_, lower, _) in enumerate(AGE_BUCKETS) if lower < max_age}
+
+
+class PriceIndex:
+  """
+  Sorted price arrays per (category, condition, age bucket), built from the
+  shared listing snapshot and updated with each snapshot delta, so writes
+  cost O(bucket size) and never trigger a rescan.
+
+  Queries name a category and optionally a condition and a maximum age in
+  months (resolved to the age buckets it overlaps, e.g. max_age=12 covers
+  "0-6 months" and "6-12 months"). The merged array for a query is cached until the next
+  write, so percentile, rank and histogram lookups are binary searches.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._prices = {}     # (category, condition, bucket) -> sorted prices
+    self._entries = {}    # listing id -> (key, price)
+    self._merged = {}     # (category, condition, max_age) -> sorted tuple
+    self.version = None   # snapshot version the index reflects
+
+  # *****************************
+  # Maintenance
+  # *****************************
+  def on_snapshot(self, snapshot, delta=None):
+    """Snapshot store listener: full rebuild without a delta, else incremental"""
+    with self._lock:
+      if delta is None:
+        self._prices, self._entries = {}, {}
+        for item in snapshot:
+          self._add(item)
+      else:
+        for listing_id in delta.deleted:
+          self._remove(listing_id)
+        for item in delta.inserted + delta.updated:
+          self._remove(item["id"])
+          self._add(item)
+      self._merged = {}
+      self.version = snapshot.version
+
+  def _add(self, item):
+    price = item.get("price")
+    if not price or price <= 0:
+      return
+    key = (item.get("category"), item.get("condition"), age_bucket(item.get("age")))
+    bisect.insort(self._prices.setdefault(key, []), float(price))
+    self._entries[item["id"]] = (key, float(price))
+
+  def _remove(self, listing_id):
+    entry = self._entries.pop(listing_id, None)
+    if entry is None:
+      return
+    key, price = entry
+    prices = self._prices[key]
+    del prices[bisect.bisect_left(prices, price)]
+    if not prices:
+      del self._prices[key]
+
+  # *****************************
+  # Queries
+  # *****************************
+  def prices(self, category, condition=None, max_age=None):
+    """Sorted prices of the matching listings (None for category/condition means any; cached until the next write)"""
+    query = (category, condition, max_age)
+    with self._lock:
+      merged = self._merged.get(query)
+      if merged is None:
+        buckets = _buckets_under(max_age)
+        merged = tuple(heapq.merge(*(
+          prices for (cat, cond, bucket), prices in self._prices.items()
+          if (category is None or cat == category) and (condition is None or cond == condition)
+          and (buckets is None or bucket in buckets)
+        )))
+        self._merged[query] = merged
+      return merged
+
+  def summary(self, category, condition=None, max_age=None):
+    return normalize_stats(summarize_prices(self.prices(category, condition, max_age)))
+
+  def percentile(self, fraction, category, condition=None, max_age=None):
+    return percentile(self.prices(category, condition, max_age), fraction)
+
+  def rank(self, price, category, condition=None, max_age=None):
+    """Where `price` sits among comparable listings"""
+    prices = self.prices(category, condition, max_age)
+    cheaper = bisect.bisect_left(prices, price)
+    return {
+      "count": len(prices),
+      "cheaper": cheaper,
+      "pricier": len(prices) - bisect.bisect_right(prices, price),
+      "percentile": round(100.0 * cheaper / len(prices), 1) if prices else None,
+    }
+
+  def histogram(self, category, condition=None, max_age=None, bins=5):
+    """Equal-width price bins between the cheapest and priciest comparable listing"""
+    prices = self.prices(category, condition, max_age)
+    if not prices:
+      return []
+    low, high = prices[0], prices[-1]
+    if low == high:
+      return [{"from": round(low, 2), "to": round(high, 2), "count": len(prices)}]
+    width = (high - low) / bins
+    edges = [low + width * i for i in range(bins)] + [high]
+    counts = [bisect.bisect_left(prices, edge) for edge in edges[:-1]] + [len(prices)]
+    return [{"from": round(edges[i], 2), "to": round(edges[i + 1], 2), "count": counts[i + 1] - counts[i]}
+            for i in range(bins)]
+
+  def stats(self):
+    return {"version": self.version, "groups": len(self._prices), "listings": len(self._entries)}
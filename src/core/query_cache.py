@@ -0,0 +1,73 @@
+"""
+Versioned result cache for vector queries
+
+Ranked (id, distance) results are cached per (query text, limit, filters)
+together with the collection version they were computed against. Listing
+writes bump the version, so stale results are never served and no TTL is
+needed.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from src.core.embedding_cache import normalize_text
+
+
+class QueryResultCache:
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+    self.version = 0
+    self.hits = 0
+    self.misses = 0
+    self.stale = 0
+
+  @staticmethod
+  def make_key(text, limit, filters=None):
+    return (normalize_text(text), limit, json.dumps(filters or {}, sort_keys=True, default=str))
+
+  def bump_version(self):
+    """Called on every listing write; older entries become stale and are dropped on lookup"""
+    with self._lock:
+      self.version += 1
+      return self.version
+
+  def get(self, text, limit, filters=None):
+    key = self.make_key(text, limit, filters)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+      version, results = entry
+      if version != self.version:
+        self.stale += 1
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return list(results)
+
+  def put(self, text, limit, filters, results, version):
+    """Stores results computed against `version` (dropped if a write happened meanwhile)"""
+    key = self.make_key(text, limit, filters)
+    with self._lock:
+      if version != self.version:
+        return
+      self._entries[key] = (version, tuple(results))
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def stats(self):
+    lookups = self.hits + self.misses + self.stale
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "stale": self.stale,
+      "hit_rate": self.hits / lookups if lookups else 0.0,
+      "entries": len(self._entries),
+      "version": self.version,
+    }
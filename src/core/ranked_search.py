@@ -0,0 +1,38 @@
+"""
+Ranked, paginated search results
+
+DbHandler.ranked_search ranks a bounded candidate pool (keyword hits fused
+with the vector top-k) and returns one page of it as a SearchPage: the
+hydrated listings with their scores and a cursor for the next page. Page
+cost depends on the pool size, not on the size of the catalog.
+"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class SearchPage:
+  results: list = field(default_factory=list)   # [(listing, score)], best first
+  next_cursor: str = None                        # None on the last page
+  total: int = 0                                 # size of the ranked candidate pool
+
+  def listings(self):
+    return [listing for listing, _ in self.results]
+
+
+def decode_cursor(cursor):
+  """Offset into the ranking (cursors are opaque strings to callers)"""
+  if not cursor:
+    return 0
+  try:
+    return max(0, int(cursor))
+  except ValueError:
+    raise ValueError(f"Invalid search cursor '{cursor}'") from None
+
+
+def paginate(ranking, limit, cursor=None):
+  """(page of ranking, next cursor or None)"""
+  offset = decode_cursor(cursor)
+  page = ranking[offset:offset + limit]
+  next_offset = offset + limit
+  return page, (str(next_offset) if next_offset < len(ranking) else None)
@@ -0,0 +1,100 @@
+"""
+Process-wide user directory for DbHandler
+
+Caches the id <-> username mapping from the `user_profile` table so listing
+reads and write paths do not pay one Supabase round-trip per row.
+Entries expire after a TTL; misses are resolved in a single batched query.
+The full user list is not cached: profiles are created outside the app,
+so a cached list would hide new users until it expired.
+"""
+
+import threading
+import time
+
+from src.utils.tracing import traced_methods
+
+
+@traced_methods("users", include_private=False)
+class UserDirectory:
+  """Thread-safe id <-> username cache backed by the user_profile table"""
+
+  def __init__(self, db_client, ttl_seconds=300):
+    self.db_client = db_client
+    self.ttl_seconds = ttl_seconds
+    self._lock = threading.Lock()
+    self._by_id = {}          # user id -> (username, expires_at)
+    self._by_username = {}    # username -> (user id, expires_at)
+
+  # *****************************
+  # Internal helpers
+  # *****************************
+  def _store(self, rows, now):
+    expires_at = now + self.ttl_seconds
+    with self._lock:
+      for row in rows:
+        self._by_id[row["id"]] = (row["username"], expires_at)
+        self._by_username[row["username"]] = (row["id"], expires_at)
+
+  def _lookup(self, table, key, now):
+    with self._lock:
+      entry = table.get(key)
+    if entry and entry[1] > now:
+      return entry[0]
+    return None
+
+  # *****************************
+  # Lookups
+  # *****************************
+  def usernames_for(self, user_ids):
+    """Return {user_id: username}, fetching every cache miss in one query"""
+    now = time.monotonic()
+    resolved = {}
+    missing = set()
+    for user_id in set(user_ids):
+      if user_id is None:
+        continue
+      username = self._lookup(self._by_id, user_id, now)
+      if username is None:
+        missing.add(user_id)
+      else:
+        resolved[user_id] = username
+
+    if missing:
+      res = (self.db_client.table("user_profile")
+             .select("id, username")
+             .in_("id", list(missing))
+             .execute())
+      self._store(res.data, now)
+      for row in res.data:
+        resolved[row["id"]] = row["username"]
+
+    return resolved
+
+  def username_for(self, user_id):
+    return self.usernames_for([user_id]).get(user_id)
+
+  def userid_for(self, username):
+    now = time.monotonic()
+    user_id = self._lookup(self._by_username, username, now)
+    if user_id is not None:
+      return user_id
+
+    res = (self.db_client.table("user_profile")
+           .select("id, username")
+           .eq("username", username)
+           .execute())
+    self._store(res.data, now)
+    return res.data[0]["id"] if res.data else None
+
+  def all_users(self):
+    """Return every user as [{'id', 'username'}] (always fetched; warms the id lookups)"""
+    res = (self.db_client.table("user_profile")
+           .select("id, username")
+           .execute())
+    self._store(res.data, time.monotonic())
+    return [{"id": row["id"], "username": row["username"]} for row in res.data]
+
+  def invalidate(self):
+    with self._lock:
+      self._by_id.clear()
+      self._by_username.clear()
@@ -0,0 +1,418 @@
+"""
+Vector store backends for DbHandler
+
+Both backends expose the subset of the vecs Collection API that DbHandler
+uses (upsert, fetch, query, delete, create_index), so the rest of the code
+does not care where vectors live:
+
+- VecsCollection: the `listing` collection in Postgres/pgvector (default)
+- LocalVectorIndex: an in-process NumPy index with exact cosine top-k via
+  matrix products, an optional HNSW-style neighbour graph for large
+  catalogs, and snapshot files for fast start-up
+
+Selected with VECTOR_BACKEND=vecs|local (see make_vector_backend).
+"""
+
+import heapq
+import json
+import os
+import random
+import threading
+
+import numpy as np
+
+from src.core.clients import CONNECTION_ERRORS
+from src.core.vector_filters import MetadataColumns
+from src.utils.tracing import traced_methods
+
+
+@traced_methods("vecs")
+class VecsCollection:
+  """Lazily opened vecs collection, reused across calls"""
+
+  def __init__(self, vec_client_factory, name="listing", dimension=1536, reconnect=None):
+    """
+    vec_client_factory: returns the (pooled) vecs.Client
+    reconnect: called after a connection failure, before the call is retried once
+    """
+    self.vec_client_factory = vec_client_factory
+    self.name = name
+    self.dimension = dimension
+    self.reconnect = reconnect
+    self._collection = None
+
+  @property
+  def collection(self):
+    if self._collection is None:
+      vec_client = self.vec_client_factory()
+      self._collection = vec_client.get_or_create_collection(name=self.name, dimension=self.dimension)
+    return self._collection
+
+  def _call(self, method, **kwargs):
+    try:
+      return getattr(self.collection, method)(**kwargs)
+    except CONNECTION_ERRORS as e:
+      if self.reconnect is None:
+        raise
+      print(f"Vector store connection failed ({type(e).__name__}); reconnecting")
+      self.reconnect()
+      self._collection = None
+      return getattr(self.collection, method)(**kwargs)
+
+  def upsert(self, records):
+    return self._call("upsert", records=records)
+
+  def fetch(self, ids):
+    return self._call("fetch", ids=ids)
+
+  def query(self, data, limit=10, filters=None, include_value=False, include_metadata=False):
+    return self._call("query", data=data, limit=limit, filters=filters,
+                      include_value=include_value, include_metadata=include_metadata)
+
+  def delete(self, ids=None, filters=None):
+    return self._call("delete", ids=ids, filters=filters)
+
+  def create_index(self):
+    return self._call("create_index")
+
+
+class _NeighborGraph:
+  """
+  Single-layer HNSW-style proximity graph over the rows of a LocalVectorIndex.
+  Each row links to its m closest rows found by beam search at insert time;
+  queries walk the graph from a few entry points instead of scanning every row.
+  """
+
+  def __init__(self, m=16, ef_construction=64, seeds=4):
+    self.m = m
+    self.ef_construction = ef_construction
+    self.seeds = seeds
+    self.neighbors = []
+
+  def __len__(self):
+    return len(self.neighbors)
+
+  def add(self, vectors, row):
+    if not self.neighbors:
+      self.neighbors.append([])
+      return
+    found = self.search(vectors, vectors[row], self.ef_construction)
+    chosen = [r for r, _ in found[:self.m]]
+    self.neighbors.append(chosen)
+    for other in chosen:
+      links = self.neighbors[other]
+      links.append(row)
+      if len(links) > 2 * self.m:
+        # Keep the closest links so hubs do not grow without bound
+        sims = vectors[links] @ vectors[other]
+        keep = np.argsort(-sims)[:2 * self.m]
+        self.neighbors[other] = [links[i] for i in keep]
+
+  def search(self, vectors, query, ef):
+    """Returns up to ef (row, similarity) pairs, most similar first"""
+    n = len(self.neighbors)
+    entries = {0} | {random.randrange(n) for _ in range(min(self.seeds, n))}
+    visited = set(entries)
+    entry_rows = list(entries)
+    entry_sims = vectors[entry_rows] @ query
+    candidates = [(-float(s), r) for r, s in zip(entry_rows, entry_sims)]
+    heapq.heapify(candidates)
+    results = [(float(s), r) for r, s in zip(entry_rows, entry_sims)]
+    heapq.heapify(results)
+    while len(results) > ef:
+      heapq.heappop(results)
+
+    while candidates:
+      neg_sim, row = heapq.heappop(candidates)
+      if len(results) >= ef and -neg_sim < results[0][0]:
+        break
+      fresh = [r for r in self.neighbors[row] if r not in visited]
+      if not fresh:
+        continue
+      visited.update(fresh)
+      for r, s in zip(fresh, vectors[fresh] @ query):
+        s = float(s)
+        if len(results) < ef or s > results[0][0]:
+          heapq.heappush(candidates, (-s, r))
+          heapq.heappush(results, (s, r))
+          if len(results) > ef:
+            heapq.heappop(results)
+
+    return [(r, s) for s, r in sorted(results, reverse=True)]
+
+
+@traced_methods("vectors", include_private=False)
+class LocalVectorIndex:
+  """In-process cosine index with the vecs Collection interface"""
+
+  def __init__(self, dimension=1536, path=None, graph_threshold=None, ef_search=128,
+               autosave_every=100):
+    """
+    path: snapshot file loaded at start-up and written by save()
+    graph_threshold: use the approximate neighbour graph for unfiltered
+                     queries once the index holds at least this many rows.
+                     Writes the graph cannot absorb (moved or deleted vectors)
+                     make it stale; queries then use the exact top-k while
+                     a new graph is built on a background thread.
+    autosave_every: write a snapshot after this many upserted/deleted records
+    """
+    self.dimension = dimension
+    self.path = path
+    self.graph_threshold = graph_threshold
+    self.ef_search = ef_search
+    self.autosave_every = autosave_every
+    self._lock = threading.RLock()
+    self._vectors = np.zeros((0, dimension), dtype=np.float32)
+    self._count = 0
+    self._ids = []
+    self._rows = {}
+    self._metadata = []
+    # Category/condition/price as NumPy columns for vectorized filters
+    self._columns = MetadataColumns()
+    self._graph = None
+    self._graph_version = None  # self._version the graph was built for
+    self._version = 0           # bumped by writes the graph does not reflect
+    self._rebuilding = False
+    self._unsaved = 0
+
+    if path and os.path.exists(path):
+      self.load(path)
+
+  def __len__(self):
+    return self._count
+
+  def _normalize(self, vector):
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+  def _ensure_capacity(self, size):
+    if size <= len(self._vectors):
+      return
+    capacity = max(size, 2 * len(self._vectors), 1024)
+    grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+    grown[:self._count] = self._vectors[:self._count]
+    self._vectors = grown
+
+  def _after_write(self, changed):
+    self._unsaved += changed
+    if self.path and self.autosave_every and self._unsaved >= self.autosave_every:
+      self.save()
+
+  # *****************************
+  # Writes
+  # *****************************
+  def upsert(self, records, skip_adapter=False):
+    with self._lock:
+      records = list(records)
+      self._ensure_capacity(self._count + len(records))
+      added = []
+      moved = False
+      for record_id, vector, metadata in records:
+        record_id = str(record_id)
+        vector = self._normalize(vector)
+        row = self._rows.get(record_id)
+        if row is None:
+          row = self._count
+          self._rows[record_id] = row
+          self._ids.append(record_id)
+          self._metadata.append(dict(metadata or {}))
+          self._columns.set(row, self._metadata[row])
+          self._count += 1
+          added.append(row)
+        else:
+          self._metadata[row] = dict(metadata or {})
+          self._columns.set(row, self._metadata[row])
+          if np.array_equal(self._vectors[row], vector):
+            continue  # metadata-only update: the graph links still hold
+          moved = True
+        self._vectors[row] = vector
+
+      if not moved and self._graph_current():
+        for row in added:
+          self._graph.add(self._vectors, row)
+      elif moved or added:
+        # A moved vector invalidates its graph links
+        self._version += 1
+      self._after_write(len(records))
+
+  def delete(self, ids=None, filters=None):
+    with self._lock:
+      if ids is None:
+        rows = self._columns.rows(filters, self._metadata, self._count) if filters else range(self._count)
+        ids = [self._ids[row] for row in rows]
+      deleted = []
+      for record_id in ids:
+        record_id = str(record_id)
+        row = self._rows.pop(record_id, None)
+        if row is None:
+          continue
+        # Move the last row into the hole to keep the matrix dense
+        last = self._count - 1
+        if row != last:
+          self._vectors[row] = self._vectors[last]
+          self._ids[row] = self._ids[last]
+          self._metadata[row] = self._metadata[last]
+          self._columns.move(last, row)
+          self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._metadata.pop()
+        self._count -= 1
+        deleted.append(record_id)
+
+      if deleted:
+        self._version += 1
+        self._after_write(len(deleted))
+      return deleted
+
+  # *****************************
+  # Reads
+  # *****************************
+  def fetch(self, ids):
+    with self._lock:
+      return [(record_id, self._vectors[self._rows[record_id]].copy(),
+               dict(self._metadata[self._rows[record_id]]))
+              for record_id in map(str, ids) if record_id in self._rows]
+
+  def query(self, data, limit=10, filters=None, include_value=False, include_metadata=False, **kwargs):
+    query = self._normalize(data)
+    with self._lock:
+      if self._count == 0:
+        return []
+
+      if filters:
+        rows = self._columns.rows(filters, self._metadata, self._count)
+        if len(rows) == 0:
+          return []
+        sims = self._vectors[rows] @ query
+        ranked = self._top_k(sims, limit)
+        hits = [(int(rows[i]), float(sims[i])) for i in ranked]
+      elif self._use_graph() and self._graph_current():
+        hits = self._graph.search(self._vectors, query, max(self.ef_search, limit))[:limit]
+      else:
+        if self._use_graph():
+          self._schedule_rebuild()
+        sims = self._vectors[:self._count] @ query
+        hits = [(int(i), float(sims[i])) for i in self._top_k(sims, limit)]
+
+      return [self._format(row, sim, include_value, include_metadata) for row, sim in hits]
+
+  def query_many(self, data, limit=10, block_size=1024):
+    """Exact top-k for many query vectors at once; returns one [(id, distance)] list per query"""
+    queries = np.stack([self._normalize(v) for v in data])
+    with self._lock:
+      results = []
+      matrix = self._vectors[:self._count]
+      for start in range(0, len(queries), block_size):
+        sims = queries[start:start + block_size] @ matrix.T
+        for row_sims in sims:
+          results.append([(self._ids[i], 1.0 - float(row_sims[i])) for i in self._top_k(row_sims, limit)])
+      return results
+
+  def create_index(self):
+    if self.graph_threshold:
+      self._build_graph()
+
+  def _top_k(self, sims, limit):
+    k = min(limit, len(sims))
+    if k <= 0:
+      return []
+    top = np.argpartition(-sims, k - 1)[:k]
+    return top[np.argsort(-sims[top])]
+
+  def _format(self, row, sim, include_value, include_metadata):
+    record = (self._ids[row],)
+    if include_value:
+      record += (1.0 - sim,)
+    if include_metadata:
+      record += (dict(self._metadata[row]),)
+    return record if len(record) > 1 else record[0]
+
+  # *****************************
+  # Neighbour graph
+  # *****************************
+  def _use_graph(self):
+    return bool(self.graph_threshold) and self._count >= self.graph_threshold
+
+  def _graph_current(self):
+    return self._graph is not None and self._graph_version == self._version
+
+  def _schedule_rebuild(self):
+    """Starts a background graph build unless one is running (caller holds the lock)"""
+    if self._rebuilding:
+      return
+    self._rebuilding = True
+
+    def rebuild():
+      try:
+        self._build_graph()
+      finally:
+        with self._lock:
+          self._rebuilding = False
+
+    threading.Thread(target=rebuild, name="vector-graph-rebuild", daemon=True).start()
+
+  def _build_graph(self):
+    """
+    Builds the graph over a copy of the vectors without holding the lock, so
+    reads and writes carry on meanwhile. The graph is installed only if no
+    write made it stale in the meantime (the next query then retries).
+    """
+    with self._lock:
+      version, vectors = self._version, self._vectors[:self._count].copy()
+    graph = _NeighborGraph()
+    for row in range(len(vectors)):
+      graph.add(vectors, row)
+    with self._lock:
+      if self._version == version:
+        self._graph, self._graph_version = graph, version
+
+  # *****************************
+  # Snapshots
+  # *****************************
+  def save(self, path=None):
+    path = path or self.path
+    with self._lock:
+      tmp_path = f"{path}.tmp.npz"
+      os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+      np.savez(
+        tmp_path,
+        vectors=self._vectors[:self._count],
+        ids=np.array(self._ids, dtype=str),
+        metadata=np.array(json.dumps(self._metadata)),
+      )
+      os.replace(tmp_path, path)
+      self._unsaved = 0
+
+  def load(self, path):
+    with np.load(path, allow_pickle=False) as snapshot:
+      vectors = snapshot["vectors"].astype(np.float32)
+      ids = [str(i) for i in snapshot["ids"]]
+      metadata = json.loads(str(snapshot["metadata"]))
+    with self._lock:
+      self._vectors = vectors
+      self._count = len(ids)
+      self._ids = ids
+      self._rows = {record_id: row for row, record_id in enumerate(ids)}
+      self._metadata = metadata
+      self._columns = MetadataColumns()
+      for row, record in enumerate(metadata):
+        self._columns.set(row, record)
+      self._graph = None
+      self._version += 1
+      self._unsaved = 0
+
+
+def make_vector_backend(vec_client_factory, dimension=1536, reconnect=None):
+  """Builds the vector backend selected by the VECTOR_BACKEND environment variable"""
+  backend = os.getenv("VECTOR_BACKEND", "vecs").lower()
+  if backend == "vecs":
+    return VecsCollection(vec_client_factory, name="listing", dimension=dimension, reconnect=reconnect)
+  if backend == "local":
+    threshold = os.getenv("VECTOR_GRAPH_THRESHOLD")
+    return LocalVectorIndex(
+      dimension=dimension,
+      path=os.getenv("VECTOR_INDEX_PATH", ".cache/listing_vectors.npz"),
+      graph_threshold=int(threshold) if threshold else None,
+    )
+  raise ValueError(f"Unknown VECTOR_BACKEND '{backend}'")
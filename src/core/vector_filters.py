@@ -0,0 +1,230 @@
+"""
+Listing metadata stored alongside each vector, and the filter syntax used
+to push listing attributes into the vector query.
+
+Callers pass plain filters such as
+    {"category": "Tech and Gadgets", "max_price": 500, "university": "NUS"}
+and build_vector_filters turns them into the vecs metadata filter syntax
+({"$and": [{"category": {"$eq": "tech_and_gadgets"}}, ...]}).
+matches_filter evaluates that syntax for one record, and MetadataColumns
+for every row of an in-process index at once.
+"""
+
+import numpy as np
+
+# Metadata fields stored in the same lowercased, underscore-separated form as the listing table
+ENUM_FIELDS = ("category", "condition", "university", "delivery_option")
+
+# Fields MetadataColumns keeps as NumPy columns (the common Browse/search filters)
+COLUMN_ENUM_FIELDS = ("category", "condition")
+COLUMN_NUMBER_FIELDS = ("price",)
+
+# Convenience range keys -> (metadata field, operator)
+RANGE_FILTERS = {
+  "min_price": ("price", "$gte"),
+  "max_price": ("price", "$lte"),
+  "min_age": ("age", "$gte"),
+  "max_age": ("age", "$lte"),
+}
+
+
+def to_enum(value):
+  return str(value).lower().replace(" ", "_")
+
+
+def listing_metadata(listing_object, content_hash):
+  """Metadata written to the vector store for one listing"""
+  metadata = {"content_hash": content_hash}
+  for field in ENUM_FIELDS:
+    if listing_object.get(field):
+      metadata[field] = to_enum(listing_object[field])
+  if listing_object.get("price") is not None:
+    metadata["price"] = float(listing_object["price"])
+  if listing_object.get("age") is not None:
+    metadata["age"] = int(listing_object["age"])
+  return metadata
+
+
+def build_vector_filters(filters):
+  """Converts plain listing filters to a vecs metadata filter (None when empty)"""
+  clauses = []
+  for key, value in (filters or {}).items():
+    if value is None or value == "" or value == []:
+      continue
+    if key in RANGE_FILTERS:
+      field, operator = RANGE_FILTERS[key]
+      clauses.append({field: {operator: float(value)}})
+    elif isinstance(value, dict):
+      clauses.append({key: value})
+    elif isinstance(value, (list, tuple, set)):
+      values = [to_enum(v) if key in ENUM_FIELDS else v for v in value]
+      clauses.append({key: {"$in": values}})
+    else:
+      clauses.append({key: {"$eq": to_enum(value) if key in ENUM_FIELDS else value}})
+
+  if not clauses:
+    return None
+  return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+_OPERATORS = {
+  "$eq": lambda value, arg: value == arg,
+  "$ne": lambda value, arg: value != arg,
+  "$lt": lambda value, arg: value < arg,
+  "$lte": lambda value, arg: value <= arg,
+  "$gt": lambda value, arg: value > arg,
+  "$gte": lambda value, arg: value >= arg,
+  "$in": lambda value, arg: value in arg,
+  "$contains": lambda value, arg: arg in value if isinstance(value, (list, str)) else False,
+}
+
+
+def matches_filter(metadata, vector_filter):
+  """Evaluates a vecs metadata filter against one record's metadata in Python"""
+  if not vector_filter:
+    return True
+  (key, value), = vector_filter.items()
+  if key == "$and":
+    return all(matches_filter(metadata, clause) for clause in value)
+  if key == "$or":
+    return any(matches_filter(metadata, clause) for clause in value)
+
+  (operator, arg), = value.items()
+  if key not in metadata:
+    return False
+  try:
+    return _OPERATORS[operator](metadata[key], arg)
+  except TypeError:
+    return False
+
+
+def _is_number(value):
+  return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+class MetadataColumns:
+  """
+  Per-row metadata of an in-process vector index as NumPy columns: enum
+  fields as integer codes and number fields as floats (-1/NaN when
+  missing). Filter clauses on these fields become vectorized masks; other
+  clauses fall back to matches_filter, only for the rows the masks kept.
+  Rows whose value a column cannot hold (e.g. a list) are checked with
+  matches_filter too, so results always equal matches_filter's.
+  """
+
+  def __init__(self, enum_fields=COLUMN_ENUM_FIELDS, number_fields=COLUMN_NUMBER_FIELDS):
+    self._codes = {field: np.zeros(0, dtype=np.int32) for field in enum_fields}
+    self._vocab = {field: {} for field in enum_fields}   # value -> code
+    self._numbers = {field: np.zeros(0, dtype=np.float64) for field in number_fields}
+    self._irregular = {field: np.zeros(0, dtype=bool) for field in (*enum_fields, *number_fields)}
+
+  def _ensure_capacity(self, size):
+    capacity = len(next(iter(self._irregular.values()), ()))
+    if size <= capacity:
+      return
+    capacity = max(size, 2 * capacity, 1024)
+
+    def grow(column, fill):
+      grown = np.full(capacity, fill, dtype=column.dtype)
+      grown[:len(column)] = column
+      return grown
+    self._codes = {field: grow(column, -1) for field, column in self._codes.items()}
+    self._numbers = {field: grow(column, np.nan) for field, column in self._numbers.items()}
+    self._irregular = {field: grow(column, False) for field, column in self._irregular.items()}
+
+  # *****************************
+  # Writes (rows are kept dense by the index)
+  # *****************************
+  def set(self, row, metadata):
+    self._ensure_capacity(row + 1)
+    for field, codes in self._codes.items():
+      value = metadata.get(field)
+      codes[row], irregular = -1, False
+      if value is not None:
+        try:
+          vocab = self._vocab[field]
+          codes[row] = vocab.setdefault(value, len(vocab))
+        except TypeError:
+          irregular = True  # unhashable
+      self._irregular[field][row] = irregular
+    for field, numbers in self._numbers.items():
+      value = metadata.get(field)
+      numbers[row] = float(value) if _is_number(value) else np.nan
+      self._irregular[field][row] = value is not None and not _is_number(value)
+
+  def move(self, source, target):
+    """Copies row source over row target (a delete filling its hole)"""
+    for columns in (self._codes, self._numbers, self._irregular):
+      for column in columns.values():
+        column[target] = column[source]
+
+  # *****************************
+  # Filtering
+  # *****************************
+  def rows(self, vector_filter, metadata, count):
+    """Rows (of the first count) whose metadata matches a vecs metadata filter"""
+    (key, value), = vector_filter.items()
+    clauses = value if key == "$and" else [vector_filter]
+    mask = np.ones(count, dtype=bool)
+    rest = []
+    for clause in clauses:
+      clause_mask = self._mask(clause, metadata, count)
+      if clause_mask is None:
+        rest.append(clause)
+      else:
+        mask &= clause_mask
+    rows = np.flatnonzero(mask)
+    if rest:
+      rows = np.array([row for row in rows
+                       if all(matches_filter(metadata[row], clause) for clause in rest)], dtype=np.int64)
+    return rows
+
+  def _mask(self, clause, metadata, count):
+    """Boolean mask for one clause, or None when the columns cannot answer it"""
+    (key, value), = clause.items()
+    if key in ("$and", "$or"):
+      masks = [self._mask(c, metadata, count) for c in value]
+      if any(mask is None for mask in masks):
+        return None
+      combine = np.logical_and if key == "$and" else np.logical_or
+      mask = np.full(count, key == "$and")
+      for other in masks:
+        mask = combine(mask, other)
+      return mask
+    if not isinstance(value, dict) or len(value) != 1:
+      return None
+
+    (operator, arg), = value.items()
+    if key in self._codes:
+      mask = self._enum_mask(key, operator, arg, count)
+    elif key in self._numbers:
+      mask = self._number_mask(key, operator, arg, count)
+    else:
+      return None
+    if mask is not None:
+      for row in np.flatnonzero(self._irregular[key][:count]):
+        mask[row] = matches_filter(metadata[row], clause)
+    return mask
+
+  def _enum_mask(self, field, operator, arg, count):
+    codes, vocab = self._codes[field][:count], self._vocab[field]
+    try:
+      if operator in ("$eq", "$ne"):
+        code = vocab.get(arg, -2)   # -2 matches no row
+        return codes == code if operator == "$eq" else (codes >= 0) & (codes != code)
+      if operator == "$in" and isinstance(arg, (list, tuple, set, frozenset)):
+        return np.isin(codes, [vocab[v] for v in arg if v in vocab])
+    except TypeError:
+      pass  # unhashable argument
+    return None
+
+  def _number_mask(self, field, operator, arg, count):
+    if not _is_number(arg):
+      return None
+    numbers = self._numbers[field][:count]
+    with np.errstate(invalid="ignore"):
+      if operator == "$ne":
+        return ~np.isnan(numbers) & (numbers != arg)
+      compare = {"$eq": np.equal, "$lt": np.less, "$lte": np.less_equal,
+                 "$gt": np.greater, "$gte": np.greater_equal}.get(operator)
+      return compare(numbers, arg) if compare else None
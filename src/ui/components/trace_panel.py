@@ -0,0 +1,43 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from src.utils.tracing import memory_exporter, set_session
+
+
+def bind_trace_session():
+    """Tags the spans of this script run with the Streamlit session id (call at the top of each run)"""
+    ctx = get_script_run_ctx()
+    set_session(ctx.session_id if ctx else None)
+
+
+def _render_span(node, depth=0):
+    attrs = ", ".join(f"{k}={v}" for k, v in node["attrs"].items())
+    error = f" ❌ {node['error']}" if node["error"] else ""
+    indent = "&nbsp;" * 4 * depth
+    st.markdown(
+        f"{indent}`{node['name']}` **{node['duration_ms']:.1f} ms** {attrs}{error}",
+        unsafe_allow_html=True
+    )
+    for child in node["children"]:
+        _render_span(child, depth + 1)
+
+
+def trace_panel(max_traces=10):
+    """Sidebar panel listing this session's recent traces (needs the "memory" trace exporter)"""
+    exporter = memory_exporter()
+    ctx = get_script_run_ctx()
+    if exporter is None or ctx is None:
+        return
+
+    with st.sidebar.expander("⏱️ Traces", expanded=False):
+        traces = exporter.traces_for(ctx.session_id)[-max_traces:]
+        if not traces:
+            st.caption("No traces recorded yet.")
+            return
+        if st.button("Clear traces", key="clear_traces"):
+            exporter.clear(ctx.session_id)
+            return
+        for trace in reversed(traces):
+            st.markdown(f"**{trace['name']}** — {trace['duration_ms']:.0f} ms")
+            _render_span(trace)
+            st.markdown("---")
@@ -1,5 +1,7 @@
 import streamlit as st
 from src.core.db_handler import DbHandler
+from src.core.listing_images import ListingImage
+from src.ui.components.trace_panel import bind_trace_session
 
 # Predefined categories
 categories_list = [
@@ -17,16 +19,41 @@ condition_list = ["New", "Like New", "Used", "Heavily Used"]
 
 # ---------- 1.  one-time initialisation ----------
 def init_keys():
-    if "listings" not in st.session_state:
+    # Spans recorded during this run belong to this session's trace panel
+    bind_trace_session()
 
-        # Import from external and save to local session
+    if "listings_version" not in st.session_state:
+
+        # Load the shared listing snapshot; the session only keeps its version
         db = DbHandler()
-        st.session_state.listings = db.get_listings() # Returns an array of listing objects
+        load_listings(db)
 
     if "user" not in st.session_state:
         st.session_state.user = None
 
+def load_listings(db):
+    """
+    Listings from the process-wide snapshot shared by every session (read-only).
+    Only the snapshot version is stored in the session; progress is shown
+    while a stale snapshot is rebuilt page by page.
+    """
+    progress = st.empty()
+    snapshot = db.get_listing_snapshot(
+        on_page=lambda count: progress.caption(f"Loading listings... {count} so far")
+    )
+    progress.empty()
+    st.session_state.listings_version = snapshot.version
+    return snapshot.listings
+
+def listing_image(item, rendition="full"):
+    """Image bytes for a listing, loading lazy handles only when rendered"""
+    image = item.get("image")
+    if isinstance(image, ListingImage):
+        return image.load(rendition)
+    return image
+
 def refresh_listings_from_db():
-    """Refresh listings from database"""
+    """Sync the shared listing snapshot with the rows changed since it was loaded"""
     db = DbHandler()
-    st.session_state.listings = db.get_listings()
\ No newline at end of file
+    db.refresh_listing_snapshot()
+    return load_listings(db)
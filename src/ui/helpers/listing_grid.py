@@ -0,0 +1,58 @@
+import math
+import streamlit as st
+
+# Listing cards rendered per page
+GRID_PAGE_SIZE = 20
+
+
+def page_bounds(total, page, page_size=GRID_PAGE_SIZE):
+    """(start, end, page, pages) for a page number clamped to the available pages"""
+    pages = max(1, math.ceil(total / page_size))
+    page = min(max(page, 0), pages - 1)
+    start = page * page_size
+    return start, min(start + page_size, total), page, pages
+
+
+def render_cards(items, render_card, columns=2):
+    """Lays out one page of listings; render_card(item) should key its widgets by item['id']"""
+    cols = st.columns(columns)
+    for idx, item in enumerate(items):
+        with cols[idx % columns]:
+            render_card(item)
+
+
+def pager(key, page, has_next, label=""):
+    """Previous/next controls; returns the page number to show"""
+    state_key = f"{key}_page"
+
+    def move(step):
+        st.session_state[state_key] = page + step
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("◀ Previous", key=f"{key}_prev", disabled=page == 0, on_click=move, args=(-1,))
+    with col2:
+        st.caption(label or f"Page {page + 1}")
+    with col3:
+        st.button("Next ▶", key=f"{key}_next", disabled=not has_next, on_click=move, args=(1,))
+    return page
+
+
+def paginated_grid(items, key, render_card, page_size=GRID_PAGE_SIZE, columns=2, reset_on=None):
+    """
+    Renders only the current page of items (widgets for the other pages are
+    never created). The page number lives in st.session_state under key and
+    goes back to the first page whenever reset_on (e.g. the filters) changes.
+    Call it from an st.fragment so paging does not rerun the whole page.
+    """
+    state_key, reset_key = f"{key}_page", f"{key}_reset_on"
+    if st.session_state.get(reset_key) != reset_on:
+        st.session_state[reset_key] = reset_on
+        st.session_state[state_key] = 0
+
+    start, end, page, pages = page_bounds(len(items), st.session_state.get(state_key, 0), page_size)
+    st.session_state[state_key] = page
+    render_cards(items[start:end], render_card, columns)
+    if pages > 1:
+        pager(key, page, page < pages - 1,
+              f"Page {page + 1} of {pages} · items {start + 1}-{end} of {len(items)}")
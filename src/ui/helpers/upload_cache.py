@@ -0,0 +1,177 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+
+import streamlit as st
+
+from src.core.listing_images import ImageLRU
+from src.utils.image_helper import submit_ingest
+
+
+class UploadCache:
+    """
+    Processed upload bytes keyed by the SHA-256 of the original upload, so the
+    same photo is only decoded and re-encoded once (bounded like ImageLRU).
+    Processing runs on the image ingest pool; submit() never waits for it.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=64):
+        self._results = ImageLRU(max_bytes=max_bytes, max_entries=max_entries)
+        self._pending = {}  # content hash -> Future of the processed bytes
+        self._failed = {}   # content hash -> Future of a job that raised
+        self._refs = {}     # content hash -> number of upload widgets holding it
+        # Reentrant: a Future that is already done runs its callback right away
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, content_hash):
+        return self._results.get(content_hash)
+
+    def lookup(self, content_hash):
+        """Processed bytes, the Future of a running or failed job, or None"""
+        with self._lock:
+            return (self._results.get(content_hash) or self._pending.get(content_hash)
+                    or self._failed.get(content_hash))
+
+    def submit(self, data, content_hash=None):
+        """Processed bytes if ready, else the Future of the (shared) processing job"""
+        content_hash = content_hash or self.content_hash(data)
+        with self._lock:
+            processed = self._results.get(content_hash)
+            if processed is not None:
+                self.hits += 1
+                return processed
+            future = self._pending.get(content_hash)
+            if future is not None:
+                self.hits += 1  # joins the job already running for this content
+            else:
+                self.misses += 1
+                self._failed.pop(content_hash, None)  # submitted again: retry
+                future = self._pending[content_hash] = submit_ingest(data)
+                future.add_done_callback(lambda done: self._finish(content_hash, done))
+            return future
+
+    def _finish(self, content_hash, future):
+        with self._lock:
+            # Skip jobs whose upload was released while they ran
+            if self._pending.get(content_hash) is not future:
+                return
+            del self._pending[content_hash]
+            if future.exception() is not None:
+                # Kept so reruns report the error instead of retrying
+                self._failed[content_hash] = future
+            else:
+                self._results.put(content_hash, future.result())
+
+    def process(self, data, content_hash=None):
+        """Blocking form of submit() (for scripts and tests)"""
+        content_hash = content_hash or self.content_hash(data)
+        processed = self.submit(data, content_hash)
+        if isinstance(processed, Future):
+            processed.exception()  # waits for the job
+            self._finish(content_hash, processed)  # cached before returning, not just soon after
+            return processed.result()
+        return processed
+
+    def retain(self, content_hash):
+        """Marks an upload widget as holding content_hash (see release)"""
+        with self._lock:
+            self._refs[content_hash] = self._refs.get(content_hash, 0) + 1
+
+    def release(self, content_hash):
+        """
+        Drops a hold taken by retain(). The cache is shared by every session,
+        so the entry is only evicted once no upload widget holds it; entries
+        of sessions that simply ended are left to the LRU bound.
+        """
+        with self._lock:
+            refs = self._refs.get(content_hash, 0) - 1
+            if refs > 0:
+                self._refs[content_hash] = refs
+                return
+            self._refs.pop(content_hash, None)
+            self._pending.pop(content_hash, None)
+            self._failed.pop(content_hash, None)
+            self._results.discard(content_hash)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource
+def get_upload_cache():
+    return UploadCache(max_bytes=int(os.getenv("UPLOAD_CACHE_MB", "32")) * 1024 * 1024)
+
+
+@st.fragment(run_every=0.5)
+def _await_processing(future):
+    """Placeholder while an upload is processed; reruns the page once it is ready"""
+    if future.done():
+        st.rerun()
+    st.caption("⏳ Processing image...")
+
+
+def processed_upload(uploaded_file, key):
+    """
+    Processed bytes for the file in an upload widget (see ingest_image), or None.
+    While the image is still being processed this shows a placeholder and
+    returns None; the page reruns when the bytes are ready (check
+    upload_pending before saving). If processing fails the error is shown
+    once and None is returned until another file is uploaded. Reruns with
+    the same upload reuse the result without reading the file again;
+    clearing the widget (uploaded_file None) releases its entry.
+    """
+    cache = get_upload_cache()
+    # widget key -> (file_id, content hash, failure already shown)
+    slots = st.session_state.setdefault("upload_slots", {})
+    slot = slots.get(key)
+
+    if uploaded_file is None:
+        if slot is not None:
+            cache.release(slot[1])
+            del slots[key]
+        return None
+
+    processed = None
+    if slot is not None and slot[0] == uploaded_file.file_id:
+        processed = cache.lookup(slot[1])
+
+    if processed is None:
+        data = uploaded_file.getvalue()
+        content_hash = cache.content_hash(data)
+        if slot is None or slot[1] != content_hash:
+            # A new image, or a different one replacing the previous one
+            cache.retain(content_hash)
+            if slot is not None:
+                cache.release(slot[1])
+        slot = slots[key] = (uploaded_file.file_id, content_hash, False)
+        processed = cache.submit(data, content_hash)
+
+    if not isinstance(processed, Future):
+        return processed
+    if not processed.done():
+        _await_processing(processed)
+        return None
+    if processed.exception() is not None:
+        if not slot[2]:
+            slots[key] = slot[:2] + (True,)
+            st.error(f"Could not process the image: {processed.exception()}")
+        return None
+    return processed.result()
+
+
+def upload_pending(uploaded_file, key):
+    """True while the file in an upload widget is still being processed (False once it failed)"""
+    if uploaded_file is None:
+        return False
+    slot = st.session_state.get("upload_slots", {}).get(key)
+    processed = get_upload_cache().lookup(slot[1]) if slot is not None else None
+    if isinstance(processed, Future):
+        return not processed.done() or processed.exception() is None
+    return processed is None
@@ -1,15 +1,21 @@
 import streamlit as st
-from src.ui.helpers.commons import categories_list
+from src.ui.helpers.commons import categories_list, condition_list, load_listings, listing_image
+from src.core.listing_filters import SORT_OPTIONS
+from src.ui.helpers.listing_grid import pager, paginated_grid, render_cards
 from src.ai_workflows.buyer.browse_ai import generate_ai_response
 from src.ai_workflows.buyer.search_agents import validate_query, buyer_search_workflow
 from src.core.db_handler import DbHandler
 import re
 
+SEARCH_PAGE_SIZE = 20
+FILTER_PAGE_SIZE = 20
+
 @st.dialog("Item Details")
 def popup_dial(item):
     st.subheader(item["title"])
-    if item["image"]:
-        st.image(item["image"], width=200)
+    image = listing_image(item, "medium")
+    if image:
+        st.image(image, width=200)
     st.write(f"**Price:** ${item['price']}")
     st.write(f"**Category:** {item['category']}")
     st.write(f"**Condition:** {item['condition']}")
@@ -17,18 +23,121 @@ def popup_dial(item):
     st.write(f"**📧 Contact:** {item.get('seller_email', 'Email not provided')}")
 
 
+def listing_card(item, key, footer):
+    # Widgets are keyed by listing id, so they keep their state when the page changes
+    if st.button(f"{item['title']}", key=f"{key}_{item['id']}"):
+        popup_dial(item)
+    st.markdown(
+        f"""
+        <div style='border: 1px solid #ddd; padding: 10px; margin: 5px; border-radius: 5px;'>
+            <h4>{item['title']}</h4>
+            <p><b>${item['price']}</b></p>
+            <p>{item['category']} | {item['condition']}</p>
+            <p>{footer}</p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+
+def search_card(item):
+    listing_card(item, "search", f"📧 {item.get('seller_email', 'Email not provided')}")
+
+
+def filter_card(item):
+    listing_card(item, "filter", f"🗓️ {item.get('date_posted', '')}")
+
+
+@st.fragment
+def search_panel(db):
+    """Search tab; a fragment, so typing a query or paging reruns only this tab"""
+    st.subheader("Browse All Listings")
+    search_query = st.text_input("🔍 Semantic Search", placeholder="e.g., 'MacBook for programming', 'cooling device for dorm', 'gaming setup'")
+    st.caption("💡 Uses AI to understand your intent - try natural language descriptions!")
+
+    listings = db.get_listing_snapshot().listings
+    if not listings:
+        st.info("No items available yet.")
+    elif not search_query:
+        st.write(f"Found {len(listings)} items")
+        paginated_grid(listings, "browse_all", search_card, SEARCH_PAGE_SIZE)
+    else:
+        # Cursors of the pages reached so far; a new query starts again from page 1
+        if st.session_state.get("browse_search_query") != search_query:
+            st.session_state.browse_search_query = search_query
+            st.session_state.search_cursors = [None]
+            st.session_state.search_results_page = 0
+        cursors = st.session_state.search_cursors
+        page = st.session_state.search_results_page
+        try:
+            # Keyword (BM25) and semantic rankings fused; keywords alone if Bedrock is down
+            results = db.ranked_search(search_query, limit=SEARCH_PAGE_SIZE, cursor=cursors[page])
+        except Exception as e:
+            st.warning(f"Semantic search failed: {str(e)}")
+            return
+
+        if not results.results:
+            st.warning("No items match your search.")
+            return
+        if results.next_cursor and page + 1 == len(cursors):
+            cursors.append(results.next_cursor)
+        render_cards(results.listings(), search_card)
+        pager("search_results", page, page + 1 < len(cursors),
+              f"Page {page + 1} · {results.total} matches")
+
+
+@st.fragment
+def filter_panel(db):
+    """Filter tab; a fragment, so changing a filter reruns only this tab"""
+    st.subheader("Filter Listings")
+    facets = db.get_facet_index()
+    bounds = facets.price_bounds()
+    if bounds is None:
+        st.info("No items available yet.")
+        return
+
+    # Slider bounds come from the index (no pass over the listings)
+    min_price, max_price = bounds
+    # Prevent slider issue when only one price available
+    max_price = min_price + 1 if min_price == max_price else max_price
+    price_range = st.slider("Price Range ($)", min_value=float(min_price), max_value=float(max_price),
+                            value=(float(min_price), float(max_price)))
+
+    # Matches per option, given the other selection and the price range
+    counts = facets.facet_counts(st.session_state.get("filter_category", "All"),
+                                 st.session_state.get("filter_condition", "All"), price_range)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        category_filter = st.selectbox(
+            "Category", ["All"] + categories_list, key="filter_category",
+            format_func=lambda c: c if c == "All" else f"{c} ({counts['category'].get(c, 0)})")
+    with col2:
+        condition_filter = st.selectbox(
+            "Condition", ["All"] + condition_list, key="filter_condition",
+            format_func=lambda c: c if c == "All" else f"{c} ({counts['condition'].get(c, 0)})")
+    with col3:
+        sort_option = st.selectbox("Sort by", SORT_OPTIONS, key="filter_sort")
+
+    search = st.text_input("Title contains", key="filter_search")
+
+    filtered = db.filter_listings(search, category_filter, condition_filter, price_range, sort_option)
+    if not filtered:
+        st.warning("No items match these filters.")
+    else:
+        st.write(f"Found {len(filtered)} items")
+        filters = (search, category_filter, condition_filter, price_range, sort_option)
+        paginated_grid(filtered, "filter_results", filter_card, FILTER_PAGE_SIZE, reset_on=filters)
+
 
 def display():
     # Initialize database handler
     db = DbHandler()
     st.set_page_config(layout="wide")
     
-    # Auto-refresh on page load
-    if "page_loaded_browse" not in st.session_state:
-        st.session_state.listings = db.get_listings()
-        st.session_state.page_loaded_browse = True
+    # Sync the shared listing snapshot (rebuilt after listing writes); the tabs read it
+    load_listings(db)
 
-    tab1, tab2, tab3 = st.tabs(["💬 Chat", "🔍 Search", "🤖 AI Recommendations"])
+    tab1, tab2, tab3, tab4 = st.tabs(["💬 Chat", "🔍 Search", "🧰 Filter", "🤖 AI Recommendations"])
     
     with tab1:
         st.subheader("Chat with Kairos AI")
@@ -75,54 +184,12 @@ def display():
             st.rerun()
 
     with tab2:
-        st.subheader("Browse All Listings")
-        search_query = st.text_input("🔍 Semantic Search", placeholder="e.g., 'MacBook for programming', 'cooling device for dorm', 'gaming setup'")
-        st.caption("💡 Uses AI to understand your intent - try natural language descriptions!")
-
-        listings = st.session_state["listings"]
-        if not listings:
-            st.info("No items available yet.")
-        else:
-            # Semantic search if query provided, otherwise show all
-            if search_query:
-                try:
-                    # Use semantic search to get relevant listing IDs
-                    similar_ids = db.query_try(search_query, len(listings))
-                    # Filter listings to match semantic search results in order
-                    filtered = [item for item in listings if item.get('id') in similar_ids]
-                    # Sort by semantic similarity (order from query_try)
-                    filtered.sort(key=lambda x: similar_ids.index(x.get('id')) if x.get('id') in similar_ids else len(similar_ids))
-                except Exception as e:
-                    st.warning(f"Semantic search failed, using basic search: {str(e)}")
-                    # Fallback to basic search
-                    filtered = [item for item in listings 
-                               if search_query.lower() in item["title"].lower() 
-                               or search_query.lower() in item["description"].lower()]
-            else:
-                filtered = listings
-
-            if not filtered:
-                st.warning("No items match your search.")
-            else:
-                st.write(f"Found {len(filtered)} items")
-                cols = st.columns(2)
-                for idx, item in enumerate(filtered):
-                    with cols[idx % 2]:
-                        if st.button(f"{item['title']}", key=f"basic_search_{idx}"):
-                            popup_dial(item)
-                        st.markdown(
-                            f"""
-                            <div style='border: 1px solid #ddd; padding: 10px; margin: 5px; border-radius: 5px;'>
-                                <h4>{item['title']}</h4>
-                                <p><b>${item['price']}</b></p>
-                                <p>{item['category']} | {item['condition']}</p>
-                                <p>📧 {item.get('seller_email', 'Email not provided')}</p>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
+        search_panel(db)
 
     with tab3:
+        filter_panel(db)
+
+    with tab4:
         st.subheader("🎯 Smart Search")
         st.caption("AI-powered precision matching. Describe your needs and get personalized recommendations.")
         
@@ -279,7 +346,7 @@ def display():
                     # If we see "**[View Original]**" and have a current listing ID, add button
                     if "**[View Original]**" in section and current_listing_id:
                         # Find the listing in current listings
-                        matching_listing = next((item for item in st.session_state["listings"] if item.get('id') == current_listing_id), None)
+                        matching_listing = db.get_listing_snapshot().get(current_listing_id)
                         if matching_listing:
                             with st.expander(f"📋 View {matching_listing['title']}", expanded=False):
                                 col1, col2 = st.columns([2, 1])
@@ -294,8 +361,9 @@ def display():
                                     st.markdown(f"**📧 Contact:** {matching_listing.get('seller_email', 'Email not provided')}")
                                 
                                 with col2:
-                                    if matching_listing.get("image"):
-                                        st.image(matching_listing["image"], width=150)
+                                    image = listing_image(matching_listing, "small")
+                                    if image:
+                                        st.image(image, width=150)
                                     else:
                                         st.info("No image available")
                                 
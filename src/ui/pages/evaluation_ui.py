@@ -4,6 +4,7 @@ import os
 import time
 from src.ai_workflows.seller.market_agents import WebsearchAgent, MarketAnalyzer
 from src.ai_workflows.seller.synthesis_agent import SynthesisAgent
+from src.ui.helpers.commons import refresh_listings_from_db
 from contextlib import contextmanager
 
 def display():
@@ -279,7 +280,7 @@ Price Negotiable: {user_info.get('price_negotiable', 'N/A')}
                     db.save_listing_to_db(item_data)
                     
                     # Refresh listings and reset page flags
-                    st.session_state.listings = db.get_listings()
+                    refresh_listings_from_db()
                     if "page_loaded_mylistings" in st.session_state:
                         del st.session_state.page_loaded_mylistings
                     if "page_loaded_browse" in st.session_state:
@@ -1,121 +1,143 @@
 import streamlit as st
-from src.ui.helpers.commons import categories_list
+from src.ui.helpers.commons import categories_list, condition_list, load_listings, listing_image, refresh_listings_from_db
+from src.ui.helpers.listing_grid import paginated_grid
 from src.core.db_handler import DbHandler
+from src.ui.helpers.upload_cache import processed_upload, upload_pending
 
 def display():
     # Initialize database handler
     db = DbHandler()
     
-    # Always sync with database on page load
-    st.session_state.listings = db.get_listings()
+    # Shared listing snapshot (rebuilt after listing writes)
+    load_listings(db)
     
     current_user = st.session_state.get("user")
     if (not current_user):
         st.error("No User selected. Head to Home to select")
 
     st.title("My Listings")
+    my_listings_grid(db, current_user)
+
+
+@st.fragment
+def my_listings_grid(db, current_user):
+    """A fragment, so paging and edit forms rerun only the grid"""
     # Filter listings for current user
-    print(current_user)
-    user_listings = [item for item in st.session_state.listings if item.get("user") == current_user]
-    
+    user_listings = [item for item in db.get_listing_snapshot().listings if item.get("user") == current_user]
+
     if len(user_listings) == 0:
         st.info("You haven't posted anything yet.")
     else:
-        listing_count = 0
-        cols = st.columns(2)
-
-        for idx, item in enumerate(user_listings):
-            with cols[idx % 2]:
-                st.markdown(
-                    f"""
-                    <div class='listing-card'>
-                        <h4>{item['title']}</h4>
-                        <p><b>${item['price']}</b></p>
-                        <p>{item['category']} | {item['condition']}</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                if item.get("image"):
-                    st.image(item["image"], width=150)
-                else:
-                    st.write("No image available")
+        # Only the current page is rendered, so edit forms exist for at most a page of items
+        paginated_grid(user_listings, "my_listings", lambda item: listing_card(item, current_user))
 
-                if st.button(f"Edit {item['title']}", key=f"edit_{idx}"):
-                    title_edit = st.text_input("Title", value=item.get("title", ""), key=f"title_{idx}")
-                    price_edit = st.number_input("Price ($)", min_value=0.0, value=float(item.get("price", 0.0)), format="%.2f", key=f"price_{idx}")
-                    category_edit = st.selectbox("Category", categories_list, index=categories_list.index(item.get("category", categories_list[0])), key=f"cat_{idx}")
-                    condition_edit = st.selectbox("Condition", ["New", "Like New", "Used", "Heavily Used"], index=["New", "Like New", "Used", "Heavily Used"].index(item.get("condition", "New")), key=f"cond_{idx}")
-                    description_edit = st.text_area("Description", value=item.get("description", "No description provided"), key=f"desc_{idx}")
-                    new_image = st.file_uploader("Re-upload Image", type=["png", "jpg", "jpeg"], key=f"image_{idx}")
-                    if new_image:
-                        st.image(new_image, width=150)
-                    if st.button("Save Changes", key=f"save_{idx}"):
-                        user_listings[idx]["title"] = new_title
-                        user_listings[idx]["price"] = new_price
-                        user_listings[idx]["category"] = new_category
-                        user_listings[idx]["condition"] = new_condition
-                        user_listings[idx]["description"] = new_description
-                        if new_image:
-                            user_listings[idx]["image"] = new_image
 
-                        # Update in database
-                        db = DbHandler()
-                        db.update_listing_in_db(item, item['id'])
-                        # Reset page flags to trigger refresh
-                        if "page_loaded_browse" in st.session_state:
-                            del st.session_state.page_loaded_browse
-                        st.success("Item updated in database!")
+def listing_card(item, current_user):
+    # Widgets are keyed by listing id, so their state follows the listing across pages
+    listing_id = item["id"]
+    st.markdown(
+        f"""
+        <div class='listing-card'>
+            <h4>{item['title']}</h4>
+            <p><b>${item['price']}</b></p>
+            <p>{item['category']} | {item['condition']}</p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    image = listing_image(item, "small")
+    if image:
+        st.image(image, width=150)
+    else:
+        st.write("No image available")
 
-                # Delete option with confirmation
-                delete_key = f"delete_confirm_{idx}"
-                if delete_key not in st.session_state:
-                    st.session_state[delete_key] = False
-                    
-                if not st.session_state[delete_key]:
-                    if st.button(f"Delete {item.get('title', 'Item')}", key=f"del_{idx}"):
-                        st.session_state[delete_key] = True
-                        st.rerun()
-                else:
-                    st.warning(f"⚠️ Are you sure you want to delete '{item.get('title', 'Item')}'? This cannot be undone.")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button("✅ Yes, Delete", key=f"confirm_{idx}"):
-                            db = DbHandler()
-                            listing_id = item.get('id')
-                            if listing_id and db.delete_listing_by_id(listing_id, current_user):
-                                # Refresh from database
-                                st.session_state.listings = db.get_listings()
-                                # Reset page flags
-                                if "page_loaded_browse" in st.session_state:
-                                    del st.session_state.page_loaded_browse
-                                st.success("Item deleted successfully!")
-                            else:
-                                st.error("Failed to delete item. You may not have permission.")
-                            st.session_state[delete_key] = False
-                            st.rerun()
-                    with col2:
-                        if st.button("❌ Cancel", key=f"cancel_{idx}"):
-                            st.session_state[delete_key] = False
-                            st.rerun()
+    # The edit form stays open across reruns until it is closed
+    edit_key = f"editing_{listing_id}"
+    if st.button(f"Edit {item['title']}", key=f"edit_{listing_id}"):
+        st.session_state[edit_key] = not st.session_state.get(edit_key, False)
+    if st.session_state.get(edit_key):
+        title_edit = st.text_input("Title", value=item.get("title", ""), key=f"title_{listing_id}")
+        price_edit = st.number_input("Price ($)", min_value=0.0, value=float(item.get("price", 0.0)), format="%.2f", key=f"price_{listing_id}")
+        category_edit = st.selectbox("Category", categories_list, index=categories_list.index(item.get("category", categories_list[0])), key=f"cat_{listing_id}")
+        condition_edit = st.selectbox("Condition", condition_list, index=condition_list.index(item.get("condition", "New")), key=f"cond_{listing_id}")
+        description_edit = st.text_area("Description", value=item.get("description", "No description provided"), key=f"desc_{listing_id}")
+        new_image = st.file_uploader("Re-upload Image", type=["png", "jpg", "jpeg"], key=f"image_{listing_id}")
+        # Processed once per upload and reused by reruns and by Save Changes
+        new_image_bytes = processed_upload(new_image, f"image_{listing_id}")
+        if new_image_bytes:
+            st.image(new_image_bytes, width=150)
+        save = st.button("Save Changes", key=f"save_{listing_id}")
+        if save and upload_pending(new_image, f"image_{listing_id}"):
+            st.warning("The new image is still being processed. Please save again once the preview appears.")
+        elif save:
+            # Snapshot listings are shared by every session, so edit a copy
+            updated = item.copy()
+            updated["title"] = title_edit
+            updated["price"] = price_edit
+            updated["category"] = category_edit
+            updated["condition"] = condition_edit
+            updated["description"] = description_edit
+            if new_image_bytes:
+                # Same bytes hash to the stored blob, so an identical re-upload is a no-op
+                updated["image"] = new_image_bytes
 
-                # Date formatting
-                date_posted = item.get("date_posted")
-                if date_posted:
-                    try:
-                        import datetime
-                        if isinstance(date_posted, datetime.datetime):
-                            date_posted = date_posted.strftime("%Y-%m-%d %H:%M")
-                    except Exception:
-                        pass
-                    st.write(f"**Posted:** {date_posted}")
+            # Update in database
+            db = DbHandler()
+            db.update_listing_in_db(updated, listing_id)
+            # Refresh the shared listing snapshot so the card shows the edit
+            refresh_listings_from_db()
+            # Reset page flags to trigger refresh
+            if "page_loaded_browse" in st.session_state:
+                del st.session_state.page_loaded_browse
+            st.session_state[edit_key] = False
+            # The form closes, so its upload is no longer needed
+            processed_upload(None, f"image_{listing_id}")
+            st.toast("Item updated in database!")
+            st.rerun(scope="fragment")
 
-                st.markdown("---")
+    # Delete option with confirmation
+    delete_key = f"delete_confirm_{listing_id}"
+    if delete_key not in st.session_state:
+        st.session_state[delete_key] = False
+        
+    if not st.session_state[delete_key]:
+        if st.button(f"Delete {item.get('title', 'Item')}", key=f"del_{listing_id}"):
+            st.session_state[delete_key] = True
+            st.rerun(scope="fragment")
+    else:
+        st.warning(f"⚠️ Are you sure you want to delete '{item.get('title', 'Item')}'? This cannot be undone.")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Yes, Delete", key=f"confirm_{listing_id}"):
+                db = DbHandler()
+                if db.delete_listing_by_id(listing_id, current_user):
+                    # Refresh the shared listing snapshot
+                    refresh_listings_from_db()
+                    # Reset page flags
+                    if "page_loaded_browse" in st.session_state:
+                        del st.session_state.page_loaded_browse
+                    st.success("Item deleted successfully!")
+                else:
+                    st.error("Failed to delete item. You may not have permission.")
+                del st.session_state[delete_key]
+                st.rerun()
+        with col2:
+            if st.button("❌ Cancel", key=f"cancel_{listing_id}"):
+                st.session_state[delete_key] = False
+                st.rerun(scope="fragment")
 
-                listing_count += 1
+    # Date formatting
+    date_posted = item.get("date_posted")
+    if date_posted:
+        try:
+            import datetime
+            if isinstance(date_posted, datetime.datetime):
+                date_posted = date_posted.strftime("%Y-%m-%d %H:%M")
+        except Exception:
+            pass
+        st.write(f"**Posted:** {date_posted}")
 
-        if listing_count == 0:
-            st.info("You don't have any listings")
+    st.markdown("---")
             
 '''
             # Image handling
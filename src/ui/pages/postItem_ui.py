@@ -3,8 +3,9 @@ from src.ui.helpers.commons import categories_list
 from src.ui.helpers.demo_data import get_demo_data
 
 import datetime
-from src.ui.helpers.commons import categories_list, condition_list
-from src.utils.image_helper import compress_incoming_image_file, image_to_base64
+from src.ui.helpers.commons import categories_list, condition_list, refresh_listings_from_db
+from src.utils.image_helper import image_to_base64
+from src.ui.helpers.upload_cache import processed_upload, upload_pending
 import sys
 import os
 from src.core.db_handler import DbHandler
@@ -26,15 +27,14 @@ def display():
     user = st.text_input("User", value=st.session_state.get("user"), disabled=True)
     title = st.text_input("Item Title", value=st.session_state.get("demo_title", ""), help="Enter a clear, descriptive title for your item.")
     image = st.file_uploader("Upload Image (optional)", type=["png", "jpg", "jpeg"], help="Max 5MB. JPG, PNG only.")
-    small_img_bytes = None
-    if image:
-        if image.size > 5 * 1024 * 1024:
-            st.warning("Image file is too large (max 5MB). Please upload a smaller image.")
-            image = None
-        else:
-            # Compress Image and save
-            small_img_bytes = compress_incoming_image_file(image, quality=30)
-            st.image(small_img_bytes, caption="Preview Image", width=150)
+    if image and image.size > 5 * 1024 * 1024:
+        st.warning("Image file is too large (max 5MB). Please upload a smaller image.")
+        image = None
+    # Orient, resize and re-encode for storage (see ingest_image); done once per
+    # upload, so reruns from typing in other fields reuse the result
+    small_img_bytes = processed_upload(image, "post_image")
+    if small_img_bytes:
+        st.image(small_img_bytes, caption="Preview Image", width=150)
 
     demo_category = st.session_state.get("demo_category", categories_list[0])
     category_index = categories_list.index(demo_category) if demo_category in categories_list else 0
@@ -175,6 +175,8 @@ def display():
         missing_fields = get_missing_fields()
         if delivery_option == "Other" and not custom_delivery_option.strip():
             st.error("Please describe your delivery option if you select 'Other'.")
+        elif upload_pending(image, "post_image"):
+            st.warning("The image is still being processed. Please post again once the preview appears.")
         elif missing_fields:
             st.error(f"Please fill all required fields. Missing: {', '.join(missing_fields)}")
             if(not user):
@@ -205,7 +207,7 @@ def display():
             external_db_handler.save_listing_to_db(item_data)
 
             # Refresh listings and reset page flags
-            st.session_state.listings = external_db_handler.get_listings()
+            refresh_listings_from_db()
             # Reset page load flags to trigger refresh on other pages
             if "page_loaded_mylistings" in st.session_state:
                 del st.session_state.page_loaded_mylistings
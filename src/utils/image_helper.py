@@ -1,13 +1,117 @@
-from PIL import Image
-import io, base64
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+import io, base64, os
 
-def compress_incoming_image_file(uploaded_file, quality=30):
-  img = Image.open(uploaded_file)
+# Longest edge (px) for each stored rendition; None keeps the original bytes
+RENDITION_SIZES = {"small": 240, "medium": 640, "full": None}
+
+# Uploads are normalised before storage (see ingest_image)
+INGEST_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1600"))
+INGEST_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(300 * 1024)))
+INGEST_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()
+INGEST_QUALITY = (40, 85)  # quality search range; the highest that fits the byte budget wins
+
+# Image work runs here rather than on the Streamlit script thread; Pillow
+# releases the GIL while decoding/encoding, and the pool bounds concurrent
+# CPU use across sessions
+_ingest_pool = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_WORKERS", "2")),
+                                  thread_name_prefix="image-ingest")
+
+def _flatten(img, background=(255, 255, 255)):
+  """RGB image; transparent areas are composited onto a white background"""
+  if img.mode == "P" and "transparency" in img.info:
+    img = img.convert("RGBA")
+  if img.mode in ("RGBA", "LA", "PA"):
+    img = img.convert("RGBA")
+    flat = Image.new("RGB", img.size, background)
+    flat.paste(img, mask=img.getchannel("A"))
+    return flat
+  return img.convert("RGB") if img.mode != "RGB" else img
+
+def _encode(img, image_format, quality):
   buf = io.BytesIO()
-  img.save(buf, format="JPEG", quality=quality)
-  buf.seek(0)
+  if image_format == "WEBP":
+    img.save(buf, format="WEBP", quality=quality, method=4)
+  else:
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+  return buf.getvalue()
+
+def _encode_to_budget(img, image_format, max_bytes):
+  """Highest quality in INGEST_QUALITY whose encoding fits max_bytes (None if none does)"""
+  low, high = INGEST_QUALITY
+  best = None
+  data = _encode(img, image_format, high)
+  if len(data) <= max_bytes:
+    return data
+  while low <= high:
+    quality = (low + high) // 2
+    data = _encode(img, image_format, quality)
+    if len(data) <= max_bytes:
+      best, low = data, quality + 1
+    else:
+      high = quality - 1
+  return best
+
+def ingest_image(data, max_edge=None, max_bytes=None, image_format=None):
+  """
+  Normalises uploaded image bytes for storage: applies the EXIF orientation,
+  flattens transparency, downscales to max_edge and encodes WebP (or JPEG)
+  at the best quality that fits max_bytes, shrinking further if needed.
+  """
+  max_edge = max_edge or INGEST_MAX_EDGE
+  max_bytes = max_bytes or INGEST_MAX_BYTES
+  image_format = (image_format or INGEST_FORMAT).upper()
+
+  img = Image.open(io.BytesIO(data))
+  if img.format == "JPEG":
+    # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+    img.draft("RGB", (max_edge, max_edge))
+  img = ImageOps.exif_transpose(img)
+  img = _flatten(img)
+  # reducing_gap shrinks with Image.reduce() first, then resamples the rest
+  img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
 
-  return buf.read()
+  encoded = _encode_to_budget(img, image_format, max_bytes)
+  while encoded is None and max(img.size) > 320:
+    img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), Image.Resampling.LANCZOS)
+    encoded = _encode_to_budget(img, image_format, max_bytes)
+  return encoded or _encode(img, image_format, INGEST_QUALITY[0])
+
+def submit_ingest(data, **kwargs):
+  """Runs ingest_image on the ingest pool; returns a Future of the encoded bytes"""
+  return _ingest_pool.submit(ingest_image, data, **kwargs)
+
+def compress_incoming_image_file(uploaded_file):
+  """Encoded bytes for an uploaded file (see ingest_image); blocks, so UI code uses UploadCache.submit"""
+  return ingest_image(uploaded_file.getvalue())
+
+def image_mime_type(data):
+  if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+    return "image/webp"
+  if data[:8] == b"\x89PNG\r\n\x1a\n":
+    return "image/png"
+  return "image/jpeg"
 
 def image_to_base64(image_file):
-  return base64.b64encode(image_file)
\ No newline at end of file
+  return base64.b64encode(image_file)
+
+def render_renditions(image_bytes, sizes=RENDITION_SIZES, quality=80):
+  """
+  Returns {rendition name: JPEG bytes} downscaled from image_bytes (oriented
+  and flattened like ingest_image, since migrated images were never ingested)
+  """
+  renditions = {}
+  img = Image.open(io.BytesIO(image_bytes))
+  img = _flatten(ImageOps.exif_transpose(img))
+
+  for name, max_edge in sizes.items():
+    if max_edge is None:
+      renditions[name] = image_bytes
+      continue
+    thumb = img.copy()
+    thumb.thumbnail((max_edge, max_edge))
+    buf = io.BytesIO()
+    thumb.save(buf, format="JPEG", quality=quality)
+    renditions[name] = buf.getvalue()
+
+  return renditions
\ No newline at end of file
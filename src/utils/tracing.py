@@ -0,0 +1,302 @@
+"""
+Lightweight tracing for the hot paths (DbHandler, Bedrock, Tavily, agents)
+
+Nested spans record duration, payload bytes, token counts and errors.
+When a top-level span ends, its whole tree is handed to the configured
+exporters:
+
+- "log":    one indented line per span on the `kairos.trace` logger
+- "json":   one JSON object per trace appended to TRACE_FILE
+- "memory": the most recent traces kept in process, per session (shown by
+            the in-app trace panel to the session that recorded them)
+
+Exporters come from TRACE_EXPORTERS (comma separated, e.g. "log,memory").
+With no exporters configured, span() returns a shared no-op object and
+traced() functions call straight through, so instrumentation costs one
+list check per call.
+
+Usage:
+    with span("bedrock.embed", model=model_id) as s:
+        ...
+        s.set(bytes=len(body), input_tokens=count)
+
+    @traced("db.get_listings")
+    def get_listings(...): ...
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("kairos.trace")
+
+_current = contextvars.ContextVar("kairos_current_span", default=None)
+# Id of the UI session whose script run is executing (set by set_session)
+_session = contextvars.ContextVar("kairos_trace_session", default=None)
+_exporters = []
+
+
+class Span:
+  __slots__ = ("name", "attrs", "children", "started_at", "duration_ms", "error", "session", "_start", "_token")
+
+  def __init__(self, name, attrs):
+    self.name = name
+    self.attrs = attrs
+    self.children = []
+    self.started_at = time.time()
+    self.duration_ms = None
+    self.error = None
+    self.session = _session.get()
+    self._start = time.perf_counter()
+    self._token = None
+
+  def set(self, **attrs):
+    self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+    return self
+
+  def add(self, **counters):
+    """Accumulates numeric attributes (e.g. bytes, input_tokens)"""
+    for key, value in counters.items():
+      if value:
+        self.attrs[key] = self.attrs.get(key, 0) + value
+    return self
+
+  def __enter__(self):
+    parent = _current.get()
+    if parent is not None:
+      parent.children.append(self)
+    self._token = _current.set(self)
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    self.duration_ms = (time.perf_counter() - self._start) * 1000
+    if exc is not None:
+      self.error = f"{exc_type.__name__}: {exc}"
+    _current.reset(self._token)
+    if _current.get() is None:
+      _export(self)
+    return False
+
+  def to_dict(self):
+    return {
+      "name": self.name,
+      "started_at": self.started_at,
+      "duration_ms": round(self.duration_ms or 0.0, 3),
+      "attrs": self.attrs,
+      "error": self.error,
+      "session": self.session,
+      "children": [child.to_dict() for child in self.children],
+    }
+
+
+class _NoopSpan:
+  __slots__ = ()
+
+  def set(self, **attrs):
+    return self
+
+  def add(self, **counters):
+    return self
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    return False
+
+
+_NOOP = _NoopSpan()
+
+
+def enabled():
+  return bool(_exporters)
+
+
+def span(name, **attrs):
+  """Context manager for one timed span (a no-op while tracing is disabled)"""
+  if not _exporters:
+    return _NOOP
+  return Span(name, attrs)
+
+
+def set_session(session_id):
+  """Tags spans started from this context (and the threads it hands work to) with a session id"""
+  _session.set(session_id)
+
+
+def current_span():
+  """The innermost open span, or a no-op span, for adding attributes from inside a call"""
+  return (_current.get() if _exporters else None) or _NOOP
+
+
+def traced(name=None, record=None):
+  """
+  Decorator running the function inside a span.
+  record: optional callable(result) -> dict of attributes added to the span
+  Generator functions get one span per produced item (e.g. per page fetched).
+  """
+  def decorator(fn):
+    span_name = name or fn.__qualname__
+
+    if inspect.isgeneratorfunction(fn):
+      @functools.wraps(fn)
+      def gen_wrapper(*args, **kwargs):
+        generator = fn(*args, **kwargs)
+        if not _exporters:
+          yield from generator
+          return
+        while True:
+          with span(span_name) as s:
+            try:
+              item = next(generator)
+            except StopIteration:
+              s.set(exhausted=True)
+              return
+            if record is not None:
+              s.set(**record(item))
+          yield item
+      return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      if not _exporters:
+        return fn(*args, **kwargs)
+      with span(span_name) as s:
+        result = fn(*args, **kwargs)
+        if record is not None:
+          s.set(**record(result))
+        return result
+    return wrapper
+  return decorator
+
+
+def traced_methods(prefix, exclude=(), include_private=True):
+  """Class decorator applying traced() to every method defined on the class"""
+  def decorator(cls):
+    for attr, value in list(vars(cls).items()):
+      if attr.startswith("__") or attr in exclude or not inspect.isfunction(value):
+        continue
+      if attr.startswith("_") and not include_private:
+        continue
+      setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+    return cls
+  return decorator
+
+
+def invoke_agent(name, agent, prompt):
+  """Calls a Strands agent inside a span, recording token usage and cycle count"""
+  if not _exporters:
+    return agent(prompt)
+  with span(f"agent.{name}", prompt_bytes=len(prompt.encode("utf-8"))) as s:
+    result = agent(prompt)
+    metrics = getattr(result, "metrics", None)
+    usage = getattr(metrics, "accumulated_usage", None) or {}
+    s.set(
+      input_tokens=usage.get("inputTokens"),
+      output_tokens=usage.get("outputTokens"),
+      cycles=getattr(metrics, "cycle_count", None),
+    )
+    return result
+
+
+# *****************************
+# Exporters
+# *****************************
+class LogExporter:
+  def __init__(self):
+    if not logger.handlers:
+      logger.addHandler(logging.StreamHandler())
+      logger.setLevel(logging.INFO)
+
+  def export(self, root):
+    def walk(node, depth):
+      attrs = " ".join(f"{k}={v}" for k, v in node.attrs.items())
+      error = f" ERROR {node.error}" if node.error else ""
+      logger.info("%s%s %.1fms %s%s", "  " * depth, node.name, node.duration_ms, attrs, error)
+      for child in node.children:
+        walk(child, depth + 1)
+    walk(root, 0)
+
+
+class JsonFileExporter:
+  def __init__(self, path):
+    self.path = path
+    self._lock = threading.Lock()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+  def export(self, root):
+    line = json.dumps(root.to_dict(), default=str)
+    with self._lock, open(self.path, "a") as f:
+      f.write(line + "\n")
+
+
+class MemoryExporter:
+  """
+  Recent traces per session, so a session's trace panel never shows other
+  users' queries. Traces recorded outside a session are not kept.
+  """
+
+  def __init__(self, max_traces=50, max_sessions=100):
+    self.max_traces = max_traces
+    self.max_sessions = max_sessions
+    self._lock = threading.Lock()
+    self._sessions = OrderedDict()  # session id -> deque of traces, least recently used first
+
+  def export(self, root):
+    if root.session is None:
+      return
+    with self._lock:
+      traces = self._sessions.get(root.session)
+      if traces is None:
+        traces = self._sessions[root.session] = deque(maxlen=self.max_traces)
+        while len(self._sessions) > self.max_sessions:
+          self._sessions.popitem(last=False)
+      self._sessions.move_to_end(root.session)
+      traces.append(root.to_dict())
+
+  def traces_for(self, session_id):
+    with self._lock:
+      return list(self._sessions.get(session_id, ()))
+
+  def clear(self, session_id):
+    with self._lock:
+      self._sessions.pop(session_id, None)
+
+
+def _export(root):
+  for exporter in list(_exporters):
+    try:
+      exporter.export(root)
+    except Exception as e:
+      logger.warning("Trace exporter %s failed: %s", type(exporter).__name__, e)
+
+
+def configure(exporters):
+  """Replaces the active exporters; accepts exporter objects or names ("log", "json", "memory")"""
+  built = []
+  for exporter in exporters:
+    if exporter == "log":
+      exporter = LogExporter()
+    elif exporter == "json":
+      exporter = JsonFileExporter(os.getenv("TRACE_FILE", ".cache/traces.jsonl"))
+    elif exporter == "memory":
+      exporter = MemoryExporter(int(os.getenv("TRACE_MEMORY_TRACES", "50")))
+    elif isinstance(exporter, str):
+      raise ValueError(f"Unknown trace exporter '{exporter}'")
+    built.append(exporter)
+  _exporters[:] = built
+  return built
+
+
+def memory_exporter():
+  """The active MemoryExporter, if any (used by the in-app trace panel)"""
+  return next((e for e in _exporters if isinstance(e, MemoryExporter)), None)
+
+
+configure([name.strip() for name in os.getenv("TRACE_EXPORTERS", "").split(",") if name.strip()])
@@ -0,0 +1,248 @@
+"""
+Search latency benchmarks for the main hot paths
+
+Runs against the offline backends (KAIROS_BACKEND=offline) seeded with
+generated listings, so results are reproducible and need no credentials.
+For each dataset size and hot path it reports p50/p95/p99 latency,
+allocations (tracemalloc) and database/embedding round trips as JSON.
+
+Usage:
+    python tests/benchmarks/bench_search.py --sizes 1000 10000 --out bench.json
+    python tests/benchmarks/bench_search.py --baseline tests/benchmarks/baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ.setdefault("BLOB_STORE_PATH", tempfile.mkdtemp())
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.listing import CATEGORY_LABELS
+from src.core.offline import SEED_BRANDS, SEED_ITEMS
+from src.core.listing_filters import filter_and_sort
+
+ADJECTIVES = ["cheap", "used", "new", "portable", "small", "large", "good condition", "student"]
+
+
+def _queries(count):
+    """Distinct search texts, so the query result cache does not turn every run into a hit"""
+    items = [item for names in SEED_ITEMS.values() for item in names]
+    queries = []
+    for i in range(count):
+        item = items[i % len(items)]
+        brand = SEED_BRANDS[(i // len(items)) % len(SEED_BRANDS)]
+        adjective = ADJECTIVES[(i // (len(items) * len(SEED_BRANDS))) % len(ADJECTIVES)]
+        queries.append(f"{adjective} {brand} {item.lower()}")
+    return queries
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _measure(db, fn, args_list, alloc_runs=5, budget_seconds=5.0):
+    """
+    Latency percentiles, allocations and round trips per call.
+    args_list holds one warm-up call, then the timed calls, then alloc_runs
+    calls measured under tracemalloc, each with distinct arguments.
+    Paths whose warm-up call exceeds budget_seconds are reported but not repeated.
+    """
+    warmup, timed, traced = args_list[0], args_list[1:-alloc_runs], args_list[-alloc_runs:]
+    # Warm-up so one-off imports and lazy initialisation are not measured
+    start = time.perf_counter()
+    fn(*warmup)
+    warmup_seconds = time.perf_counter() - start
+    if warmup_seconds > budget_seconds:
+        return {"skipped": f"single call took {warmup_seconds:.1f}s (budget {budget_seconds}s)",
+                "warmup_ms": round(warmup_seconds * 1000, 1)}
+
+    timings = []
+    trips_before = db.db_client.round_trips
+    embeds_before = db.llm_client.calls
+    for args in timed:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    calls = len(timed)
+    db_trips = (db.db_client.round_trips - trips_before) / calls
+    embed_calls = (db.llm_client.calls - embeds_before) / calls
+
+    # Allocations are measured separately; tracemalloc slows every allocation down
+    peaks, totals = [], []
+    for args in traced:
+        tracemalloc.start()
+        fn(*args)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        totals.append(current)
+
+    return {
+        "calls": calls,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "peak_alloc_kb": round(max(peaks) / 1024, 1),
+        "retained_alloc_kb": round(max(totals) / 1024, 1),
+        "db_round_trips": round(db_trips, 2),
+        "embedding_calls": round(embed_calls, 2),
+    }
+
+
+def _semantic_db_search():
+    """The market agents tool, or None when its optional dependencies are not installed"""
+    try:
+        from src.ai_workflows.seller.market_agents import semantic_db_search
+    except ImportError as e:
+        return None, str(e)
+    return semantic_db_search, None
+
+
+def run_size(size, iterations, k=10):
+    os.environ["OFFLINE_SEED_LISTINGS"] = str(size)
+    DbHandler.clear()
+    start = time.perf_counter()
+    db = DbHandler()
+    seed_seconds = time.perf_counter() - start
+
+    from src.ai_workflows.buyer.simple_search import semantic_search_listings
+
+    listings = db.get_listings()
+    # The shared snapshot and its indexes are built once per process (the BM25
+    # index on its first search); build them here so no hot path is timed cold
+    start = time.perf_counter()
+    db.get_listing_snapshot()
+    db.keyword_search("warm up")
+    snapshot_seconds = time.perf_counter() - start
+    runs = iterations + 6  # warm-up + timed + allocation runs
+    queries = _queries(runs * 6)
+    query_sets = [queries[i * runs:(i + 1) * runs] for i in range(6)]
+    id_sets = [[item["id"] for item in listings[(i * 20) % len(listings):][:20]] for i in range(runs)]
+
+    def browse(query):
+        return db.ranked_search(query, limit=20)
+
+    def browse_filters(sort_option):
+        return filter_and_sort(listings, category="Tech and Gadgets", condition="Used",
+                               price_range=(50.0, 900.0), sort_option=sort_option)
+
+    def browse_facets(sort_option):
+        return db.filter_listings(category="Tech and Gadgets", condition="Used",
+                                  price_range=(50.0, 900.0), sort_option=sort_option)
+
+    sort_options = ["Price: Low to High", "Price: High to Low", "Newest", "Oldest"]
+    results = {
+        "seed_seconds": round(seed_seconds, 2),
+        "snapshot_seconds": round(snapshot_seconds, 2),
+        "query_try": _measure(db, lambda q: db.query_try(q, k), [(q,) for q in query_sets[0]]),
+        "get_listings_ids": _measure(db, lambda ids: db.get_listings(ids=ids), [(ids,) for ids in id_sets]),
+        "semantic_search_listings": _measure(db, lambda q: semantic_search_listings(q, 20),
+                                             [(q,) for q in query_sets[1]]),
+        "browse_semantic": _measure(db, browse, [(q,) for q in query_sets[2]]),
+        "browse_filter_sort": _measure(db, browse_filters,
+                                       [(sort_options[i % len(sort_options)],) for i in range(runs)]),
+        "browse_facets": _measure(db, browse_facets,
+                                  [(sort_options[i % len(sort_options)],) for i in range(runs)]),
+        "keyword_search": _measure(db, lambda q: db.keyword_search(q, k), [(q,) for q in query_sets[4]]),
+        "hybrid_search": _measure(db, lambda q: db.hybrid_search(q, k), [(q,) for q in query_sets[5]]),
+        "price_stats": _measure(db, lambda c: db.get_price_stats(category=c),
+                                [(CATEGORY_LABELS[i % len(CATEGORY_LABELS)],) for i in range(runs)]),
+    }
+
+    tool, reason = _semantic_db_search()
+    if tool is None:
+        results["semantic_db_search"] = {"skipped": reason}
+    else:
+        results["semantic_db_search"] = _measure(
+            db, lambda q: tool(custom_query=q, category="Tech and Gadgets", limit=5),
+            [(q,) for q in query_sets[3]])
+    return results
+
+
+def compare(report, baseline, tolerance):
+    """
+    Returns (regressions, unchecked). Regressions are hot paths whose p95
+    latency or round trips regressed beyond tolerance, and measured paths
+    the baseline has no entry for (so a stale baseline fails instead of
+    silently passing). Unchecked are measured paths the baseline recorded
+    as skipped (e.g. a missing optional dependency where it was generated):
+    they are reported but do not fail the comparison.
+    """
+    regressions, unchecked = [], []
+    for size, paths in report["sizes"].items():
+        for name, stats in paths.items():
+            if not isinstance(stats, dict) or "p95_ms" not in stats:
+                continue  # seed time, or a path skipped on this machine
+            base = baseline.get("sizes", {}).get(size, {}).get(name)
+            if isinstance(base, dict) and "skipped" in base:
+                unchecked.append(f"{size}/{name}: skipped in the baseline ({base['skipped']})")
+                continue
+            if not isinstance(base, dict) or "p95_ms" not in base:
+                regressions.append(f"{size}/{name}: not in the baseline (regenerate it with --out)")
+                continue
+            if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{size}/{name}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if stats.get("db_round_trips", 0) > base.get("db_round_trips", 0):
+                regressions.append(f"{size}/{name}: round trips {base['db_round_trips']} -> {stats['db_round_trips']}")
+    return regressions, unchecked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=384, help="offline embedding dimension")
+    parser.add_argument("--out", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    os.environ["OFFLINE_EMBED_DIM"] = str(args.dim)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "dimension": args.dim,
+        "iterations": args.iterations,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} listings...", file=sys.stderr)
+        # Keep the handlers' progress prints out of the JSON on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            report["sizes"][str(size)] = run_size(size, args.iterations)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions, unchecked = compare(report, json.load(f), args.tolerance)
+        for line in unchecked:
+            print(f"UNCHECKED {line}", file=sys.stderr)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
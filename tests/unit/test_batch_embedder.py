@@ -0,0 +1,54 @@
+"""
+Test retry behaviour of the batch embedder (no Bedrock calls)
+"""
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from src.core.batch_embedder import BatchEmbedder
+
+
+def _client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "InvokeModel")
+
+
+def _failing(errors):
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return [0.1, 0.2]
+    return embed, calls
+
+
+def test_transient_errors_are_retried():
+    embed, calls = _failing([_client_error("ThrottlingException"),
+                             EndpointConnectionError(endpoint_url="https://bedrock")])
+    embedder = BatchEmbedder(embed, rate_per_second=0, backoff_base=0)
+    assert embedder.embed_many(["lamp"]) == [[0.1, 0.2]]
+    assert len(calls) == 3 and embedder.retries == 2
+    print("✅ Throttling and connection errors are retried")
+
+
+def test_permanent_errors_are_not_retried():
+    for code in ("ValidationException", "AccessDeniedException"):
+        embed, calls = _failing([_client_error(code)] * 10)
+        embedder = BatchEmbedder(embed, rate_per_second=0, backoff_base=0)
+        try:
+            embedder._embed_with_retry("lamp")
+            assert False, f"{code} should be raised"
+        except ClientError:
+            pass
+        assert len(calls) == 1 and embedder.retries == 0
+
+        # In a batch the text is skipped after the single call
+        embed, calls = _failing([_client_error(code)])
+        embedder = BatchEmbedder(embed, rate_per_second=0, backoff_base=0, max_workers=1)
+        assert embedder.embed_many(["oversized", "lamp"]) == [None, [0.1, 0.2]]
+        assert len(calls) == 2
+    print("✅ Non-retryable errors cost a single call")
+
+
+if __name__ == "__main__":
+    test_transient_errors_are_retried()
+    test_permanent_errors_are_not_retried()
@@ -0,0 +1,117 @@
+"""
+Test the content-addressed LocalBlobStore
+"""
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from src.core.blob_store import LocalBlobStore
+from src.utils.image_helper import ingest_image
+
+
+def _jpeg(size=(1200, 900), color=(200, 80, 40)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_put_and_renditions():
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        image = _jpeg()
+        image_hash = store.put_image(image)
+
+        assert store.exists(image_hash)
+        assert store.get(image_hash, "full") == image
+        small = Image.open(io.BytesIO(store.get(image_hash, "small")))
+        medium = Image.open(io.BytesIO(store.get(image_hash, "medium")))
+        assert max(small.size) == 240
+        assert max(medium.size) == 640
+        print("✅ Renditions stored by hash")
+
+
+def test_reupload_is_noop():
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        image = _jpeg()
+        first = store.put_image(image)
+        path = os.path.join(root, first[:2], first, "full")
+        mtime = os.stat(path).st_mtime_ns
+
+        assert store.put_image(image) == first
+        assert os.stat(path).st_mtime_ns == mtime
+        assert store.get("0" * 64, "small") is None
+        print("✅ Identical re-upload does not rewrite blobs")
+
+
+class CountingBlobStore(LocalBlobStore):
+    # Counts backend lookups (each is an HTTP call on Supabase Storage)
+    lookups = 0
+
+    def _read(self, key):
+        self.lookups += 1
+        return super()._read(key)
+
+    def _exists(self, key):
+        self.lookups += 1
+        return super()._exists(key)
+
+
+def test_full_rendition_is_one_lookup():
+    with tempfile.TemporaryDirectory() as root:
+        store = CountingBlobStore(root)
+        webp = ingest_image(_jpeg(), image_format="WEBP")
+        image_hash = store.put_image(webp)
+        folder = os.path.join(root, image_hash[:2], image_hash)
+        assert sorted(os.listdir(folder)) == ["full", "medium.jpg", "small.jpg"]
+
+        store.lookups = 0
+        assert store.get(image_hash, "full") == webp and store.lookups == 1
+        assert store.exists(image_hash) and store.lookups == 2
+
+        # Full renditions stored as full.<extension> by older uploads still resolve
+        os.rename(os.path.join(folder, "full"), os.path.join(folder, "full.webp"))
+        assert store.exists(image_hash) and store.get(image_hash, "full") == webp
+        print("✅ The full rendition is read with a single lookup, whatever its format")
+
+
+def test_renditions_are_oriented_and_flattened():
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        # Transparent PNG: the renditions composite it onto white
+        png = io.BytesIO()
+        Image.new("RGBA", (800, 400), (0, 0, 0, 0)).save(png, format="PNG")
+        small = Image.open(io.BytesIO(store.get(store.put_image(png.getvalue()), "small")))
+        assert min(small.getpixel((10, 10))) > 230
+
+        # Landscape pixels tagged "rotate 90" render as portrait
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        rotated = io.BytesIO()
+        Image.new("RGB", (800, 400), "blue").save(rotated, format="JPEG", exif=exif)
+        small = Image.open(io.BytesIO(store.get(store.put_image(rotated.getvalue()), "small")))
+        assert small.size == (120, 240)
+        print("✅ Renditions apply EXIF orientation and flatten transparency")
+
+
+def test_concurrent_writes_of_one_key():
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        images = [_jpeg(color=(i, 0, 0)) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda data: store._write("ab/shared/full.jpg", data), images * 4))
+        folder = os.path.join(root, "ab", "shared")
+        assert os.listdir(folder) == ["full.jpg"]
+        assert store._read("ab/shared/full.jpg") in images
+        print("✅ Concurrent writers of a key never clash on the temp file")
+
+
+if __name__ == "__main__":
+    test_put_and_renditions()
+    test_reupload_is_noop()
+    test_full_rendition_is_one_lookup()
+    test_renditions_are_oriented_and_flattened()
+    test_concurrent_writes_of_one_key()
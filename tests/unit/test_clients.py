@@ -0,0 +1,72 @@
+"""
+Test the pooled ClientManager and vecs reconnection (no network)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+from src.core.clients import ClientManager
+from src.core.vector_backends import VecsCollection
+
+
+def test_clients_built_once_under_concurrency():
+    manager = ClientManager()
+    builds = []
+    barrier = threading.Barrier(50)
+
+    def build():
+        builds.append(1)
+        return object()
+
+    def session(_):
+        barrier.wait()
+        return manager._get("bedrock", build)
+
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        clients = set(map(id, pool.map(session, range(50))))
+    assert len(builds) == 1 and len(clients) == 1
+    print("✅ 50 concurrent sessions share one client")
+
+
+class _Collection:
+    def __init__(self, fail):
+        self.fail = fail
+
+    def query(self, **kwargs):
+        if self.fail:
+            raise OperationalError("select", {}, Exception("server closed the connection"))
+        return [("1", 0.1)]
+
+
+class _VecClient:
+    def __init__(self, fail):
+        self.fail = fail
+
+    def get_or_create_collection(self, name, dimension):
+        return _Collection(self.fail)
+
+
+def test_vecs_reconnects_once():
+    clients = [_VecClient(fail=True), _VecClient(fail=False)]
+    reconnects = []
+    collection = VecsCollection(lambda: clients[len(reconnects)], reconnect=lambda: reconnects.append(1))
+    assert collection.query(data=[0.0], limit=1, include_value=True) == [("1", 0.1)]
+    assert len(reconnects) == 1
+    print("✅ Dropped connections are rebuilt and the query retried")
+
+
+def test_pool_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    monkeypatch.setenv("HTTP_READ_TIMEOUT", "12")
+    manager = ClientManager()
+    assert manager.db_pool_size == 7
+    http_client = manager._build_http()
+    assert http_client.timeout.read == 12
+    http_client.close()
+    print("✅ Pool sizes and timeouts come from the environment")
+
+
+if __name__ == "__main__":
+    test_clients_built_once_under_concurrency()
+    test_vecs_reconnects_once()
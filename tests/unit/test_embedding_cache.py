@@ -0,0 +1,51 @@
+"""
+Test the two-tier EmbeddingCache in front of Bedrock
+"""
+import os
+import tempfile
+
+from src.core.embedding_cache import EmbeddingCache
+
+MODEL = "amazon.titan-embed-text-v1"
+
+
+def test_memory_and_disk_hits():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "embeddings.sqlite3")
+        calls = []
+
+        def compute(text):
+            calls.append(text)
+            return [0.5, 0.25, float(len(text))]
+
+        cache = EmbeddingCache(path)
+        first = cache.get_or_compute(MODEL, "desk  fan ", compute)
+        again = cache.get_or_compute(MODEL, "desk fan", compute)
+        assert first == again and len(calls) == 1
+        assert cache.stats()["memory_hits"] == 1
+
+        # A fresh process reads the vector back from disk
+        reopened = EmbeddingCache(path)
+        assert reopened.get_or_compute(MODEL, "desk fan", compute) == first
+        assert len(calls) == 1
+        assert reopened.stats()["disk_hits"] == 1
+
+        # Keys include the model id
+        cache.get_or_compute("other-model", "desk fan", compute)
+        assert len(calls) == 2
+        print("✅ Repeat embeddings skip the model call")
+
+
+def test_disk_eviction():
+    cache = EmbeddingCache(":memory:", max_memory_entries=1, max_disk_bytes=64)
+    for i in range(10):
+        cache.put(MODEL, f"text {i}", [float(i)] * 4)   # 16 bytes each
+    assert cache.stats()["disk_bytes"] <= 64
+    assert cache.get(MODEL, "text 9") == [9.0] * 4
+    assert cache.get(MODEL, "text 0") is None
+    print("✅ Disk store stays within its size budget")
+
+
+if __name__ == "__main__":
+    test_memory_and_disk_hits()
+    test_disk_eviction()
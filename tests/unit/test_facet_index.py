@@ -0,0 +1,105 @@
+"""
+Test the Browse facet index against the plain filter/sort helper (offline)
+"""
+import itertools
+import os
+import tempfile
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp()
+os.environ["OFFLINE_SEED_LISTINGS"] = "300"
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.facet_index import SORT_OPTIONS
+from src.core.listing_filters import filter_and_sort
+
+COMBINATIONS = list(itertools.product(
+    ["All", "Tech and Gadgets", "Furniture and Appliances"],
+    ["All", "Used", "Like New"],
+    [None, (50.0, 400.0)],
+    SORT_OPTIONS,
+))
+
+
+def _assert_matches_scan(db):
+    listings = db.get_listing_snapshot().listings
+    for category, condition, price_range, sort_option in COMBINATIONS:
+        expected = filter_and_sort(listings, "", category, condition, price_range, sort_option)
+        actual = db.filter_listings("", category, condition, price_range, sort_option)
+        assert [item["id"] for item in actual] == [item["id"] for item in expected], \
+            (category, condition, price_range, sort_option)
+
+
+def test_filters_match_scan():
+    DbHandler.clear()
+    db = DbHandler()
+    _assert_matches_scan(db)
+    title = db.get_listing_snapshot().listings[0]["title"]
+    assert db.filter_listings(title.upper())[0]["title"] == title
+    print("✅ Every filter/sort combination matches a full scan")
+
+
+def test_index_follows_writes():
+    DbHandler.clear()
+    db = DbHandler()
+    listings = db.get_listing_snapshot().listings
+    first, second = listings[0], listings[1]
+    db.save_listing_to_db(dict(first.copy(), title="Facet kettle", price=12.5, image=None))
+    db.update_listing_in_db(dict(second.copy(), condition="Heavily Used", price=999.0), second["id"])
+    db.delete_listing_by_id(first["id"], first["user"])
+
+    _assert_matches_scan(db)
+    assert db.snapshots.stats()["full_loads"] == 1
+    newest = db.filter_listings(sort_option="Newest")[0]
+    assert newest["title"] == "Facet kettle"
+    print("✅ Facet index is updated in place by snapshot deltas")
+
+
+def test_facet_counts():
+    DbHandler.clear()
+    db = DbHandler()
+    facets = db.get_facet_index()
+    listings = db.get_listing_snapshot().listings
+    counts = facets.facet_counts(category="Tech and Gadgets")
+    # Category counts ignore the selected category; condition counts apply it
+    assert sum(counts["category"].values()) == len(listings)
+    tech = [item for item in listings if item["category"] == "Tech and Gadgets"]
+    assert counts["condition"].get("Used", 0) == sum(item["condition"] == "Used" for item in tech)
+    prices = [item["price"] for item in listings]
+    assert facets.price_bounds() == (min(prices), max(prices))
+
+    # Under a price filter the counts agree with the listed results
+    price_range = (50.0, 400.0)
+    counts = facets.facet_counts("Tech and Gadgets", "Used", price_range)
+    for category, count in counts["category"].items():
+        assert count == len(db.filter_listings(category=category, condition="Used", price_range=price_range))
+    for condition, count in counts["condition"].items():
+        assert count == len(db.filter_listings(category="Tech and Gadgets", condition=condition,
+                                               price_range=price_range))
+    print("✅ Facet counts (with a price filter) and price bounds come from the index")
+
+
+def test_stale_index_falls_back_to_scan():
+    DbHandler.clear()
+    db = DbHandler()
+    first = db.get_listing_snapshot().listings[0]
+
+    def broken(item):
+        raise RuntimeError("index update failed")
+    db.facet_index._add = broken  # the snapshot listener now fails on inserts
+    db.save_listing_to_db(dict(first.copy(), title="Fallback kettle", image=None))
+
+    assert db.facet_index.version != db.get_listing_snapshot().version
+    _assert_matches_scan(db)
+    assert db.filter_listings("fallback kettle")[0]["title"] == "Fallback kettle"
+    print("✅ Filters scan the snapshot while the facet index is stale")
+
+
+if __name__ == "__main__":
+    test_filters_match_scan()
+    test_index_follows_writes()
+    test_facet_counts()
+    test_stale_index_falls_back_to_scan()
@@ -0,0 +1,65 @@
+"""
+Test the upload ingestion pipeline (orientation, alpha, size and byte budget)
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+from src.utils.image_helper import image_mime_type, ingest_image, submit_ingest
+
+
+def _encode(img, image_format="JPEG", **params):
+    buf = io.BytesIO()
+    img.save(buf, format=image_format, **params)
+    return buf.getvalue()
+
+
+def _noise(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+
+def test_exif_orientation_and_downscale():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90° clockwise: displayed portrait
+    data = _encode(Image.new("RGB", (4000, 3000), (30, 120, 200)), exif=exif.tobytes())
+
+    out = Image.open(io.BytesIO(ingest_image(data, max_edge=1600)))
+    assert out.format == "WEBP"
+    assert out.size == (1200, 1600)
+    print("✅ EXIF orientation applied and long edge capped")
+
+
+def test_transparent_png_is_flattened():
+    img = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
+    img.paste((255, 0, 0, 255), (0, 0, 32, 64))
+    out = Image.open(io.BytesIO(ingest_image(_encode(img, "PNG"), image_format="JPEG")))
+    assert out.format == "JPEG" and out.mode == "RGB"
+    left, right = out.getpixel((8, 32)), out.getpixel((56, 32))
+    assert left[0] > 200 and left[1] < 60
+    assert min(right) > 230  # transparent area becomes white, not black
+    print("✅ Transparent PNGs are composited onto white")
+
+
+def test_byte_budget():
+    data = _encode(_noise((3000, 2000)), quality=95)
+    out = ingest_image(data, max_bytes=150 * 1024)
+    assert len(out) <= 150 * 1024 < len(data)
+    assert image_mime_type(out) == "image/webp"
+    assert image_mime_type(data) == "image/jpeg"
+    print("✅ Encoded images fit the byte budget")
+
+
+def test_submit_runs_off_the_calling_thread():
+    data = _encode(Image.new("RGB", (800, 600), (10, 200, 10)))
+    future = submit_ingest(data, max_edge=400)
+    assert Image.open(io.BytesIO(future.result(timeout=30))).size == (400, 300)
+    print("✅ Ingestion runs on the worker pool")
+
+
+if __name__ == "__main__":
+    test_exif_orientation_and_downscale()
+    test_transparent_png_is_flattened()
+    test_byte_budget()
+    test_submit_runs_off_the_calling_thread()
@@ -0,0 +1,67 @@
+"""
+Test the BM25 keyword index and hybrid search (offline)
+"""
+import os
+import tempfile
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp()
+os.environ["OFFLINE_SEED_LISTINGS"] = "300"
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from src.core.listing_snapshot import ListingSnapshot
+
+ROWS = [
+    {"id": 1, "title": "Sony WH-1000XM4 headphones", "brand": "Sony", "description": "Noise cancelling",
+     "category": "Tech and Gadgets"},
+    {"id": 2, "title": "Sony speaker", "brand": "Sony", "description": "Bluetooth speaker for the room",
+     "category": "Tech and Gadgets"},
+    {"id": 3, "title": "Study desk", "brand": "IKEA", "description": "Fits headphones and a laptop",
+     "category": "Furniture and Appliances"},
+]
+
+
+def test_tokenize_model_numbers():
+    assert tokenize("Sony WH-1000XM4 for the dorm") == ["sony", "wh", "1000xm4", "wh1000xm4", "dorm"]
+    print("✅ Model numbers are indexed in parts and joined")
+
+
+def test_bm25_ranking():
+    index = LexicalIndex()
+    index.on_snapshot(ListingSnapshot(1, ROWS))
+    assert [listing_id for listing_id, _ in index.search("wh1000xm4")] == [1]
+    # Title matches outrank description matches
+    assert [listing_id for listing_id, _ in index.search("headphones")] == [1, 3]
+    assert index.search("sony", k=1)[0][0] in (1, 2)
+    assert index.search("the") == []
+    assert [listing_id for listing_id, _ in reciprocal_rank_fusion([1, 2], [2, 3])] == [2, 1, 3]
+    print("✅ BM25 ranks exact keyword matches first")
+
+
+def test_index_follows_writes_and_survives_bedrock_outage():
+    DbHandler.clear()
+    db = DbHandler()
+    snapshot = db.get_listing_snapshot()
+    target = snapshot.listings[3]
+    db.update_listing_in_db(dict(target.copy(), title="Casio FX-991EX calculator"), target["id"])
+    assert db.keyword_search("fx-991ex", 3)[0][0] == target["id"]
+    db.delete_listing_by_id(target["id"], target["user"])
+    assert db.keyword_search("fx991ex") == []
+    assert db.snapshots.stats()["full_loads"] == 1
+
+    def bedrock_down(**kwargs):
+        raise ConnectionError("Could not connect to the endpoint URL")
+    db.llm_client.invoke_model = bedrock_down
+    keyword_only = [listing_id for listing_id, _ in db.keyword_search("desk lamp", 5)]
+    assert db.hybrid_search("desk lamp", 5) == keyword_only
+    print("✅ Keyword index updates on writes and serves search without Bedrock")
+
+
+if __name__ == "__main__":
+    test_tokenize_model_numbers()
+    test_bm25_ranking()
+    test_index_follows_writes_and_survives_bedrock_outage()
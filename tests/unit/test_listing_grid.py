@@ -0,0 +1,56 @@
+"""
+Test the paginated listing grid (Streamlit AppTest, no server needed)
+"""
+from streamlit.testing.v1 import AppTest
+
+from src.ui.helpers.listing_grid import page_bounds
+
+
+def grid_app():
+    import streamlit as st
+    from src.ui.helpers.listing_grid import paginated_grid
+
+    items = [{"id": 100 + i, "title": f"Item {i}"} for i in range(45)]
+    category = st.selectbox("Category", ["All", "Books"])
+
+    @st.fragment
+    def grid():
+        shown = items if category == "All" else items[:5]
+        paginated_grid(shown, "grid", lambda item: st.button(item["title"], key=f"card_{item['id']}"),
+                       reset_on=category)
+
+    grid()
+
+
+def _cards(at):
+    # Cards are laid out in columns, so compare ids regardless of order
+    return sorted(button.key for button in at.button if button.key.startswith("card_"))
+
+
+def test_page_bounds():
+    assert page_bounds(45, 0, 20) == (0, 20, 0, 3)
+    assert page_bounds(45, 2, 20) == (40, 45, 2, 3)
+    # Out-of-range pages are clamped (e.g. after listings were deleted)
+    assert page_bounds(45, 7, 20) == (40, 45, 2, 3)
+    assert page_bounds(0, 3, 20) == (0, 0, 0, 1)
+    print("✅ Page bounds are clamped to the available pages")
+
+
+def test_grid_renders_one_page():
+    at = AppTest.from_function(grid_app).run()
+    assert _cards(at) == sorted(f"card_{100 + i}" for i in range(20))
+
+    at.button(key="grid_next").click().run()
+    assert _cards(at) == sorted(f"card_{120 + i}" for i in range(20))
+    assert at.session_state["grid_page"] == 1
+
+    # A filter change goes back to the first page
+    at.selectbox[0].select("Books").run()
+    assert _cards(at) == sorted(f"card_{100 + i}" for i in range(5))
+    assert not any(button.key == "grid_next" for button in at.button)
+    print("✅ Only the current page of cards is rendered, keyed by listing id")
+
+
+if __name__ == "__main__":
+    test_page_bounds()
+    test_grid_renders_one_page()
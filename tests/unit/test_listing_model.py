@@ -0,0 +1,80 @@
+"""
+Test the typed Listing model and its row conversion
+"""
+from datetime import datetime, timezone
+
+from src.core.listing import ENUM_LABELS, ENUM_VALUES, Listing, enum_label, enum_value, listing_to_row, match_label
+from src.core.listing_filters import filter_and_sort
+
+ROW = {
+    "id": 7, "user": "uid-1", "title": "Desk lamp", "description": "Warm light", "price": 12.5,
+    "age": 1, "reason": "Moving", "brand": "IKEA", "price_negotiable": True, "university": "nus",
+    "address": "UTown", "delivery_option": "third-party_delivery", "category": "furniture_and_appliances",
+    "condition": "like_new", "seller_email": "a@b.c", "created_at": "2025-03-04T05:06:07.000000+00:00",
+}
+
+
+def test_row_round_trip():
+    listing = Listing.from_row(ROW, "alice")
+    assert listing["user"] == "alice"
+    assert listing["university"] == "NUS"
+    assert listing["delivery_option"] == "Third-party Delivery"
+    assert listing["category"] == "Furniture and Appliances"
+    assert listing["price_negotiable"] == "Yes"
+    assert listing["date_posted"] == "04 March 2025, 05:06"
+    row = listing_to_row(listing)
+    assert row == {key: ROW[key] for key in row}
+    print("✅ Rows convert to listings and back unchanged")
+
+
+def test_enum_tables_fall_back_for_unknown_values():
+    assert enum_label("category", "garden_tools") == "Garden Tools"
+    assert enum_value("Garden Tools") == "garden_tools"
+    # Unknown values are converted, not learned into the shared tables
+    assert "garden_tools" not in ENUM_LABELS["category"] and "Garden Tools" not in ENUM_VALUES
+    assert enum_label("condition", None) is None
+    print("✅ Unknown enum values use the legacy formatting")
+
+
+def test_mapping_api():
+    listing = Listing.from_row(ROW, "alice")
+    listing["title"] = "Lamp"
+    listing["price_negotiable"] = "No"
+    assert listing.get("title") == "Lamp" and not listing.negotiable
+    assert "image" in listing and "missing" not in listing
+    assert listing.get("image", "none") == "none"
+    assert listing.copy()["date_posted"] == listing.date_posted
+    try:
+        listing["sort_time"]
+        assert False, "unknown keys should raise KeyError"
+    except KeyError:
+        pass
+    print("✅ Listings behave like the session dicts they replace")
+
+
+def test_sort_by_created_at():
+    rows = [dict(ROW, id=i, created_at=datetime(2025, month, 1, tzinfo=timezone.utc).isoformat())
+            for i, month in ((1, 9), (2, 10), (3, 2))]
+    listings = Listing.from_rows(rows, {"uid-1": "alice"}) + [Listing(id=4, title="Desk draft")]
+    # "01 October" < "01 September" < ... as strings; the datetime order is the real one
+    assert [l.id for l in filter_and_sort(listings, sort_option="Newest")] == [2, 1, 3, 4]
+    assert [l.id for l in filter_and_sort(listings, sort_option="Oldest")] == [4, 3, 1, 2]
+    print("✅ Newest/Oldest sort on created_at")
+
+
+def test_match_free_text_labels():
+    assert match_label("category", "tech and gadgets") == "Tech and Gadgets"
+    assert match_label("category", "Tech & Gadgets") == "Tech and Gadgets"
+    assert match_label("category", "Furniture") == "Furniture and Appliances"
+    assert match_label("category", "textbook and study material") == "Textbooks and Study Materials"
+    assert match_label("category", "spaceships") is None
+    assert match_label("category", "") is None
+    print("✅ Free-text labels map to known labels or to no filter")
+
+
+if __name__ == "__main__":
+    test_row_round_trip()
+    test_enum_tables_fall_back_for_unknown_values()
+    test_mapping_api()
+    test_sort_by_created_at()
+    test_match_free_text_labels()
@@ -0,0 +1,133 @@
+"""
+Test the process-wide listing snapshot shared by every session (offline)
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp()
+os.environ["OFFLINE_SEED_LISTINGS"] = "300"
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.listing_snapshot import ListingSnapshotStore
+
+
+def test_sessions_share_one_snapshot():
+    DbHandler.clear()
+    db = DbHandler()
+    barrier = threading.Barrier(200)
+
+    def session(_):
+        barrier.wait()
+        return db.get_listing_snapshot()
+
+    with ThreadPoolExecutor(max_workers=200) as pool:
+        snapshots = list(pool.map(session, range(200)))
+    assert len({id(s.listings) for s in snapshots}) == 1
+    assert db.snapshots.version == 1 and len(snapshots[0]) == 300
+    print("✅ 200 sessions hold one copy of the catalog")
+
+
+def test_writes_copy_on_write():
+    DbHandler.clear()
+    db = DbHandler()
+    before = db.get_listing_snapshot()
+    listing = before.listings[0].copy()
+    listing["title"] = "Renamed lamp"
+    db.update_listing_in_db(listing, listing["id"])
+
+    after = db.get_listing_snapshot()
+    assert after.version == before.version + 1
+    assert after.get(listing["id"])["title"] == "Renamed lamp"
+    # Sessions still rendering the old version are unaffected
+    assert before.get(listing["id"])["title"] != "Renamed lamp"
+    assert not db.snapshots.is_current(before.version)
+    print("✅ Writes publish a new snapshot version")
+
+
+def test_failed_build_stays_stale():
+    store = ListingSnapshotStore()
+
+    def broken():
+        raise RuntimeError("db down")
+    try:
+        store.current(broken)
+        assert False, "build errors should propagate"
+    except RuntimeError:
+        pass
+    assert store.current(lambda: ([{"id": 1}], None)).get(1) == {"id": 1}
+    print("✅ A failed rebuild is retried by the next reader")
+
+
+def test_writes_sync_only_changed_rows():
+    DbHandler.clear()
+    db = DbHandler()
+    before = db.get_listing_snapshot()
+    first, second = before.listings[0], before.listings[1]
+
+    new_listing = dict(first.copy(), title="Delta sync kettle", image=None)
+    db.save_listing_to_db(new_listing)
+    edited = dict(second.copy(), price=1.0)
+    db.update_listing_in_db(edited, second["id"])
+    db.delete_listing_by_id(first["id"], first["user"])
+
+    delta = db.get_listings_changed_since(before.watermark)
+    assert [item["title"] for item in delta.inserted] == ["Delta sync kettle"]
+    # Rows just before the watermark are fetched again (sync overlap window)
+    assert second["id"] in [item["id"] for item in delta.updated]
+    assert delta.deleted == [first["id"]]
+
+    after = db.get_listing_snapshot()
+    assert len(after) == len(before)
+    assert after.get(first["id"]) is None and after.get(second["id"])["price"] == 1.0
+    assert after.listings[-1]["title"] == "Delta sync kettle"
+    # Unchanged listings are shared with the previous snapshot, not reloaded
+    assert after.get(before.listings[5]["id"]) is before.listings[5]
+    stats = db.snapshots.stats()
+    assert stats["full_loads"] == 1 and stats["delta_rows"] == 3
+
+    # Re-fetched rows the snapshot already has do not publish a new version
+    assert db.refresh_listing_snapshot() is after
+    print("✅ Writes refresh the snapshot with a 3-row delta")
+
+
+class _MissingTable(Exception):
+    code = "42P01"
+
+
+class _PreMigrationClient:
+    """Database client without listing_tombstone (sql/002 not applied)"""
+    def __init__(self, db_client):
+        self.db_client = db_client
+
+    def table(self, name):
+        if name == "listing_tombstone":
+            raise _MissingTable('relation "listing_tombstone" does not exist')
+        return self.db_client.table(name)
+
+
+def test_missing_migrations_fail_clearly():
+    DbHandler.clear()
+    db = DbHandler()
+    db._check_schema()  # the offline schema has every migration
+
+    db.db_client = _PreMigrationClient(db.db_client)
+    try:
+        db._check_schema()
+        assert False, "a missing migration should stop start-up"
+    except RuntimeError as e:
+        assert "sql/002_listing_delta_sync.sql" in str(e) and "001" not in str(e)
+    print("✅ A database without the sql/ migrations fails with the migration to apply")
+
+
+if __name__ == "__main__":
+    test_sessions_share_one_snapshot()
+    test_writes_copy_on_write()
+    test_failed_build_stays_stale()
+    test_writes_sync_only_changed_rows()
+    test_missing_migrations_fail_clearly()
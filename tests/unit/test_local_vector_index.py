@@ -0,0 +1,133 @@
+"""
+Test the in-process LocalVectorIndex backend
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.core.vector_backends import LocalVectorIndex
+from src.core import vector_filters
+from src.core.vector_filters import build_vector_filters, matches_filter
+
+DIM = 32
+
+
+def _index(n=500, **kwargs):
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((n, DIM)).astype("float32")
+    index = LocalVectorIndex(dimension=DIM, **kwargs)
+    index.upsert([
+        (str(i), vectors[i], {"category": "tech_and_gadgets" if i % 2 else "furniture_and_appliances",
+                              "price": float(i)})
+        for i in range(n)
+    ])
+    return index, vectors
+
+
+def test_exact_top_k_and_filters():
+    index, vectors = _index()
+    hits = index.query(vectors[42], limit=3, include_value=True)
+    assert hits[0][0] == "42" and hits[0][1] < 1e-5
+
+    filters = build_vector_filters({"category": "Tech and Gadgets", "max_price": 100})
+    hits = index.query(vectors[42], limit=10, filters=filters, include_metadata=True, include_value=True)
+    assert hits and all(m["category"] == "tech_and_gadgets" and m["price"] <= 100 for _, _, m in hits)
+    print("✅ Exact and filtered top-k")
+
+
+def test_column_filters_match_python_filters():
+    index, vectors = _index(n=300)
+    # Rows a column cannot answer alone: a missing price, a list value, a university
+    index.upsert([("3", vectors[3], {"category": "tech_and_gadgets"}),
+                  ("5", vectors[5], {"category": ["tech_and_gadgets"], "price": 5.0}),
+                  ("8", vectors[8], {"category": "furniture_and_appliances", "price": 8.0, "university": "nus"})])
+    index.delete(ids=["10", "11"])  # moves the last rows into the holes
+
+    filters = [
+        build_vector_filters({"category": "Tech and Gadgets", "max_price": 100}),
+        build_vector_filters({"category": ["Tech and Gadgets", "Books"], "min_price": 250}),
+        build_vector_filters({"university": "NUS", "max_price": 50}),
+        {"$or": [{"category": {"$ne": "tech_and_gadgets"}}, {"price": {"$eq": 3}}]},
+        {"condition": {"$eq": "new"}},
+    ]
+    records = index.fetch([str(i) for i in range(300)])
+    expected = [{i for i, _, m in records if matches_filter(m, f)} for f in filters]
+    python_calls = []
+
+    def counted(metadata, vector_filter):
+        python_calls.append((metadata, vector_filter))
+        return matches_filter(metadata, vector_filter)
+
+    vector_filters.matches_filter = counted
+    try:
+        for vector_filter, ids in zip(filters, expected):
+            assert set(index.query(vectors[0], limit=300, filters=vector_filter)) == ids
+        # Column clauses are masks; Python only checks the irregular row and the university clause
+        assert python_calls and all(isinstance(m["category"], list) or "university" in f
+                                    for m, f in python_calls)
+    finally:
+        vector_filters.matches_filter = matches_filter
+    print("✅ Category/condition/price filters are vectorized and agree with matches_filter")
+
+
+def test_upsert_delete_and_snapshot():
+    index, vectors = _index()
+    index.delete(ids=["42"])
+    assert "42" not in index.query(vectors[42], limit=5)
+    index.upsert([("42", vectors[7], {"price": 1.0})])
+    assert index.fetch(["42"])[0][2] == {"price": 1.0}
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "vectors.npz")
+        index.path = path
+        index.save()
+        restored = LocalVectorIndex(dimension=DIM, path=path)
+        assert len(restored) == len(index)
+        assert restored.query(vectors[7], limit=2) == index.query(vectors[7], limit=2)
+    print("✅ Incremental writes survive a snapshot round-trip")
+
+
+def test_graph_search_recall():
+    index, vectors = _index(n=2000, graph_threshold=1000)
+    index.create_index()
+    exact, _ = _index(n=2000)
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((20, DIM)).astype("float32")
+    recall = np.mean([
+        len(set(index.query(q, limit=10)) & set(exact.query(q, limit=10))) / 10
+        for q in queries
+    ])
+    assert recall >= 0.9
+    print(f"✅ Graph search recall@10: {recall:.2f}")
+
+
+def test_graph_survives_metadata_updates():
+    index, vectors = _index(n=1200, graph_threshold=1000)
+    index.create_index()
+    graph = index._graph
+
+    # Re-upserting the same vectors with new metadata keeps the graph
+    index.upsert([(str(i), vectors[i], {"price": 1.0}) for i in range(100)])
+    index.query(vectors[3], limit=5)
+    assert index._graph is graph and index._graph_current() and not index._rebuilding
+
+    # A moved vector makes the graph stale: queries stay exact, rebuild runs in the background
+    index.upsert([("3", vectors[900], {"price": 1.0})])
+    assert not index._graph_current()
+    assert set(index.query(vectors[900], limit=2)) == {"3", "900"}
+    for _ in range(200):
+        if index._graph_current():
+            break
+        time.sleep(0.05)
+    assert index._graph_current() and index._graph is not graph
+    print("✅ Metadata updates keep the graph; stale graphs rebuild off the query path")
+
+
+if __name__ == "__main__":
+    test_exact_top_k_and_filters()
+    test_column_filters_match_python_filters()
+    test_upsert_delete_and_snapshot()
+    test_graph_search_recall()
+    test_graph_survives_metadata_updates()
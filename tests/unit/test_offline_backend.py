@@ -0,0 +1,159 @@
+"""
+Test DbHandler end to end against the offline stand-in backends
+(SQLite tables, deterministic embeddings, in-process vectors)
+"""
+import os
+import tempfile
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp()
+os.environ["OFFLINE_SEED_LISTINGS"] = "300"
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.offline import OfflineDatabase, OfflineEmbeddingClient
+from src.utils import tracing
+
+
+def _handler():
+    # A fresh in-memory database is seeded on construction
+    DbHandler.clear()
+    return DbHandler()
+
+
+def test_query_builder_keyset_grammar():
+    database = OfflineDatabase()
+    database.table("listing").insert([
+        {"created_at": "2025-01-01T00:00:00.000000+00:00", "title": "a"},
+        {"created_at": "2025-01-01T00:00:00.000000+00:00", "title": "b"},
+        {"created_at": "2025-01-02T00:00:00.000000+00:00", "title": "c"},
+    ]).execute()
+    rows = database.table("listing").select("id, title").or_(
+        'created_at.gt."2025-01-01T00:00:00.000000+00:00",'
+        'and(created_at.eq."2025-01-01T00:00:00.000000+00:00",id.gt.1)'
+    ).order("created_at").order("id").execute().data
+    assert [r["title"] for r in rows] == ["b", "c"]
+    assert database.table("listing").select("id").not_.is_("title", "null").execute().data
+    print("✅ or_/not_ filters follow PostgREST semantics")
+
+
+def test_deterministic_embeddings():
+    client = OfflineEmbeddingClient()
+    assert client.embed("Sony Headphones") == client.embed("sony   headphones")
+    near = sum(a * b for a, b in zip(client.embed("sony headphones"), client.embed("sony wireless headphones")))
+    far = sum(a * b for a, b in zip(client.embed("sony headphones"), client.embed("study desk")))
+    assert near > far
+    print("✅ Embeddings are deterministic and lexically meaningful")
+
+
+def test_db_handler_offline_round_trip():
+    db = _handler()
+    listings = db.get_listings()
+    assert len(listings) == 300
+    assert all(isinstance(item["user"], str) for item in listings)
+
+    # Pages are contiguous and newest-first ordering is honoured
+    pages = list(db.iter_listing_pages(page_size=64, newest_first=True))
+    ids = [item["id"] for page in pages for item in page]
+    assert len(ids) == len(set(ids)) == 300
+
+    # Semantic search finds the listing it was seeded from, and filters apply
+    target = listings[17]
+    assert target["id"] in db.query_try(target["title"] + " " + target["description"], 5)
+    filtered = db.query_try("headphones", 10, filters={"category": target["category"]})
+    assert all(item["category"] == target["category"] for item in db.get_listings(ids=filtered))
+
+    # Writes go through the same code paths as the live backends
+    new_listing = {
+        "user": listings[0]["user"], "title": "Offline Test Lamp", "description": "A very offline lamp",
+        "price": 12.5, "age": 3, "reason": "Moving out", "brand": "IKEA", "price_negotiable": "Yes",
+        "university": "NUS", "address": "Block 1", "delivery_option": "Buyer Pickup",
+        "category": "Furniture and Appliances", "condition": "Used", "date_posted": None, "image": None,
+    }
+    assert db.save_listing_to_db(new_listing)
+    assert len(db.get_listings()) == 301
+    print("✅ DbHandler runs fully offline")
+
+
+def test_update_skips_unchanged_embeddings():
+    db = _handler()
+    listing = dict(db.get_listings()[5])
+    skipped, calls = db.embeddings_skipped, db.llm_client.calls
+
+    # Price is metadata only: the stored vector is kept, the filter sees the new price
+    listing["price"] = 4321.0
+    assert db.update_listing_in_db(listing, listing["id"])
+    assert db.embeddings_skipped == skipped + 1 and db.llm_client.calls == calls
+    assert listing["id"] in db.query_try(listing["title"], 5, filters={"min_price": 4321})
+
+    # A new title changes the searchable text, so the listing is embedded again
+    calls = db.llm_client.calls
+    listing["title"] = "Completely Renamed Offline Lantern"
+    assert db.update_listing_in_db(listing, listing["id"])
+    assert db.embeddings_skipped == skipped + 1 and db.llm_client.calls == calls + 1
+    print("✅ Updates only re-embed listings whose searchable text changed")
+
+
+def test_query_results_cached_until_write():
+    db = _handler()
+    listings = db.get_listings()
+    text, filters = "offline cache probe headphones", {"category": listings[0]["category"]}
+
+    def lookup():
+        # (embedding calls, database statements) spent by one query
+        calls, trips = db.llm_client.calls, db.db_client.round_trips
+        results = db.query(text, 5, filters)
+        return results, db.llm_client.calls - calls, db.db_client.round_trips - trips
+
+    first, calls, _ = lookup()
+    assert calls == 1
+    hits = db.query_cache.stats()["hits"]
+    assert lookup() == (first, 0, 0)
+    assert db.query_cache.stats()["hits"] == hits + 1
+
+    # Every kind of listing write makes the next query miss
+    new_listing = dict(listings[1], title="Offline Cache Probe Lamp", image=None)
+    writes = [
+        lambda: db.save_listing_to_db(new_listing),
+        lambda: db.update_listing_in_db(dict(listings[2], price=1.0), listings[2]["id"]),
+        lambda: db.delete_listing_by_id(listings[3]["id"], listings[3]["user"]),
+    ]
+    for write in writes:
+        assert write()
+        hits = db.query_cache.stats()["hits"]
+        lookup()
+        assert db.query_cache.stats()["hits"] == hits
+        lookup()
+        assert db.query_cache.stats()["hits"] == hits + 1
+    print("✅ Repeat queries are served from the cache until a listing is written")
+
+
+def test_listing_scan_traces_pages_not_rows():
+    db = _handler()
+    exporter = tracing.MemoryExporter()
+    tracing.configure([exporter])
+    tracing.set_session("scan")
+    try:
+        assert len(db.get_listings()) == 300
+    finally:
+        tracing.configure([])
+        tracing.set_session(None)
+
+    def count(node):
+        return 1 + sum(count(child) for child in node["children"])
+    trace, = exporter.traces_for("scan")
+    assert trace["name"] == "db.get_listings"
+    # One span per page of 500 (plus its row conversion), not one per listing
+    assert count(trace) < 20
+    print("✅ Listing scans record one span per page")
+
+
+if __name__ == "__main__":
+    test_query_builder_keyset_grammar()
+    test_deterministic_embeddings()
+    test_db_handler_offline_round_trip()
+    test_update_skips_unchanged_embeddings()
+    test_query_results_cached_until_write()
+    test_listing_scan_traces_pages_not_rows()
@@ -0,0 +1,103 @@
+"""
+Test the market price statistics API (offline)
+"""
+import os
+import tempfile
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp()
+os.environ["OFFLINE_SEED_LISTINGS"] = "300"
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.price_stats import PriceIndex, age_bucket, percentile, summarize_prices
+from src.core.listing_snapshot import ListingSnapshot
+
+
+def test_summary_matches_percentile_cont():
+    summary = summarize_prices([10.0, 20.0, 30.0, 40.0])
+    assert summary["count"] == 4 and summary["mean"] == 25.0
+    assert summary["median"] == 25.0 and summary["p25"] == 17.5 and summary["p90"] == 37.0
+    assert percentile([5.0], 0.9) == 5.0
+    assert summarize_prices([])["mean"] is None
+    print("✅ Percentiles interpolate like percentile_cont")
+
+
+def test_price_stats_in_one_round_trip():
+    DbHandler.clear()
+    db = DbHandler()
+    listings = db.get_listings()
+    prices = sorted(item["price"] for item in listings
+                    if item["category"] == "Tech and Gadgets" and item["condition"] == "Used" and item["price"])
+
+    trips = db.db_client.round_trips
+    stats = db.get_price_stats(category="Tech and Gadgets", condition="Used")
+    assert db.db_client.round_trips == trips + 1
+    assert stats["count"] == len(prices)
+    assert stats["min"] == round(prices[0], 2) and stats["max"] == round(prices[-1], 2)
+    assert stats["median"] == round(percentile(prices, 0.5), 2)
+    assert db.get_price_stats(category="No Such Category")["count"] == 0
+    print("✅ Category/condition stats come back as one row")
+
+
+def test_fallback_without_sql_function():
+    DbHandler.clear()
+    db = DbHandler()
+    expected = db.get_price_stats(category="Furniture and Appliances")
+
+    def missing(name, params=None):
+        raise RuntimeError(f"function {name} does not exist")
+    db.db_client.rpc = missing
+    assert db.get_price_stats(category="Furniture and Appliances") == expected
+    print("✅ Stats are aggregated locally when the SQL function is missing")
+
+
+def _comparables(listings, category, condition, max_age):
+    return sorted(item["price"] for item in listings
+                  if item["category"] == category and item["condition"] == condition
+                  and age_bucket(item["age"]) < age_bucket(max_age) and item["price"])
+
+
+def test_price_index_queries():
+    rows = [{"id": i, "category": "Tech and Gadgets", "condition": "Like New", "age": age, "price": price}
+            for i, (age, price) in enumerate([(2, 100.0), (5, 200.0), (8, 300.0), (11, 400.0), (30, 900.0)])]
+    index = PriceIndex()
+    index.on_snapshot(ListingSnapshot(1, rows))
+    query = ("Tech and Gadgets", "Like New", 12)
+    assert index.prices(*query) == (100.0, 200.0, 300.0, 400.0)
+    assert index.percentile(0.5, *query) == 250.0
+    assert index.rank(250.0, *query) == {"count": 4, "cheaper": 2, "pricier": 2, "percentile": 50.0}
+    # Bins are [100, 200), [200, 300), [300, 400]
+    assert [b["count"] for b in index.histogram(*query, bins=3)] == [1, 1, 2]
+    assert index.summary("Tech and Gadgets")["max"] == 900.0
+    # No category (unrecognised tool input) spans every category
+    assert index.prices(None, "Like New") == (100.0, 200.0, 300.0, 400.0, 900.0)
+    print("✅ Percentile, rank and histogram queries on sorted prices")
+
+
+def test_price_index_follows_writes():
+    DbHandler.clear()
+    db = DbHandler()
+    index = db.get_price_index()
+    target = next(item for item in db.get_listing_snapshot() if item["age"] < 12 and item["price"])
+    query = (target["category"], target["condition"], 12)
+
+    edited = dict(target.copy(), price=target["price"] + 1000.0)
+    db.update_listing_in_db(edited, target["id"])
+    db.save_listing_to_db(dict(target.copy(), price=3.0, image=None))
+    index = db.get_price_index()
+
+    assert db.snapshots.stats()["full_loads"] == 1
+    assert list(index.prices(*query)) == _comparables(db.get_listings(), *query)
+    assert index.rank(3.0, *query)["cheaper"] == 0
+    print("✅ The price index is updated incrementally by listing writes")
+
+
+if __name__ == "__main__":
+    test_summary_matches_percentile_cont()
+    test_price_stats_in_one_round_trip()
+    test_fallback_without_sql_function()
+    test_price_index_queries()
+    test_price_index_follows_writes()
@@ -0,0 +1,66 @@
+"""
+Test paginated ranked search (offline)
+"""
+import os
+import tempfile
+
+os.environ["KAIROS_BACKEND"] = "offline"
+os.environ["OFFLINE_DB_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp()
+os.environ["OFFLINE_SEED_LISTINGS"] = "300"
+os.environ.pop("VECTOR_INDEX_PATH", None)
+
+from src.core.db_handler import DbHandler
+from src.core.ranked_search import paginate
+
+
+def test_paginate():
+    ranking = [(i, 1.0 / (i + 1)) for i in range(5)]
+    page, cursor = paginate(ranking, 2)
+    assert page == ranking[:2] and cursor == "2"
+    page, cursor = paginate(ranking, 2, cursor)
+    assert page == ranking[2:4] and cursor == "4"
+    page, cursor = paginate(ranking, 2, cursor)
+    assert page == ranking[4:] and cursor is None
+    try:
+        paginate(ranking, 2, "not-a-cursor")
+        assert False, "invalid cursor accepted"
+    except ValueError:
+        pass
+    print("✅ Cursors walk the ranking page by page")
+
+
+def test_ranked_search_pages():
+    DbHandler.clear()
+    db = DbHandler()
+    first = db.ranked_search("desk lamp", limit=5)
+    assert len(first.results) == 5 and first.next_cursor
+    assert all(listing["id"] for listing, _ in first.results)
+    scores = [score for _, score in first.results]
+    assert scores == sorted(scores, reverse=True)
+
+    second = db.ranked_search("desk lamp", limit=5, cursor=first.next_cursor)
+    first_ids = {listing["id"] for listing in first.listings()}
+    assert first_ids.isdisjoint(listing["id"] for listing in second.listings())
+    assert first.total == second.total <= 200
+
+    # Listings come from the shared snapshot, not one query per listing
+    assert first.results[0][0] is db.get_listing_snapshot().get(first.results[0][0]["id"])
+    print("✅ Ranked search returns hydrated, non-overlapping pages")
+
+
+def test_similarity_threshold():
+    DbHandler.clear()
+    db = DbHandler()
+    everything = db.ranked_search("desk lamp", limit=500, min_similarity=-1.0)
+    keyword_only = db.ranked_search("desk lamp", limit=500, min_similarity=1.01)
+    assert keyword_only.total == len(db.keyword_search("desk lamp", 200))
+    assert keyword_only.total <= everything.total
+    print("✅ Vector hits below the similarity threshold are dropped")
+
+
+if __name__ == "__main__":
+    test_paginate()
+    test_ranked_search_pages()
+    test_similarity_threshold()
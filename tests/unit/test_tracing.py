@@ -0,0 +1,113 @@
+"""
+Test the tracing spans, decorators and exporters
+"""
+import time
+
+from src.utils import tracing
+from src.utils.tracing import MemoryExporter, configure, set_session, span, traced, traced_methods
+
+
+@traced_methods("shop")
+class _Shop:
+    def search(self, text):
+        with span("vectors.query", k=3) as s:
+            s.set(rows=3)
+        return self._hydrate([1, 2, 3])
+
+    def _hydrate(self, ids):
+        return ids
+
+    def pages(self):
+        yield [1, 2]
+        yield [3]
+
+
+def test_nested_spans_are_exported_once():
+    exporter = MemoryExporter()
+    configure([exporter])
+    set_session("session-1")
+    try:
+        _Shop().search("desk")
+        traces = exporter.traces_for("session-1")
+        assert len(traces) == 1
+        root = traces[0]
+        assert root["name"] == "shop.search"
+        assert [c["name"] for c in root["children"]] == ["vectors.query", "shop._hydrate"]
+        assert root["children"][0]["attrs"] == {"k": 3, "rows": 3}
+    finally:
+        configure([])
+        set_session(None)
+    print("✅ Spans nest and export as one tree")
+
+
+def test_generator_spans_and_errors():
+    exporter = MemoryExporter()
+    configure([exporter])
+    set_session("session-1")
+    try:
+        assert list(_Shop().pages()) == [[1, 2], [3]]
+        assert [t["name"] for t in exporter.traces_for("session-1")] == ["shop.pages"] * 3
+
+        @traced("boom")
+        def boom():
+            raise ValueError("bad")
+        try:
+            boom()
+        except ValueError:
+            pass
+        assert exporter.traces_for("session-1")[-1]["error"] == "ValueError: bad"
+    finally:
+        configure([])
+        set_session(None)
+    print("✅ Generators get one span per item; errors are recorded")
+
+
+def test_memory_traces_are_per_session():
+    exporter = MemoryExporter(max_sessions=2)
+    configure([exporter])
+    try:
+        for session_id, text in (("alice", "desk"), ("bob", "lamp")):
+            set_session(session_id)
+            with span("db.query", text=text):
+                pass
+        assert [t["attrs"]["text"] for t in exporter.traces_for("alice")] == ["desk"]
+        assert [t["attrs"]["text"] for t in exporter.traces_for("bob")] == ["lamp"]
+
+        # Traces outside a session are not kept; old sessions are dropped
+        set_session(None)
+        with span("db.query", text="background"):
+            pass
+        set_session("carol")
+        with span("db.query"):
+            pass
+        assert exporter.traces_for(None) == [] and exporter.traces_for("alice") == []
+        exporter.clear("bob")
+        assert exporter.traces_for("bob") == []
+    finally:
+        configure([])
+        set_session(None)
+    print("✅ The trace panel only sees its own session's traces")
+
+
+def test_disabled_overhead():
+    configure([])
+    assert not tracing.enabled()
+    assert span("anything") is span("else")
+
+    @traced("noop")
+    def add(a, b):
+        return a + b
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        add(1, 2)
+    per_call = (time.perf_counter() - start) / 100_000
+    assert per_call < 5e-6
+    print(f"✅ Disabled tracing costs {per_call * 1e9:.0f} ns per call")
+
+
+if __name__ == "__main__":
+    test_nested_spans_are_exported_once()
+    test_generator_spans_and_errors()
+    test_memory_traces_are_per_session()
+    test_disabled_overhead()
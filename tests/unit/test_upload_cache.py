@@ -0,0 +1,147 @@
+"""
+Test memoized upload processing across reruns (Streamlit AppTest)
+"""
+import io
+import time
+from concurrent.futures import Future
+
+from PIL import Image
+from streamlit.testing.v1 import AppTest
+
+from src.ui.helpers.upload_cache import UploadCache
+
+
+def _jpeg(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (900, 600), color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def upload_app():
+    import io
+    import streamlit as st
+    from PIL import Image
+    from src.ui.helpers.upload_cache import get_upload_cache, processed_upload, upload_pending
+
+    class Upload:
+        # Stands in for st.file_uploader's UploadedFile
+        def __init__(self, file_id, color):
+            buf = io.BytesIO()
+            if color:
+                Image.new("RGB", (900, 600), color).save(buf, format="JPEG")
+            else:
+                buf.write(b"not an image")
+            self.file_id, self._data = file_id, buf.getvalue()
+
+        def getvalue(self):
+            st.session_state.reads = st.session_state.get("reads", 0) + 1
+            return self._data
+
+    st.text_input("Title")
+    choice = st.selectbox("Upload", ["none", "red", "red again", "blue", "broken"])
+    upload = {"red": Upload("f1", "red"), "red again": Upload("f2", "red"), "blue": Upload("f3", "blue"),
+              "broken": Upload("f4", None)}.get(choice)
+    processed = processed_upload(upload, "post_image")
+    st.session_state.size = len(processed) if processed else 0
+    st.session_state.pending = upload_pending(upload, "post_image")
+    st.session_state.stats = get_upload_cache().stats()
+
+
+def _settle(at, timeout=30):
+    """Reruns the app until the upload has been processed off the script thread"""
+    deadline = time.monotonic() + timeout
+    while at.session_state["pending"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+        at.run()
+    return at
+
+
+def test_cache_is_keyed_by_content():
+    cache = UploadCache(max_entries=1)
+    red = cache.process(_jpeg("red"))
+    assert cache.process(_jpeg("red")) is red
+    cache.process(_jpeg("blue"))
+    assert cache.get(cache.content_hash(_jpeg("red"))) is None  # bounded: evicted
+    assert cache.stats() == {"hits": 1, "misses": 2}
+    print("✅ Processed uploads are memoized by content hash")
+
+
+def test_submit_does_not_wait():
+    cache = UploadCache()
+    data = _jpeg("green")
+    future = cache.submit(data)
+    assert isinstance(future, Future)
+    processed = future.result(timeout=30)
+    # Submitting again joins the running job or finds its result
+    assert cache.process(data) == processed and cache.stats()["misses"] == 1
+    print("✅ Uploads are processed in the background; identical uploads share the job")
+
+
+def test_release_keeps_shared_entries():
+    cache = UploadCache()
+    data = _jpeg("purple")
+    content_hash = cache.content_hash(data)
+    cache.process(data, content_hash)
+    # Two sessions hold the same photo; one clearing its widget keeps it for the other
+    cache.retain(content_hash)
+    cache.retain(content_hash)
+    cache.release(content_hash)
+    assert cache.get(content_hash) is not None
+    cache.release(content_hash)
+    assert cache.get(content_hash) is None
+    print("✅ Released uploads are only evicted once no widget holds them")
+
+
+def test_failed_upload_is_not_pending():
+    cache = UploadCache()
+    try:
+        cache.process(b"not an image")
+        assert False, "undecodable bytes should fail"
+    except OSError:
+        pass
+    # Recorded as failed rather than left pending; submitting again retries
+    failed = cache.lookup(cache.content_hash(b"not an image"))
+    assert failed.exception() is not None
+    assert cache.submit(b"not an image") is not failed
+
+    at = AppTest.from_function(upload_app).run()
+    _settle(at.selectbox[0].select("broken").run())
+    assert len(at.error) == 1 and not at.session_state["pending"]
+    # The error is shown once; reruns neither repeat it nor reprocess the file
+    misses = at.session_state["stats"]["misses"]
+    at.text_input[0].input("Lamp").run()
+    assert not at.error and not at.session_state["pending"]
+    assert at.session_state["stats"]["misses"] == misses
+    print("✅ A failed upload is reported once and no longer counts as pending")
+
+
+def test_reruns_do_no_image_work():
+    at = AppTest.from_function(upload_app).run()
+    _settle(at.selectbox[0].select("red").run())
+    assert at.session_state["size"] > 0
+    reads, misses = at.session_state["reads"], at.session_state["stats"]["misses"]
+
+    # Typing in another field reruns the script but never touches the image
+    for text in ("L", "La", "Lamp"):
+        at.text_input[0].input(text).run()
+    assert at.session_state["reads"] == reads
+    assert at.session_state["stats"]["misses"] == misses
+
+    # The same photo uploaded again is read and hashed, but not re-encoded
+    _settle(at.selectbox[0].select("red again").run())
+    assert at.session_state["stats"]["misses"] == misses
+
+    # Clearing the upload releases it; no other session holds it, so it is evicted
+    at.selectbox[0].select("none").run()
+    assert at.session_state["size"] == 0 and at.session_state["upload_slots"] == {}
+    _settle(at.selectbox[0].select("red").run())
+    assert at.session_state["stats"]["misses"] == misses + 1
+    print("✅ Reruns reuse the processed upload; clearing it evicts the entry")
+
+
+if __name__ == "__main__":
+    test_cache_is_keyed_by_content()
+    test_submit_does_not_wait()
+    test_release_keeps_shared_entries()
+    test_failed_upload_is_not_pending()
+    test_reruns_do_no_image_work()
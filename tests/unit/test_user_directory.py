@@ -0,0 +1,90 @@
+"""
+Test the process-wide UserDirectory used by DbHandler
+Counts user_profile round-trips against a stub Supabase client
+"""
+from types import SimpleNamespace
+
+from src.core.user_directory import UserDirectory
+
+USERS = [{"id": i, "username": f"user{i}"} for i in range(1, 51)]
+
+
+class _Query:
+    def __init__(self, client):
+        self.client = client
+        self.filters = []
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def execute(self):
+        self.client.round_trips += 1
+        rows = [dict(r) for r in USERS if all(f(r) for f in self.filters)]
+        return SimpleNamespace(data=rows)
+
+
+class _Client:
+    def __init__(self):
+        self.round_trips = 0
+
+    def table(self, name):
+        return _Query(self)
+
+
+def test_batched_resolution():
+    client = _Client()
+    directory = UserDirectory(client)
+
+    # 2,000 rows spread over 50 sellers resolve in one query
+    seller_ids = [(i % 50) + 1 for i in range(2000)]
+    names = directory.usernames_for(seller_ids)
+    assert len(names) == 50
+    assert client.round_trips == 1
+
+    # Repeat lookups (either direction) are served from the cache
+    directory.usernames_for(seller_ids)
+    assert directory.userid_for("user7") == 7
+    assert client.round_trips == 1
+    print("✅ Seller resolution costs one round-trip")
+
+
+def test_ttl_expiry():
+    client = _Client()
+    directory = UserDirectory(client, ttl_seconds=0)
+    directory.username_for(1)
+    directory.username_for(1)
+    assert client.round_trips == 2
+    print("✅ Expired entries are re-fetched")
+
+
+def test_all_users():
+    client = _Client()
+    directory = UserDirectory(client)
+    assert [u["username"] for u in directory.all_users()] == [u["username"] for u in USERS]
+    assert directory.userid_for("user3") == 3
+    assert client.round_trips == 1
+
+    # A profile created since is listed on the next call, not after the TTL
+    USERS.append({"id": 51, "username": "newcomer"})
+    try:
+        assert directory.all_users()[-1]["username"] == "newcomer"
+        assert directory.userid_for("newcomer") == 51
+        assert client.round_trips == 2
+    finally:
+        USERS.pop()
+    print("✅ get_users shares the directory and lists new profiles immediately")
+
+
+if __name__ == "__main__":
+    test_batched_resolution()
+    test_ttl_expiry()
+    test_all_users()
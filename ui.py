@@ -16,6 +16,7 @@ import src.ui.pages.browse_ui as browse_ui
 import src.ui.pages.postItem_ui as postItem_ui
 import src.ui.pages.myListings_ui as myListings_ui
 from src.ui.components.help_system import contextual_help_system
+from src.ui.components.trace_panel import trace_panel
 
 
 # Initialize session state storage if not exists
@@ -107,3 +108,6 @@ elif page == "Post Item":
 elif page == "My Listings":
     contextual_help_system("mylistings")
     myListings_ui.display()
+
+# --- Recent traces (only shown when TRACE_EXPORTERS includes "memory") ---
+trace_panel()